@@ -0,0 +1,195 @@
+"""Provider Batch API support for analyzing all issues in one submission.
+
+Batch requests are billed at about half the price of regular requests, but
+results can take minutes to hours, so this path is opt-in (`--batch-api`).
+"""
+
+import asyncio
+import os
+
+from anthropic import AsyncAnthropic
+from langchain_core.messages import AIMessage, BaseMessage
+from openai import AsyncOpenAI
+
+from debt_zero_agent import jsonlib
+from debt_zero_agent.agent.llm import _API_KEY_ENV_VARS, _DEFAULT_MODELS
+
+# Seconds between batch status checks
+_POLL_INTERVAL = 30.0
+
+# Seconds to wait for a batch before cancelling it
+_BATCH_TIMEOUT = 3600.0
+
+# Maximum tokens generated per analysis (required by the Anthropic API)
+_MAX_TOKENS = 4096
+
+# Message roles of the provider chat APIs, by LangChain message type
+_ROLES = {
+    "system": "system",
+    "human": "user",
+    "ai": "assistant",
+}
+
+
+async def submit_analysis_batch(
+    prompts: dict[str, list[BaseMessage]],
+    llm_provider: str,
+    model_name: str | None = None,
+    timeout: float = _BATCH_TIMEOUT,
+) -> dict[str, AIMessage]:
+    """Submit analysis prompts as one Batch API job and wait for the results.
+    
+    Args:
+        prompts: Formatted analysis messages keyed by issue key
+        llm_provider: LLM provider ('openai' or 'anthropic')
+        model_name: Specific model name to use (overrides provider default)
+        timeout: Seconds to wait for the job before cancelling it
+    
+    Returns:
+        Analysis responses keyed by issue key; failed requests are left out
+    
+    Raises:
+        ValueError: If the provider has no Batch API support or API key not found
+        RuntimeError: If the batch job does not complete
+        TimeoutError: If the batch job does not complete within the timeout
+    """
+    if llm_provider not in ("openai", "anthropic"):
+        raise ValueError(f"Batch API not supported for provider: {llm_provider}")
+    
+    env_var = _API_KEY_ENV_VARS[llm_provider]
+    api_key = os.getenv(env_var)
+    if not api_key:
+        raise ValueError(f"{env_var} environment variable not set")
+    
+    # Provider custom IDs are restricted to [a-zA-Z0-9_-], so use positions
+    issue_keys = list(prompts)
+    requests = {f"issue-{i}": prompts[key] for i, key in enumerate(issue_keys)}
+    model = model_name or _DEFAULT_MODELS[llm_provider]
+    
+    # Polling stops at the deadline, however long the provider would take
+    deadline = asyncio.get_running_loop().time() + timeout
+    if llm_provider == "openai":
+        results = await _run_openai_batch(requests, model, api_key, deadline)
+    else:
+        results = await _run_anthropic_batch(requests, model, api_key, deadline)
+    
+    return {
+        issue_keys[int(custom_id.removeprefix("issue-"))]: message
+        for custom_id, message in results.items()
+    }
+
+
+async def _run_openai_batch(
+    requests: dict[str, list[BaseMessage]],
+    model: str,
+    api_key: str,
+    deadline: float,
+) -> dict[str, AIMessage]:
+    """Run chat completion requests through the OpenAI Batch API."""
+    client = AsyncOpenAI(api_key=api_key)
+    
+    lines = [
+        jsonlib.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "temperature": 0.0,
+                "messages": [
+                    {"role": _ROLES[m.type], "content": m.content}
+                    for m in messages
+                ],
+            },
+        })
+        for custom_id, messages in requests.items()
+    ]
+    batch_file = await client.files.create(
+        file=("analysis.jsonl", b"\n".join(lines)),
+        purpose="batch",
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"  Submitted OpenAI batch {batch.id} with {len(lines)} requests")
+    
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        if not await _wait_for_poll(deadline):
+            await client.batches.cancel(batch.id)
+            raise TimeoutError(f"Batch {batch.id} did not complete in time")
+        batch = await client.batches.retrieve(batch.id)
+    
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} ended with status: {batch.status}")
+    
+    output = await client.files.content(batch.output_file_id)
+    
+    results = {}
+    for line in output.content.splitlines():
+        record = jsonlib.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        content = response["body"]["choices"][0]["message"]["content"]
+        results[record["custom_id"]] = AIMessage(content=content or "")
+    
+    return results
+
+
+async def _run_anthropic_batch(
+    requests: dict[str, list[BaseMessage]],
+    model: str,
+    api_key: str,
+    deadline: float,
+) -> dict[str, AIMessage]:
+    """Run message requests through the Anthropic Message Batches API."""
+    client = AsyncAnthropic(api_key=api_key)
+    
+    batch_requests = []
+    for custom_id, messages in requests.items():
+        params = {
+            "model": model,
+            "max_tokens": _MAX_TOKENS,
+            "temperature": 0.0,
+            "messages": [
+                {"role": _ROLES[m.type], "content": m.content}
+                for m in messages
+                if m.type != "system"
+            ],
+        }
+        system = "\n\n".join(m.content for m in messages if m.type == "system")
+        if system:
+            params["system"] = system
+        batch_requests.append({"custom_id": custom_id, "params": params})
+    
+    batch = await client.messages.batches.create(requests=batch_requests)
+    print(f"  Submitted Anthropic batch {batch.id} with {len(batch_requests)} requests")
+    
+    while batch.processing_status != "ended":
+        if not await _wait_for_poll(deadline):
+            await client.messages.batches.cancel(batch.id)
+            raise TimeoutError(f"Batch {batch.id} did not complete in time")
+        batch = await client.messages.batches.retrieve(batch.id)
+    
+    results = {}
+    async for entry in await client.messages.batches.results(batch.id):
+        if entry.result.type != "succeeded":
+            continue
+        text = "".join(
+            block.text for block in entry.result.message.content
+            if block.type == "text"
+        )
+        results[entry.custom_id] = AIMessage(content=text)
+    
+    return results
+
+
+async def _wait_for_poll(deadline: float) -> bool:
+    """Sleep until the next status check, or return False if the deadline passed."""
+    remaining = deadline - asyncio.get_running_loop().time()
+    if remaining <= 0:
+        return False
+    await asyncio.sleep(min(_POLL_INTERVAL, remaining))
+    return True
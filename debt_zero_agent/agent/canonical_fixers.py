@@ -0,0 +1,88 @@
+"""Deterministic fixes for rules that need no LLM.
+
+Each fixer receives the issue and the current file content and returns an
+(old_code, new_code) edit, or None when the flagged line does not have the
+expected shape, in which case the issue goes through the LLM as usual.
+"""
+
+import re
+from collections.abc import Callable
+
+from debt_zero_agent.models import SonarQubeIssue
+
+CanonicalFixer = Callable[[SonarQubeIssue, str], tuple[str, str] | None]
+
+_BARE_EXCEPT_RE = re.compile(r"^(\s*)except\s*:")
+_REDUNDANT_JUMP_RE = re.compile(r"^\s*(return|continue)\s*$")
+
+
+def _line_edit(
+    content: str,
+    line: int,
+    fix_line: Callable[[str], str | None],
+) -> tuple[str, str] | None:
+    """Build an edit that rewrites a single line of the file.
+    
+    The edit is widened with surrounding lines until its old code occurs only
+    once in the file and its new code is not empty, as edits require.
+    
+    Args:
+        content: Current file content
+        line: 1-based line number to rewrite
+        fix_line: Returns the rewritten line, or None if it does not apply
+    
+    Returns:
+        (old_code, new_code) edit, or None if the line cannot be fixed
+    """
+    lines = content.splitlines(keepends=True)
+    if not 1 <= line <= len(lines):
+        return None
+    
+    index = line - 1
+    new_line = fix_line(lines[index])
+    if new_line is None or new_line == lines[index]:
+        return None
+    
+    start, end = index, index + 1
+    while True:
+        old_code = "".join(lines[start:end])
+        new_code = "".join(lines[start:index]) + new_line + "".join(lines[index + 1:end])
+        if new_code and _occurs_once(content, old_code):
+            return old_code, new_code
+        if start == 0 and end == len(lines):
+            return None
+        start = max(start - 1, 0)
+        end = min(end + 1, len(lines))
+
+
+def _occurs_once(content: str, code: str) -> bool:
+    """Check that code occurs exactly once, stopping at a second match."""
+    start = content.find(code)
+    return start >= 0 and content.find(code, start + 1) < 0
+
+
+def _fix_bare_except(issue: SonarQubeIssue, content: str) -> tuple[str, str] | None:
+    """Catch Exception instead of everything, so SystemExit propagates."""
+    def fix_line(text: str) -> str | None:
+        if not _BARE_EXCEPT_RE.match(text):
+            return None
+        return _BARE_EXCEPT_RE.sub(r"\1except Exception:", text, count=1)
+    
+    return _line_edit(content, issue.line, fix_line)
+
+
+def _fix_redundant_jump(issue: SonarQubeIssue, content: str) -> tuple[str, str] | None:
+    """Remove a bare return or continue that ends its block anyway."""
+    def fix_line(text: str) -> str | None:
+        if not _REDUNDANT_JUMP_RE.match(text):
+            return None
+        return ""
+    
+    return _line_edit(content, issue.line, fix_line)
+
+
+# Canonical fixers, keyed by SonarQube rule key
+CANONICAL_FIXERS: dict[str, CanonicalFixer] = {
+    "python:S5754": _fix_bare_except,
+    "python:S3626": _fix_redundant_jump,
+}
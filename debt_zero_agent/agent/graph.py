@@ -1,29 +1,38 @@
 """LangGraph workflow definition."""
 
-from langgraph.graph import StateGraph, END
+from functools import lru_cache
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 
 from debt_zero_agent.agent.nodes import (
+    analyze_all,
     analyze_issue,
     apply_fix,
     finalize,
+    prefetch_files,
+    prefetch_rules,
     select_next_issue,
     validate_fix,
+    write_pending_files,
 )
-from debt_zero_agent.agent.state import AgentState
+from debt_zero_agent.agent.state import AgentState, WorkerState
+from debt_zero_agent.models import FailedFix, FixStatus
 
 
-def should_continue(state: AgentState) -> str:
+def should_continue(state: WorkerState) -> str:
     """Determine next step after selecting issue.
     
     Returns:
         Next node name or END
     """
     if state["current_issue"] is None:
-        return "finalize"
+        return "end"
     return "analyze"
 
 
-def should_retry(state: AgentState) -> str:
+def should_retry(state: WorkerState) -> str:
     """Determine if fix should be retried after validation.
     
     Returns:
@@ -41,20 +50,164 @@ def should_retry(state: AgentState) -> str:
     return "apply"
 
 
-def build_graph() -> StateGraph:
-    """Build the LangGraph workflow.
+def dispatch_issues(state: AgentState) -> list[Send] | str:
+    """Fan out one worker per file so independent files are fixed concurrently.
+    
+    Issues within a file stay on the same worker and keep their bottom-up
+    order, so edits to one file never race with each other. Fixes that
+    would edit other files are deferred to process_deferred.
     
     Returns:
-        Compiled graph ready for execution
+        Send packets for the file workers, or "finalize" if there is nothing to do
     """
-    workflow = StateGraph(AgentState)
+    by_file: dict[str, list] = {}
+    for issue in state["issues"]:
+        by_file.setdefault(issue.file_path, []).append(issue)
+    
+    if not by_file:
+        return "finalize"
+    
+    # A lone worker may edit other files too; concurrent ones would lose
+    # each other's edits to a shared file, so they defer such fixes
+    own_file_only = len(by_file) > 1
+    
+    return [
+        Send("process_file", _worker_state(state, file_issues, own_file_only))
+        for file_issues in by_file.values()
+    ]
+
+
+def _worker_state(state: AgentState, issues: list, own_file_only: bool = False) -> WorkerState:
+    """Build the initial state of a file worker from the run state."""
+    # Seed the worker with its own prefetched file only. Other files are
+    # read from disk when needed; concurrent workers never edit them
+    file_path = issues[0].file_path
+    prefetched = state.get("file_cache", {})
+    file_cache = {file_path: prefetched[file_path]} if file_path in prefetched else {}
+    
+    return {
+        "repo_path": state["repo_path"],
+        "issues": issues,
+        "dry_run": state["dry_run"],
+        "llm_provider": state["llm_provider"],
+        "sonar_url": state.get("sonar_url", "https://sonarcloud.io"),
+        "current_issue_index": 0,
+        "current_issue": None,
+        "group_by_file": state.get("group_by_file", False),
+        "cot": state.get("cot", False),
+        "messages": [],
+        "successful_fixes": [],
+        "failed_fixes": [],
+        "pending_writes": {},
+        "own_file_only": own_file_only,
+        "deferred_issues": [],
+        "retry_count": 0,
+        "max_retries": state["max_retries"],
+        "max_lines_changed": state.get("max_lines_changed", 30),
+        "max_change_ratio": state.get("max_change_ratio", 0.1),
+        "_validation_passed": False,
+        "file_cache": file_cache,
+        "rule_cache": state.get("rule_cache", {}),
+        "search_cache": state.get("search_cache", {}),
+        "analyses": state.get("analyses", {}),
+        "model_name": state.get("model_name"),
+        "rate_limit": state.get("rate_limit"),
+    }
+
+
+async def process_file(state: WorkerState) -> dict:
+    """Run the per-issue fix loop for all issues of a single file.
+    
+    Workers await their LLM calls, so the event loop interleaves the
+    workers of all files instead of blocking on each request in turn.
+    An unexpected error only fails the remaining issues of its own file;
+    the fixes accepted so far and the other workers' results are kept.
+    
+    Returns:
+        Partial update merged into the run state by the result reducers
+    """
+    # Every issue takes at most select + analyze + (apply + validate) per attempt
+    steps_per_issue = 2 + 2 * max(state["max_retries"], 1)
+    recursion_limit = len(state["issues"]) * steps_per_issue + 2
+    
+    # Stream the state after every step, so a failure keeps the progress made
+    final_state = state
+    try:
+        async for final_state in build_worker_graph().astream(
+            state,
+            config={"recursion_limit": recursion_limit},
+            stream_mode="values",
+        ):
+            pass
+    except Exception as e:
+        print(f"  ⚠ Worker for {state['issues'][0].file_path} failed: {e}")
+        remaining = final_state["issues"][final_state["current_issue_index"]:]
+        final_state = {
+            **final_state,
+            "failed_fixes": [
+                *final_state["failed_fixes"],
+                *(
+                    FailedFix(
+                        issue_key=issue.key,
+                        file_path=issue.file_path,
+                        status=FixStatus.FAILED,
+                        error_message=f"Worker failed: {e}",
+                        llm_provider=state["llm_provider"],
+                    )
+                    for issue in remaining
+                ),
+            ],
+        }
+    
+    # Write the fixed files before their fixes are reported
+    write_pending_files(final_state)
+    
+    return {
+        "successful_fixes": final_state["successful_fixes"],
+        "failed_fixes": final_state["failed_fixes"],
+        "pending_writes": final_state["pending_writes"],
+        "deferred_issues": final_state["deferred_issues"],
+    }
+
+
+async def process_deferred(state: AgentState) -> dict:
+    """Fix the issues whose fixes span files, after all file workers are done.
+    
+    The deferred issues run on a single worker that starts from the file
+    workers' combined edits, so its fixes build on theirs rather than on
+    the stale originals.
+    
+    Returns:
+        Partial update merged into the run state by the result reducers
+    """
+    deferred = state.get("deferred_issues", [])
+    if not deferred:
+        return {}
+    
+    print(f"  ✓ Fixing {len(deferred)} deferred issues spanning files")
+    worker = _worker_state(state, deferred)
+    worker["file_cache"] = {**state.get("file_cache", {}), **state.get("pending_writes", {})}
+    update = await process_file(worker)
+    
+    # The deferred issues were already merged into the run state
+    del update["deferred_issues"]
+    return update
+
+
+@lru_cache(maxsize=1)
+def build_worker_graph() -> StateGraph:
+    """Build the sequential select → analyze → apply → validate loop for one file.
+    
+    Returns:
+        Compiled worker graph
+    """
+    workflow = StateGraph(WorkerState)
     
     # Add nodes
     workflow.add_node("select_next", select_next_issue)
     workflow.add_node("analyze", analyze_issue)
     workflow.add_node("apply", apply_fix)
     workflow.add_node("validate", validate_fix)
-    workflow.add_node("finalize", finalize)
     
     # Set entry point
     workflow.set_entry_point("select_next")
@@ -65,7 +218,7 @@ def build_graph() -> StateGraph:
         should_continue,
         {
             "analyze": "analyze",
-            "finalize": "finalize",
+            "end": END,
         }
     )
     
@@ -81,6 +234,60 @@ def build_graph() -> StateGraph:
         }
     )
     
+    return workflow.compile(checkpointer=None, debug=False)
+
+
+@lru_cache(maxsize=1)
+def build_graph(checkpointer: BaseCheckpointSaver | None = None) -> StateGraph:
+    """Build the LangGraph workflow.
+    
+    The compiled graph is memoized, so repeated calls share one instance.
+    It holds no run state (each invocation gets its own state dict), so
+    concurrent invocations are safe.
+    
+    The touched files and the issues' rule descriptions are fetched in
+    parallel. With `cot` set, all issues are then analyzed up front in one
+    batch; otherwise each is analyzed within its fix request. The issues are
+    grouped by file and dispatched to concurrent file workers, and fixes
+    spanning files run on one worker after them, before the final report.
+    
+    Args:
+        checkpointer: Optional checkpointer for resumable runs. The default
+            CLI batch runs without one, skipping per-step state persistence.
+    
+    Returns:
+        Compiled graph ready for execution
+    """
+    workflow = StateGraph(AgentState)
+    
+    # Add nodes
+    workflow.add_node("prefetch_files", prefetch_files)
+    workflow.add_node("prefetch_rules", prefetch_rules)
+    workflow.add_node("analyze_all", analyze_all)
+    workflow.add_node("process_file", process_file)
+    workflow.add_node("process_deferred", process_deferred)
+    workflow.add_node("finalize", finalize)
+    
+    # Both prefetch steps start together; analysis waits for both
+    workflow.add_edge(START, "prefetch_files")
+    workflow.add_edge(START, "prefetch_rules")
+    workflow.add_edge(["prefetch_files", "prefetch_rules"], "analyze_all")
+    
+    # Fan out after the batched analysis (a no-op without cot)
+    workflow.add_conditional_edges(
+        "analyze_all",
+        dispatch_issues,
+        ["process_file", "finalize"],
+    )
+    
+    # The deferred worker runs once, after the last file worker
+    workflow.add_edge("process_file", "process_deferred")
+    workflow.add_edge("process_deferred", "finalize")
     workflow.add_edge("finalize", END)
     
-    return workflow.compile()
+    return workflow.compile(
+        checkpointer=checkpointer,
+        interrupt_before=[],
+        interrupt_after=[],
+        debug=False,
+    )
@@ -1,27 +1,85 @@
 """LLM factory for multi-provider support (OpenAI, Anthropic, Google Gemini)."""
 
 import os
+from functools import lru_cache
 from typing import Literal
 
 from langchain_anthropic import ChatAnthropic
 from langchain_core.language_models import BaseChatModel
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 
 LLMProvider = Literal["openai", "anthropic", "gemini"]
 
 
+# Environment variable holding the API key of each provider
+_API_KEY_ENV_VARS: dict[str, str] = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "gemini": "GOOGLE_API_KEY",
+}
+
+# Model used by each provider unless overridden
+_DEFAULT_MODELS: dict[str, str] = {
+    "openai": "gpt-4o",
+    # Updated to latest stable Sonnet (simulated for 2026 context)
+    "anthropic": "claude-sonnet-4-5-20250929",
+    # Using gemini-2.0-flash (fast and capable)
+    "gemini": "gemini-2.0-flash",
+}
+
+# Default requests-per-minute limits of each provider's entry tier
+_REQUESTS_PER_MINUTE: dict[str, int] = {
+    "openai": 60,
+    "anthropic": 50,
+    "gemini": 60,
+}
+
+# Requests allowed in a burst before throttling kicks in
+_MAX_BURST = 10
+
+# Retries of rate-limited or failed requests; the provider SDKs back off
+# exponentially with jitter and honor the server's Retry-After header
+_MAX_RETRIES = 6
+
+
+@lru_cache(maxsize=None)
+def _get_rate_limiter(
+    provider: LLMProvider,
+    requests_per_minute: int | None = None,
+) -> InMemoryRateLimiter:
+    """Get the rate limiter shared by all models of a provider.
+    
+    Limits apply per account rather than per model, so clients with
+    different model overrides draw from the same bucket.
+    """
+    return InMemoryRateLimiter(
+        requests_per_second=(requests_per_minute or _REQUESTS_PER_MINUTE[provider]) / 60,
+        check_every_n_seconds=0.05,
+        max_bucket_size=_MAX_BURST,
+    )
+
+
 def get_llm(
     provider: LLMProvider = "openai",
     temperature: float = 0.0,
     model_name: str | None = None,
+    rate_limit: int | None = None,
 ) -> BaseChatModel:
     """Get LLM instance based on provider.
     
+    Instances are cached per configuration, so the graph nodes share one
+    client (and its HTTP connection pool) instead of building one per call.
+    Requests are throttled proactively to the provider's rate limit instead
+    of relying on retries after 429 responses; requests that are still
+    rejected are retried with exponential backoff.
+    
     Args:
         provider: LLM provider to use
         temperature: Sampling temperature (0.0 = deterministic)
         model_name: Specific model name to use (overrides provider default)
+        rate_limit: Requests per minute (overrides the provider default)
         
     Returns:
         Configured LLM instance
@@ -29,40 +87,51 @@ def get_llm(
     Raises:
         ValueError: If provider is invalid or API key not found
     """
+    env_var = _API_KEY_ENV_VARS.get(provider)
+    if env_var is None:
+        raise ValueError(f"Invalid provider: {provider}. Must be 'openai', 'anthropic', or 'gemini'")
+    
+    api_key = os.getenv(env_var)
+    if not api_key:
+        raise ValueError(f"{env_var} environment variable not set")
+    
+    # The key is part of the cache key so a rotated key builds a new client
+    return _create_llm(provider, temperature, model_name, api_key, rate_limit)
+
+
+@lru_cache(maxsize=8)
+def _create_llm(
+    provider: LLMProvider,
+    temperature: float,
+    model_name: str | None,
+    api_key: str,
+    rate_limit: int | None = None,
+) -> BaseChatModel:
+    """Construct the chat model for a validated provider configuration."""
+    rate_limiter = _get_rate_limiter(provider, rate_limit)
+    
     if provider == "openai":
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        
         return ChatOpenAI(
-            model=model_name or "gpt-4o",
+            model=model_name or _DEFAULT_MODELS[provider],
             temperature=temperature,
             api_key=api_key,
+            rate_limiter=rate_limiter,
+            max_retries=_MAX_RETRIES,
         )
     
     elif provider == "anthropic":
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-        
-        # Updated to latest stable Sonnet (simulated for 2026 context)
         return ChatAnthropic(
-            model=model_name or "claude-sonnet-4-5-20250929",
+            model=model_name or _DEFAULT_MODELS[provider],
             temperature=temperature,
             api_key=api_key,
+            rate_limiter=rate_limiter,
+            max_retries=_MAX_RETRIES,
         )
     
-    elif provider == "gemini":
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable not set")
-        
-        # Using gemini-2.0-flash (fast and capable)
-        return ChatGoogleGenerativeAI(
-            model=model_name or "gemini-2.0-flash",
-            temperature=temperature,
-            google_api_key=api_key,
-        )
-    
-    else:
-        raise ValueError(f"Invalid provider: {provider}. Must be 'openai', 'anthropic', or 'gemini'")
+    return ChatGoogleGenerativeAI(
+        model=model_name or _DEFAULT_MODELS[provider],
+        temperature=temperature,
+        google_api_key=api_key,
+        rate_limiter=rate_limiter,
+        max_retries=_MAX_RETRIES,
+    )
@@ -1,20 +1,99 @@
 """LangGraph nodes for the agent workflow."""
 
+import asyncio
+import json
+import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from tree_sitter import Tree
 
+from debt_zero_agent import jsonlib
+from debt_zero_agent.agent.batch import _BATCH_TIMEOUT, submit_analysis_batch
+from debt_zero_agent.agent.canonical_fixers import CANONICAL_FIXERS
 from debt_zero_agent.agent.llm import get_llm
-from debt_zero_agent.agent.state import AgentState
-from debt_zero_agent.models import FailedFix, FixResult, FixStatus
-from debt_zero_agent.prompts.templates import ANALYZE_ISSUE_PROMPT
-from debt_zero_agent.tools import generate_diff, generate_diff_stats, read_file, search_code, write_file
+from debt_zero_agent.agent.state import AgentState, WorkerState
+from debt_zero_agent.models import FailedFix, FixResult, FixStatus, ProposeEdit, content_sha256
+from debt_zero_agent.prompts.templates import (
+    ANALYZE_AND_FIX_PROMPT,
+    ANALYZE_ISSUE_PROMPT,
+    GROUPED_FIX_PROMPT,
+    ISSUE_DETAILS,
+    SYSTEM_PROMPT,
+    TARGETED_FIX_PROMPT,
+)
+from debt_zero_agent.sonarqube import SonarQubeClient
+from debt_zero_agent.tools import (
+    EditError,
+    apply_edits_batch,
+    compute_diff,
+    read_file,
+    search_code,
+    write_file,
+)
 from debt_zero_agent.validation import (
     detect_language_from_extension,
-    locate_issue,
+    locate_node,
+    parse_code,
     validate_syntax,
 )
 
+# Upper bound on a single LLM request, so one stalled call cannot hold up a worker
+_LLM_TIMEOUT = 120.0
+
+# Lines of context around the issue lines sent in fix prompts
+_WINDOW_RADIUS = 30
+
+# Maximum number of files (or rules) fetched concurrently by the prefetch nodes
+_PREFETCH_WORKERS = 16
+
+# HTML tags in SonarQube rule descriptions
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+# Markdown code fence wrapped around an LLM JSON response
+_CODE_FENCE_RE = re.compile(r'^```[a-zA-Z]*\n(.*)\n```$', re.DOTALL)
+
+# System prompt marked as an Anthropic cache breakpoint: Anthropic reuses a
+# cached prompt prefix only up to an explicit breakpoint, while the other
+# providers cache matching prefixes automatically
+_CACHED_SYSTEM_MESSAGE = SystemMessage(content=[{
+    "type": "text",
+    "text": SYSTEM_PROMPT,
+    "cache_control": {"type": "ephemeral"},
+}])
+
+# Models with the ProposeEdit tool bound, keyed by id() of the cached base
+# model (chat models are unhashable); each entry keeps its base model alive,
+# so the id cannot be reused by another model
+_EDIT_LLMS: dict[int, tuple] = {}
+
+
+@lru_cache(maxsize=4)
+def _get_sonar_client(sonar_url: str) -> SonarQubeClient:
+    """Get the shared SonarQube client for a server."""
+    return SonarQubeClient(base_url=sonar_url)
+
+
+@lru_cache(maxsize=256)
+def _get_rule_description(sonar_url: str, rule_key: str) -> str:
+    """Fetch a rule and format its description for the analysis prompt.
+    
+    Rule keys repeat across issues, so each rule is fetched once per server.
+    
+    Raises:
+        LookupError: If the rule could not be fetched (not cached, so a
+            transient failure is retried for the next issue)
+    """
+    rule = _get_sonar_client(sonar_url).get_rule(rule_key)
+    if not rule:
+        raise LookupError(f"Rule {rule_key} not available")
+    
+    # Strip HTML tags for cleaner prompt
+    clean_desc = _HTML_TAG_RE.sub('', rule.htmlDesc)
+    return f"\n**Rule Details**:\n{clean_desc[:500]}"
+
 
 def batch_issues_by_file(issues: list) -> list:
     """Group issues by file and sort bottom-up by line number.
@@ -29,24 +108,11 @@ def batch_issues_by_file(issues: list) -> list:
     Returns:
         List of issues sorted by file, then by line number (descending)
     """
-    # Group by file
-    by_file = defaultdict(list)
-    for issue in issues:
-        file_path = issue.get_file_path()
-        by_file[file_path].append(issue)
-    
-    # Sort each file's issues bottom-up (highest line number first)
-    batched = []
-    for file_path in sorted(by_file.keys()):
-        file_issues = by_file[file_path]
-        # Sort by line number descending (None/0 goes to end)
-        file_issues.sort(key=lambda i: i.line or 0, reverse=True)
-        batched.extend(file_issues)
-    
-    return batched
+    # Files ascending, then lines descending (None/0 goes to end of its file)
+    return sorted(issues, key=lambda i: (i.file_path, -(i.line or 0)))
 
 
-def select_next_issue(state: AgentState) -> AgentState:
+def select_next_issue(state: WorkerState) -> WorkerState:
     """Select the next issue to process.
     
     Returns:
@@ -61,42 +127,263 @@ def select_next_issue(state: AgentState) -> AgentState:
     state["current_issue"] = issue
     state["retry_count"] = 0
     
+    # In grouped mode, the following issues of the same file are fixed together
+    group = [issue]
+    if state.get("group_by_file"):
+        for next_issue in state["issues"][state["current_issue_index"] + 1:]:
+            if next_issue.file_path != issue.file_path:
+                break
+            group.append(next_issue)
+    state["current_group"] = group
+    
+    # Earlier issues' conversations are no longer useful context. Trimming in
+    # place leaves just the current issue's history, which fix prompts extend
+    state["messages"].clear()
+    
     return state
 
 
-def analyze_issue(state: AgentState) -> AgentState:
-    """Analyze the current issue and plan a fix.
+def _current_group(state: WorkerState) -> list:
+    """Issues fixed by the current step: just the current issue unless grouped."""
+    return state.get("current_group") or [state["current_issue"]]
+
+
+def _record_failure(state: WorkerState, error_message: str) -> None:
+    """Record a failed fix for every issue of the current step and move on."""
+    group = _current_group(state)
+    for issue in group:
+        state["failed_fixes"].append(FailedFix(
+            issue_key=issue.key,
+            file_path=issue.file_path,
+            status=FixStatus.VALIDATION_ERROR,
+            error_message=error_message,
+            llm_provider=state["llm_provider"],
+            iterations=state["retry_count"],
+        ))
+    state["current_issue_index"] += len(group)
+
+
+def _cacheable(provider: str, messages: list) -> list:
+    """Mark the leading system prompt of a request as cacheable for Anthropic."""
+    if provider != "anthropic" or not messages or messages[0].type != "system":
+        return messages
+    return [_CACHED_SYSTEM_MESSAGE, *messages[1:]]
+
+
+async def _ainvoke_llm(llm, messages: list):
+    """Invoke the LLM asynchronously, bounding the request's tail latency.
+    
+    Raises:
+        TimeoutError: If the request takes longer than `_LLM_TIMEOUT` seconds
+    """
+    try:
+        return await asyncio.wait_for(llm.ainvoke(messages), timeout=_LLM_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"LLM request timed out after {_LLM_TIMEOUT:.0f}s") from None
+
+
+class _JsonObjectScanner:
+    """Find the first complete top-level JSON object in streamed text.
     
-    Fetches rule details from SonarQube API to enrich the prompt.
+    Braces inside JSON strings are ignored, and the scan carries over between
+    chunks, so every streamed character is looked at once.
+    """
     
-    Returns:
-        Updated state with analysis in messages
+    def __init__(self) -> None:
+        self.text = ""
+        self._start: int | None = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, chunk: str) -> str | None:
+        """Add a streamed chunk.
+        
+        Returns:
+            The complete JSON object text once its closing brace arrived, else None
+        """
+        scanned = len(self.text)
+        self.text += chunk
+        
+        for i in range(scanned, len(self.text)):
+            char = self.text[i]
+            if self._start is None:
+                if char == "{":
+                    self._start, self._depth = i, 1
+                continue
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.text[self._start:i + 1]
+        
+        return None
+
+
+def _get_edit_llm(state: WorkerState):
+    """Get the LLM with the ProposeEdit tool bound, so edits arrive as parsed tool calls.
+    
+    The binding is built once per model rather than on every fix attempt.
+    Models without tool calling support are returned as is and answer with
+    JSON text instead.
     """
-    issue = state["current_issue"]
-    if not issue:
-        return state
+    llm = get_llm(
+        provider=state["llm_provider"],
+        model_name=state.get("model_name"),
+        rate_limit=state.get("rate_limit"),
+    )
+    cached = _EDIT_LLMS.get(id(llm))
+    if cached is not None:
+        return cached[1]
     
-    # Get file content and AST context
-    file_path = issue.get_file_path()
+    # Gemini issues parallel calls by default and rejects the flag
+    kwargs = {} if state["llm_provider"] == "gemini" else {"parallel_tool_calls": True}
+    try:
+        edit_llm = llm.bind_tools([ProposeEdit], tool_choice="any", **kwargs)
+    except NotImplementedError:
+        edit_llm = llm
     
-    # Check cache first (optimization for batched issues)
-    file_cache = state.get("file_cache", {})
-    if file_path in file_cache:
-        content = file_cache[file_path]
-    else:
-        content = read_file.invoke({
+    _EDIT_LLMS[id(llm)] = (llm, edit_llm)
+    return edit_llm
+
+
+def _chunk_text(content: str | list) -> str:
+    """Text of a streamed message chunk, whose content may be a list of blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+async def _astream_fix(llm, messages: list) -> AIMessage:
+    """Stream the fix response, returning early once a JSON text answer is complete.
+    
+    Tool calls are aggregated over the whole stream. For JSON text answers,
+    trailing text after the object (closing code fences, explanations) is
+    never waited for; if no complete object arrives, the whole text is
+    returned for the regular parsing (and error reporting) path.
+    
+    Raises:
+        TimeoutError: If the response takes longer than `_LLM_TIMEOUT` seconds
+    """
+    async def _collect() -> AIMessage:
+        scanner = _JsonObjectScanner()
+        message = None
+        async for chunk in llm.astream(messages):
+            message = chunk if message is None else message + chunk
+            json_text = scanner.feed(_chunk_text(chunk.content))
+            if json_text is not None and not message.tool_call_chunks:
+                return AIMessage(content=json_text)
+        
+        tool_calls = message.tool_calls if message is not None else []
+        return AIMessage(content=scanner.text, tool_calls=tool_calls)
+    
+    try:
+        return await asyncio.wait_for(_collect(), timeout=_LLM_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"LLM request timed out after {_LLM_TIMEOUT:.0f}s") from None
+
+
+def _search_references(state: AgentState | WorkerState, symbol_name: str) -> list[dict]:
+    """Search the repository for a symbol, reusing results across issues.
+    
+    Issues in the same file often touch the same symbols, so the results of
+    each repository-wide search are kept in the run's search cache.
+    """
+    search_cache = state.setdefault("search_cache", {})
+    if symbol_name not in search_cache:
+        search_cache[symbol_name] = search_code.invoke({
+            "repo_path": state["repo_path"],
+            "query": symbol_name,
+        })
+    return search_cache[symbol_name]
+
+
+def _get_cached_content(state: AgentState | WorkerState, file_path: str) -> str:
+    """Get file content, reading and decoding each file only once per run.
+    
+    validate_fix refreshes the cache entry after accepting a fix.
+    """
+    file_cache = state.setdefault("file_cache", {})
+    if file_path not in file_cache:
+        file_cache[file_path] = read_file.invoke({
             "repo_path": state["repo_path"],
             "file_path": file_path,
         })
-        # Update cache
-        file_cache[file_path] = content
-        # Ensure state has the updated cache (though dict is mutable)
-        state["file_cache"] = file_cache
+    return file_cache[file_path]
+
+
+def _get_cached_ast(
+    state: AgentState | WorkerState,
+    file_path: str,
+    content: str,
+    language: str,
+) -> Tree:
+    """Get the syntax tree of a file, parsing each version only once.
+    
+    Issues sharing a file reuse one parse; validate_fix drops the entry
+    after accepting a fix.
+    """
+    ast_cache = state.setdefault("ast_cache", {})
+    cached = ast_cache.get(file_path)
+    if cached is not None and cached[0] == content:
+        return cached[1]
+    
+    tree = parse_code(content, language)
+    ast_cache[file_path] = (content, tree)
+    return tree
+
+
+def _canonical_edits(state: AgentState | WorkerState, issues: list) -> list[dict] | None:
+    """Get deterministic edits for issues whose rules have a canonical fix.
+    
+    Returns:
+        One edit per issue, or None unless every issue has a canonical fix
+    """
+    edits = []
+    for issue in issues:
+        fixer = CANONICAL_FIXERS.get(issue.rule)
+        if fixer is None or not issue.line:
+            return None
+        edit = fixer(issue, _get_cached_content(state, issue.file_path))
+        if edit is None:
+            return None
+        edits.append({"file": issue.file_path, "old_code": edit[0], "new_code": edit[1]})
+    return edits
+
+
+def _analysis_values(state: AgentState | WorkerState, issue) -> dict:
+    """Gather the details of an issue for the analysis prompts.
     
-    # Locate issue in AST
+    Reads the file (through the cache), locates the issue in the AST, looks up
+    cross-references and fetches rule details from SonarQube API.
+    
+    Returns:
+        Values of the ISSUE_DETAILS template fields
+    """
+    # Get file content and AST context
+    file_path = issue.file_path
+    content = _get_cached_content(state, file_path)
+    
+    # Locate issue in AST, parsing each version of a file only once
     language = detect_language_from_extension(file_path)
     if language and issue.line:
-        context = locate_issue(content, language, issue.line)
+        tree = _get_cached_ast(state, file_path, content, language)
+        context = locate_node(tree, issue.line)
     else:
         # Fallback if language detection fails
         context = None
@@ -109,10 +396,7 @@ def analyze_issue(state: AgentState) -> AgentState:
             symbol_name = context.node_text.split('(')[0].strip()
             # Only search if symbol name is meaningful (e.g. > 3 chars)
             if len(symbol_name) > 3:
-                references = search_code.invoke({
-                    "repo_path": state["repo_path"],
-                    "query": symbol_name,
-                })
+                references = _search_references(state, symbol_name)
                 
                 # Filter out references in the same file
                 cross_refs = [
@@ -130,31 +414,17 @@ def analyze_issue(state: AgentState) -> AgentState:
             print(f"  ⚠ Cross-reference search failed: {e}")
             pass
     
-    # Fetch rule details from SonarQube API
-    rule_description = ""
-    try:
-        from debt_zero_agent.sonarqube import SonarQubeClient
-        
-        sonar_url = state.get("sonar_url", "https://sonarcloud.io")
-        client = SonarQubeClient(base_url=sonar_url)
-        rule = client.get_rule(issue.rule)
-        
-        if rule:
-            # Strip HTML tags for cleaner prompt
-            import re
-            clean_desc = re.sub(r'<[^>]+>', '', rule.htmlDesc)
-            rule_description = f"\n**Rule Details**:\n{clean_desc[:500]}"
-    except Exception as e:
-        # Continue without rule details if API fails
-        pass
-    
-    # Create analysis prompt
-    llm = get_llm(
-        provider=state["llm_provider"],
-        model_name=state.get("model_name"),
-    )
+    # Rule details are prefetched; fetch from SonarQube API only on a miss
+    rule_description = state.get("rule_cache", {}).get(issue.rule)
+    if rule_description is None:
+        try:
+            sonar_url = state.get("sonar_url", "https://sonarcloud.io")
+            rule_description = _get_rule_description(sonar_url, issue.rule)
+        except Exception as e:
+            # Continue without rule details if API fails
+            rule_description = ""
     
-    prompt_values = {
+    return {
         "issue_key": issue.key,
         "rule": issue.rule,
         "severity": issue.severity,
@@ -167,89 +437,338 @@ def analyze_issue(state: AgentState) -> AgentState:
         "parent_type": context.parent_type if context else "N/A",
         "cross_references": cross_ref_context,
     }
+
+
+def _build_analysis_messages(state: AgentState | WorkerState, issue) -> list:
+    """Build the analysis prompt for an issue.
+    
+    Returns:
+        Formatted analysis prompt messages
+    """
+    return ANALYZE_ISSUE_PROMPT.format_messages(**_analysis_values(state, issue))
+
+
+def prefetch_files(state: AgentState) -> dict:
+    """Read every file touched by the issues in one parallel burst.
+    
+    Files that cannot be read are left out, so the failure surfaces (and is
+    recorded) when the issue itself is processed.
     
-    messages = ANALYZE_ISSUE_PROMPT.format_messages(**prompt_values)
-    response = llm.invoke(messages)
+    Returns:
+        Partial update with the file cache
+    """
+    repo_path = state["repo_path"]
+    unique_files = {issue.file_path for issue in state["issues"]}
     
-    state["messages"].append(HumanMessage(content=str(messages[-1].content)))
-    state["messages"].append(response)
+    def _read(file_path: str) -> tuple[str, str | None]:
+        try:
+            return file_path, read_file.invoke({"repo_path": repo_path, "file_path": file_path})
+        except Exception:
+            return file_path, None
     
-    return state
+    with ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS) as executor:
+        contents = dict(executor.map(_read, unique_files))
+    
+    return {
+        "file_cache": {path: content for path, content in contents.items() if content is not None},
+    }
 
 
-def apply_fix(state: AgentState) -> AgentState:
-    """Generate and apply the fix.
+def prefetch_rules(state: AgentState) -> dict:
+    """Fetch the description of every distinct rule concurrently.
+    
+    Issues typically share a handful of rules, so this replaces one SonarQube
+    request per issue with one per rule, all in flight at once.
     
     Returns:
-        Updated state with fix applied
+        Partial update with the rule cache
     """
-    import json
+    sonar_url = state.get("sonar_url", "https://sonarcloud.io")
+    unique_rules = {issue.rule for issue in state["issues"]}
     
-    issue = state["current_issue"]
-    if not issue:
-        return state
+    def _fetch(rule_key: str) -> tuple[str, str | None]:
+        try:
+            return rule_key, _get_rule_description(sonar_url, rule_key)
+        except Exception:
+            return rule_key, None
     
-    file_path = issue.get_file_path()
+    with ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS) as executor:
+        descriptions = dict(executor.map(_fetch, unique_rules))
     
-    # Read current content
-    # Check cache first (optimization for batched issues)
-    file_cache = state.get("file_cache", {})
-    if file_path in file_cache:
-        original_content = file_cache[file_path]
-    else:
-        original_content = read_file.invoke({
-            "repo_path": state["repo_path"],
-            "file_path": file_path,
-        })
-        # Update cache
-        file_cache[file_path] = original_content
-        state["file_cache"] = file_cache
+    return {
+        "rule_cache": {key: desc for key, desc in descriptions.items() if desc is not None},
+    }
+
+
+async def analyze_all(state: AgentState) -> dict:
+    """Analyze every issue up front with a single batched LLM call.
+    
+    The analysis prompts are independent of each other (issues are fixed
+    bottom-up, so earlier fixes never shift the lines of later issues), which
+    lets the provider process them concurrently instead of one per worker step.
+    With `batch_api` set they are submitted as one provider Batch API job.
+    
+    Without `cot` set, issues are analyzed as part of their fix request instead.
+    
+    Returns:
+        Partial update with analysis messages keyed by issue key
+    """
+    if not state["issues"] or not state.get("cot"):
+        return {"analyses": {}}
+    
+    def _prepare(issue) -> list | None:
+        try:
+            # Issues with a canonical fix are fixed without the LLM
+            if _canonical_edits(state, [issue]) is not None:
+                return None
+            return _build_analysis_messages(state, issue)
+        except Exception as e:
+            # Leave it to the worker, which records the failure for this issue
+            print(f"  ⚠ Could not prepare analysis for {issue.key}: {e}")
+            return None
+    
+    # Preparing a prompt reads and parses files and searches the repository;
+    # run it in threads, so the prompts are prepared concurrently and the
+    # event loop stays free
+    prepared = await asyncio.gather(
+        *(asyncio.to_thread(_prepare, issue) for issue in state["issues"])
+    )
+    prompts = {
+        issue.key: messages
+        for issue, messages in zip(state["issues"], prepared)
+        if messages is not None
+    }
     
-    # Use targeted fix prompt for JSON-based edits
-    from debt_zero_agent.prompts.templates import TARGETED_FIX_PROMPT
-    from debt_zero_agent.tools import EditError, apply_edit
+    if not prompts:
+        return {"analyses": {}}
+    
+    if state.get("batch_api"):
+        try:
+            responses = await submit_analysis_batch(
+                prompts,
+                state["llm_provider"],
+                state.get("model_name"),
+                state.get("batch_timeout", _BATCH_TIMEOUT),
+            )
+        except Exception as e:
+            # Workers fall back to analyzing each issue on their own
+            print(f"  ⚠ Batch API analysis failed: {e}")
+            return {"analyses": {}}
+        
+        return {
+            "analyses": {
+                issue_key: [messages[-1], responses[issue_key]]
+                for issue_key, messages in prompts.items()
+                if issue_key in responses
+            },
+        }
     
     llm = get_llm(
         provider=state["llm_provider"],
         model_name=state.get("model_name"),
+        rate_limit=state.get("rate_limit"),
     )
+    semaphore = asyncio.Semaphore(state.get("max_concurrency", 8))
     
-    # Build the prompt with accumulated context from previous messages
-    prompt_values = {
-        "message": issue.message,
-        "file_path": file_path,
-        "line": issue.line or "N/A",
-        "file_content": original_content,
+    async def _analyze(messages: list):
+        async with semaphore:
+            return await _ainvoke_llm(llm, _cacheable(state["llm_provider"], messages))
+    
+    responses = await asyncio.gather(
+        *(_analyze(messages) for messages in prompts.values()),
+        return_exceptions=True,
+    )
+    
+    analyses = {}
+    for issue_key, messages, response in zip(prompts, prompts.values(), responses):
+        if isinstance(response, Exception):
+            # Worker falls back to analyzing this issue on its own
+            print(f"  ⚠ Batched analysis failed for {issue_key}: {response}")
+            continue
+        # The prompt's last message is already the formatted HumanMessage
+        analyses[issue_key] = [messages[-1], response]
+    
+    return {"analyses": analyses}
+
+
+async def analyze_issue(state: WorkerState) -> WorkerState:
+    """Analyze the current issue (or every issue of a grouped step) and plan a fix.
+    
+    Uses the batched analysis from `analyze_all` when available, otherwise
+    fetches rule details from SonarQube API and queries the LLM directly.
+    Only runs with `cot` set; otherwise apply_fix analyzes and fixes in one request.
+    
+    Returns:
+        Updated state with analysis in messages
+    """
+    if not state["current_issue"] or not state.get("cot"):
+        return state
+    
+    # apply_fix uses the canonical fix, which needs no analysis
+    if _canonical_edits(state, _current_group(state)) is not None:
+        return state
+    
+    for issue in _current_group(state):
+        analysis = state.get("analyses", {}).get(issue.key)
+        if analysis:
+            state["messages"].extend(analysis)
+            continue
+        
+        messages = await asyncio.to_thread(_build_analysis_messages, state, issue)
+        
+        llm = get_llm(
+            provider=state["llm_provider"],
+            model_name=state.get("model_name"),
+            rate_limit=state.get("rate_limit"),
+        )
+        response = await _ainvoke_llm(llm, _cacheable(state["llm_provider"], messages))
+        
+        state["messages"].append(messages[-1])
+        state["messages"].append(response)
+    
+    return state
+
+
+def _window(content: str, lines: list[int | None], radius: int = _WINDOW_RADIUS) -> dict:
+    """Slice a file around the issue lines, so fix prompts carry only the relevant part.
+    
+    Edits are matched by text, not position, so the slice needs no remapping.
+    Falls back to the whole file when an issue has no line.
+    
+    Returns:
+        Prompt values: file_content, start_line, end_line and total_lines (1-indexed)
+    """
+    file_lines = content.splitlines(keepends=True)
+    total = len(file_lines)
+    
+    if not lines or any(line is None for line in lines):
+        start, end = 1, total
+    else:
+        start = max(1, min(lines) - radius)
+        end = min(total, max(lines) + radius)
+    
+    return {
+        "file_content": "".join(file_lines[start - 1:end]),
+        "start_line": start,
+        "end_line": end,
+        "total_lines": total,
     }
+
+
+def _parse_json_edits(content: str, file_path: str) -> list[dict]:
+    """Parse edits from a JSON text answer (models without tool calling).
+    
+    Raises:
+        json.JSONDecodeError: If the answer is not valid JSON
+    """
+    # Extract JSON from response (handle markdown code blocks)
+    content = content.strip()
+    fence = _CODE_FENCE_RE.match(content)
+    if fence:
+        # Remove markdown code block markers
+        content = fence.group(1)
+    
+    edit_data = jsonlib.loads(content)
+    
+    # Handle new format: "edits": [...]
+    edits = edit_data.get("edits", [])
+    
+    # Backward compatibility / fallback for flat structure
+    if not edits and "old_code" in edit_data:
+        edits = [{
+            "file": file_path,
+            "old_code": edit_data["old_code"],
+            "new_code": edit_data["new_code"]
+        }]
+    
+    return edits
+
+
+async def apply_fix(state: WorkerState) -> WorkerState:
+    """Generate and apply the fix.
+    
+    Returns:
+        Updated state with fix applied
+    """
+    issue = state["current_issue"]
+    if not issue:
+        return state
+    
+    file_path = issue.file_path
     
-    messages = TARGETED_FIX_PROMPT.format_messages(**prompt_values)
+    # Read current content, off the event loop on a cache miss
+    original_content = await asyncio.to_thread(_get_cached_content, state, file_path)
     
-    # Use accumulated messages for context (includes analysis from previous step)
-    full_messages = state["messages"] + messages
-    response = llm.invoke(full_messages)
+    group = _current_group(state)
+    history = state["messages"]
+    prompt_start = len(history)
+    response = None
+    
+    # Rules with a canonical fix skip the LLM, unless that fix was rejected
+    edits = _canonical_edits(state, group) if state["retry_count"] == 0 else None
+    
+    if edits is None:
+        # Use targeted fix prompt, with edits returned through the ProposeEdit tool
+        llm = _get_edit_llm(state)
+        
+        # Build the prompt with accumulated context from previous messages
+        window = _window(original_content, [i.line for i in group])
+        if not state.get("cot"):
+            # One step: the issue details come with the fix request, so no
+            # separate analysis round-trip is needed
+            details = await asyncio.gather(
+                *(asyncio.to_thread(_analysis_values, state, i) for i in group)
+            )
+            issues_text = "\n\n".join(ISSUE_DETAILS.format(**values) for values in details)
+            messages = ANALYZE_AND_FIX_PROMPT.format_messages(
+                issues=issues_text,
+                file_path=file_path,
+                **window,
+            )
+        elif len(group) > 1:
+            issues_text = "\n".join(
+                f"- Line {i.line or 'N/A'}: {i.message} ({i.rule})"
+                for i in group
+            )
+            messages = GROUPED_FIX_PROMPT.format_messages(
+                issues=issues_text,
+                file_path=file_path,
+                **window,
+            )
+        else:
+            prompt_values = {
+                "message": issue.message,
+                "file_path": file_path,
+                "line": issue.line or "N/A",
+                **window,
+            }
+            messages = TARGETED_FIX_PROMPT.format_messages(**prompt_values)
+        
+        # One system message leads the history, so every request of the issue
+        # (analysis and all attempts) starts with the same prefix, which the
+        # providers' prompt caches reuse instead of reprocessing it
+        if not history or history[0].type != "system":
+            history.insert(0, messages[0])
+        
+        # Extend the current issue's history (analysis and earlier attempts) in
+        # place rather than copying it into a new list on every attempt
+        prompt_start = len(history)
+        history.extend(messages[1:])
     
     # Try to parse JSON response
     try:
-        # Extract JSON from response (handle markdown code blocks)
-        content = response.content.strip()
-        if content.startswith("```"):
-            # Remove markdown code block markers
-            lines = content.split("\n")
-            content = "\n".join(lines[1:-1]) if len(lines) > 2 else content
-        
-        edit_data = json.loads(content)
-        
-        # Handle new format: "edits": [...]
-        edits = edit_data.get("edits", [])
-        
-        # Backward compatibility / fallback for flat structure
-        if not edits and "old_code" in edit_data:
-            edits = [{
-                "file": file_path,
-                "old_code": edit_data["old_code"],
-                "new_code": edit_data["new_code"]
-            }]
+        if edits is None:
+            response = await _astream_fix(llm, _cacheable(state["llm_provider"], history))
             
+            if response.tool_calls:
+                # Edits proposed through the tool arrive already parsed
+                edits = [
+                    call["args"] for call in response.tool_calls
+                    if call["name"] == ProposeEdit.__name__
+                ]
+            else:
+                edits = _parse_json_edits(response.content, file_path)
+        
         if not edits:
              raise ValueError("No edits found in JSON response")
              
@@ -263,60 +782,67 @@ def apply_fix(state: AgentState) -> AgentState:
         total_old_chars = 0
         total_new_chars = 0
         
+        # Collect edits per file so each file is rewritten in a single pass
+        edits_by_file: dict[str, list[tuple[str, str]]] = defaultdict(list)
+        
         for edit in edits:
-            target_path = edit.get("file", file_path)
+            target_path = edit.get("file") or file_path
             old_code = edit.get("old_code", "")
             new_code = edit.get("new_code", "")
             
             if not old_code or not new_code:
                 raise ValueError(f"Missing old_code or new_code in edit for {target_path}")
             
-            # If target_path is not in modified_files, load it
+            # If target_path is not in modified_files, load it (the cached
+            # original is what validate_fix diffs against)
             if target_path not in modified_files:
-                # Check cache
-                file_cache = state.get("file_cache", {})
-                if target_path in file_cache:
-                    modified_files[target_path] = file_cache[target_path]
-                else:
-                    # Read from disk
-                    content = read_file.invoke({
-                        "repo_path": state["repo_path"],
-                        "file_path": target_path,
-                    })
-                    modified_files[target_path] = content
-                    # Verify read success? read_file returns content string.
+                modified_files[target_path] = _get_cached_content(state, target_path)
             
-            # Apply edit to the accumulating content
-            current_content = modified_files[target_path]
-            new_content = apply_edit(current_content, old_code, new_code)
-            modified_files[target_path] = new_content
+            edits_by_file[target_path].append((old_code, new_code))
             
             total_old_chars += len(old_code)
             total_new_chars += len(new_code)
+        
+        # Other files may be fixed by concurrent workers, whose buffered writes
+        # would overwrite each other's edits. Such fixes are left to a single
+        # worker run after them, which starts from their combined edits
+        if state.get("own_file_only") and set(edits_by_file) != {file_path}:
+            print(f"  ⚠ Fix spans {len(edits_by_file)} files, deferring it")
+            state["deferred_issues"].extend(group)
+            state["current_issue_index"] += len(group)
+            
+            # Nothing for validate_fix to check; move on to the next issue
+            state["_temp_modified_files"] = {}
+            state["_temp_fixed_content"] = ""
+            state["_validation_passed"] = True
+            return state
+        
+        for target_path, file_edits in edits_by_file.items():
+            modified_files[target_path] = apply_edits_batch(modified_files[target_path], file_edits)
+        
+        # Lines of the issue's file the edits replaced, to tell which issues
+        # of a group were actually addressed (apply_edits_batch found each
+        # old_code exactly once in the original)
+        edited_lines = []
+        for old_code, _ in edits_by_file.get(file_path, []):
+            start = original_content.count("\n", 0, original_content.index(old_code)) + 1
+            edited_lines.append((start, start + old_code.rstrip("\n").count("\n")))
             
         fixed_content = modified_files[file_path] # Main file content for legacy state
         
-        print(f"  ✓ Applied {len(edits)} targeted edits in {len(modified_files)} files ({total_old_chars} → {total_new_chars} chars)")
+        kind = "targeted" if response is not None else "canonical"
+        print(f"  ✓ Applied {len(edits)} {kind} edits in {len(modified_files)} files ({total_old_chars} → {total_new_chars} chars)")
         
-    except (json.JSONDecodeError, ValueError, EditError) as e:
-        # Fallback: if JSON parsing or edit application fails, add feedback and retry
+    except (json.JSONDecodeError, ValueError, EditError, TimeoutError) as e:
+        # Fallback: if the request, JSON parsing or edit application fails, add feedback and retry
         print(f"  ⚠ Targeted edit failed: {e}")
+        del history[prompt_start:]
         
         state["retry_count"] += 1
         
         if state["retry_count"] >= state["max_retries"]:
             # Max retries reached, mark as failed
-            from debt_zero_agent.models import FailedFix, FixStatus
-            failed_fix = FailedFix(
-                issue_key=issue.key,
-                file_path=file_path,
-                status=FixStatus.VALIDATION_ERROR,
-                error_message=f"Failed to generate valid edit: {str(e)}",
-                llm_provider=state["llm_provider"],
-                iterations=state["retry_count"],
-            )
-            state["failed_fixes"].append(failed_fix)
-            state["current_issue_index"] += 1
+            _record_failure(state, f"Failed to generate valid edit: {str(e)}")
             return state
         
         # Add feedback for retry
@@ -329,18 +855,23 @@ Make sure to copy the old_code EXACTLY from the file, including all whitespace."
         return state
     
     # Store in state for validation
-    state["messages"].append(HumanMessage(content=str(messages[-1].content)))
-    state["messages"].append(response)
+    if response is not None:
+        history.append(response)
+        
+        # Tool calls must be answered before the conversation can continue on retry
+        for call in response.tool_calls:
+            history.append(ToolMessage(content="Edit applied", tool_call_id=call["id"]))
     
     # Temporarily store for validation
     state["_temp_fixed_content"] = fixed_content
     state["_temp_original_content"] = original_content
     state["_temp_modified_files"] = modified_files
+    state["_temp_edited_lines"] = edited_lines
     
     return state
 
 
-def validate_fix(state: AgentState) -> AgentState:
+def validate_fix(state: WorkerState) -> WorkerState:
     """Validate the proposed fix.
     
     Returns:
@@ -350,7 +881,7 @@ def validate_fix(state: AgentState) -> AgentState:
     if not issue:
         return state
     
-    file_path = issue.get_file_path()
+    file_path = issue.file_path
     modified_files = state.get("_temp_modified_files")
     
     # Fallback for legacy state or single file processing
@@ -378,16 +909,7 @@ def validate_fix(state: AgentState) -> AgentState:
         
         if state["retry_count"] >= state["max_retries"]:
             # Max retries reached
-            failed_fix = FailedFix(
-                issue_key=issue.key,
-                file_path=file_path,
-                status=FixStatus.VALIDATION_ERROR,
-                error_message="; ".join(validation_errors),
-                llm_provider=state["llm_provider"],
-                iterations=state["retry_count"],
-            )
-            state["failed_fixes"].append(failed_fix)
-            state["current_issue_index"] += 1
+            _record_failure(state, "; ".join(validation_errors))
         else:
             # Retries remain - provide feedback
             print(f"  ⚠ Validation failed (attempt {state['retry_count']}/{state['max_retries']})")
@@ -410,23 +932,19 @@ If you modified multiple files, ensure ALL files are syntactically valid."""
     max_ratio_exceeded = False
     suspicious_file = ""
     
-    # Get thresholds
-    max_lines_changed_threshold = state.get("max_lines_changed", 30)
-    max_change_ratio_threshold = state.get("max_change_ratio", 0.1)
+    # Get thresholds (a grouped step gets the budget of each of its issues)
+    group = _current_group(state)
+    max_lines_changed_threshold = state.get("max_lines_changed", 30) * len(group)
+    max_change_ratio_threshold = state.get("max_change_ratio", 0.1) * len(group)
     
-    combined_diff = ""
+    # Pass 1: stats only, so a rejected fix never pays for rendering diffs
+    file_diffs = {}
+    
+    # apply_fix caches the original of every file it modifies
+    file_cache = state["file_cache"]
     
     for path, content in modified_files.items():
-        # Get original content from cache (should be there from apply_fix)
-        original = state.get("file_cache", {}).get(path, "")
-        if not original:
-            # Try to read if missing (fallback)
-            try:
-                original = read_file.invoke({"repo_path": state["repo_path"], "file_path": path})
-            except Exception:
-                original = ""
-        
-        stats = generate_diff_stats(original, content)
+        stats, file_diffs[path] = compute_diff(file_cache[path], content, path)
         total_lines_changed += stats["additions"] + stats["deletions"]
         
         file_lines = stats["original_lines"]
@@ -435,14 +953,6 @@ If you modified multiple files, ensure ALL files are syntactically valid."""
         if ratio > max_change_ratio_threshold:
             max_ratio_exceeded = True
             suspicious_file = path
-            
-        # Append to combined diff
-        file_diff = generate_diff.invoke({
-            "original": original,
-            "modified": content,
-            "file_path": path,
-        })
-        combined_diff += f"\n--- {path} ---\n{file_diff}\n"
 
     # Check if changes are excessive
     if total_lines_changed > max_lines_changed_threshold or max_ratio_exceeded:
@@ -456,21 +966,13 @@ If you modified multiple files, ensure ALL files are syntactically valid."""
         state["_validation_passed"] = False
         
         if state["retry_count"] >= state["max_retries"]:
-            failed_fix = FailedFix(
-                issue_key=issue.key,
-                file_path=file_path,
-                status=FixStatus.VALIDATION_ERROR,
-                error_message=msg,
-                llm_provider=state["llm_provider"],
-                iterations=state["retry_count"],
-            )
-            state["failed_fixes"].append(failed_fix)
-            state["current_issue_index"] += 1
+            _record_failure(state, msg)
         else:
+            lines = ", ".join(str(i.line or 'N/A') for i in group)
             feedback_msg = f"""Your fix changed {total_lines_changed} lines total, which is excessive.
 {msg}
 
-The issue is on line {issue.line or 'N/A'}. Please make a MINIMAL fix."""
+The issue is on line {lines}. Please make a MINIMAL fix."""
             state["messages"].append(HumanMessage(content=feedback_msg))
         
         return state
@@ -478,53 +980,117 @@ The issue is on line {issue.line or 'N/A'}. Please make a MINIMAL fix."""
     # 3. Validation passed - Apply fixes
     state["_validation_passed"] = True
     
-    # Write all files
+    # Pass 2: render the combined diff for the report
+    combined_diff = ""
+    for path, diff_lines in file_diffs.items():
+        combined_diff += f"\n--- {path} ---\n{''.join(diff_lines)}\n"
+    
+    # Buffer the writes: the worker writes each file once, with its last fix
+    pending_writes = state.setdefault("pending_writes", {})
     for path, content in modified_files.items():
-        write_file.invoke({
-            "repo_path": state["repo_path"],
-            "file_path": path,
-            "content": content,
-            "dry_run": state["dry_run"],
-        })
-        # Update cache with new content
+        pending_writes[path] = content
+        # Update cache with new content; its old syntax tree is stale
         state["file_cache"][path] = content
+        state.get("ast_cache", {}).pop(path, None)
     
     # Record successful fix (using main file info for tracking)
-    # Note: 'diff' here is the combined diff of all changes
-    fix_result = FixResult(
-        issue_key=issue.key,
-        file_path=file_path,
-        original_content=original_content, # Main file original
-        fixed_content=state.get("file_cache", {}).get(file_path, ""),
-        diff=combined_diff,
-        status=FixStatus.SUCCESS,
-        llm_provider=state["llm_provider"],
-        iterations=state["retry_count"] + 1,
-    )
-    state["successful_fixes"].append(fix_result)
-    state["current_issue_index"] += 1
+    # Note: 'diff' here is the combined diff of all changes, shared by a group.
+    # Only the diff and a hash of the original are kept, not both file versions
+    original_sha256 = content_sha256(state["_temp_original_content"])
+    for fixed_issue in group:
+        if len(group) > 1 and not _issue_edited(fixed_issue, state.get("_temp_edited_lines", [])):
+            # Grouped answers may leave issues out; they were not fixed
+            state["failed_fixes"].append(FailedFix(
+                issue_key=fixed_issue.key,
+                file_path=fixed_issue.file_path,
+                status=FixStatus.FAILED,
+                error_message="No edit was proposed for this issue",
+                llm_provider=state["llm_provider"],
+                iterations=state["retry_count"] + 1,
+            ))
+            continue
+        fix_result = FixResult(
+            issue_key=fixed_issue.key,
+            file_path=file_path,
+            file_sha256=original_sha256,
+            diff=combined_diff,
+            status=FixStatus.SUCCESS,
+            llm_provider=state["llm_provider"],
+            iterations=state["retry_count"] + 1,
+        )
+        state["successful_fixes"].append(fix_result)
+    state["current_issue_index"] += len(group)
     
     return state
 
 
-def finalize(state: AgentState) -> AgentState:
-    """Finalize the workflow and generate report.
+def write_pending_files(state: WorkerState) -> None:
+    """Write the files fixed by a worker once it is done with them.
+    
+    Each file is written once, with its last fix, and before the worker's
+    results are reported, so a fix reported as successful is on disk. The
+    fixes of a file that could not be written are turned into failures.
+    """
+    if state["dry_run"]:
+        return
+    
+    for path, content in list(state["pending_writes"].items()):
+        result = write_file.invoke({
+            "repo_path": state["repo_path"],
+            "file_path": path,
+            "content": content,
+        })
+        if result["status"] != "error":
+            continue
+        
+        print(f"  ⚠ {result['message']}")
+        del state["pending_writes"][path]
+        unwritten = [fix for fix in state["successful_fixes"] if fix.file_path == path]
+        state["successful_fixes"] = [fix for fix in state["successful_fixes"] if fix.file_path != path]
+        state["failed_fixes"].extend(
+            FailedFix(
+                issue_key=fix.issue_key,
+                file_path=path,
+                status=FixStatus.FAILED,
+                error_message=result["message"],
+                llm_provider=fix.llm_provider,
+                iterations=fix.iterations,
+            )
+            for fix in unwritten
+        )
+
+
+def _issue_edited(issue, edited_lines: list[tuple[int, int]]) -> bool:
+    """Whether an edit replaced a line of the issue's location.
+    
+    Issues without a line cannot be located, so any edit counts for them.
+    """
+    if issue.line is None:
+        return bool(edited_lines)
+    start, end = issue.line, issue.line
+    if issue.textRange is not None:
+        start, end = issue.textRange.startLine, issue.textRange.endLine
+    return any(first <= end and start <= last for first, last in edited_lines)
+
+
+def finalize(state: AgentState) -> dict:
+    """Generate the report.
     
     Returns:
-        Final state with summary
+        Partial update with the summary message (the merged result lists
+        must not be returned again, or their reducers would duplicate them)
     """
     total_issues = len(state["issues"])
     successful = len(state["successful_fixes"])
     failed = len(state["failed_fixes"])
+    success_rate = successful / total_issues * 100 if total_issues else 0
     
     summary = f"""
 Fix Summary:
 - Total issues: {total_issues}
 - Successfully fixed: {successful}
 - Failed: {failed}
-- Success rate: {successful/total_issues*100:.1f}%
+- Success rate: {success_rate:.1f}%
 """
     
-    state["messages"].append(SystemMessage(content=summary))
-    
-    return state
+    return {"messages": [SystemMessage(content=summary)]}
@@ -1,33 +1,37 @@
 """Agent state for LangGraph workflow."""
 
+import operator
 from typing import Annotated, TypedDict
 
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
+from tree_sitter import Tree
 
 from debt_zero_agent.models import FixResult, FailedFix, SonarQubeIssue
 
 
-class AgentState(TypedDict):
-    """State maintained throughout the agent workflow."""
+class _BaseState(TypedDict):
+    """Fields shared by the run-level and per-file worker states."""
     
     # Input configuration
     repo_path: str
     issues: list[SonarQubeIssue]
     dry_run: bool
     llm_provider: str
+    sonar_url: str
+    
+    # Analyze each issue in its own LLM request before fixing it
+    cot: bool
     
     # Current processing state
     current_issue_index: int
     current_issue: SonarQubeIssue | None
+    current_group: list[SonarQubeIssue] # issues fixed together with current_issue
+    group_by_file: bool
     
     # Conversation history
     messages: Annotated[list[BaseMessage], add_messages]
     
-    # Results tracking
-    successful_fixes: list[FixResult]
-    failed_fixes: list[FailedFix]
-    
     # Retry tracking
     retry_count: int
     max_retries: int
@@ -43,9 +47,70 @@ class AgentState(TypedDict):
     _temp_original_content: str
     _temp_fixed_content: str
     _temp_modified_files: dict[str, str] # path -> content
+    _temp_edited_lines: list[tuple[int, int]] # first and last line of each edit in the issue's file
     
     # File content cache for batch processing
     file_cache: dict[str, str]
     
+    # Parsed syntax trees with the content they were parsed from, keyed by file path
+    ast_cache: dict[str, tuple[str, Tree]]
+    
+    # Formatted rule descriptions, keyed by rule key
+    rule_cache: dict[str, str]
+    
+    # Cross-reference search results, keyed by symbol name
+    search_cache: dict[str, list[dict]]
+    
+    # Batched analysis messages, keyed by issue key
+    analyses: dict[str, list[BaseMessage]]
+    
     # Model override
     model_name: str | None
+    
+    # Requests-per-minute override of the provider rate limit
+    rate_limit: int | None
+
+
+class AgentState(_BaseState):
+    """State maintained throughout the agent workflow.
+    
+    Issues touching different files are fanned out to concurrent workers,
+    so the result lists use an additive reducer to merge their outputs.
+    """
+    
+    # Results tracking
+    successful_fixes: Annotated[list[FixResult], operator.add]
+    failed_fixes: Annotated[list[FailedFix], operator.add]
+    
+    # Fixed file contents written by the workers, keyed by file path. File
+    # workers only edit their own file, so no two of them write the same
+    # path; the deferred worker runs after them, so its writes win
+    pending_writes: Annotated[dict[str, str], operator.or_]
+    
+    # Issues whose fixes span files, left by the file workers to a single
+    # worker run after them
+    deferred_issues: Annotated[list[SonarQubeIssue], operator.add]
+    
+    # Maximum number of concurrent LLM requests
+    max_concurrency: int
+    
+    # Analyze issues through the provider's Batch API
+    batch_api: bool
+    
+    # Seconds to wait for the Batch API before analyzing each issue on its own
+    batch_timeout: float
+
+
+class WorkerState(_BaseState):
+    """State of a single worker fixing the issues of one file sequentially."""
+    
+    # Results tracking
+    successful_fixes: list[FixResult]
+    failed_fixes: list[FailedFix]
+    
+    # Fixed file contents, written when the worker is done
+    pending_writes: dict[str, str]
+    
+    # Defer fixes that edit other files, which concurrent workers may be fixing
+    own_file_only: bool
+    deferred_issues: list[SonarQubeIssue]
@@ -1,29 +1,68 @@
 """Command-line interface for debt-zero-agent."""
 
 import argparse
-import json
+import asyncio
+import math
 import os
 import sys
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
 
-from debt_zero_agent.agent import AgentState, build_graph
-from debt_zero_agent.models import IssueSearchResponse
+try:
+    # Streams issues out of large dumps instead of loading the whole document
+    import ijson
+except ImportError:
+    ijson = None
 
+from debt_zero_agent.http import get_session
+from debt_zero_agent.models import IssueSearchResponse, SonarQubeIssue
 
-def load_issues(issues_path: str) -> list:
+if TYPE_CHECKING:
+    from debt_zero_agent.agent import AgentState
+
+# Issues requested per API page (more than needed, to account for filtering)
+_PAGE_SIZE = 100
+
+# Maximum number of issue pages fetched concurrently
+_MAX_PAGE_FETCHES = 8
+
+
+def iter_issues(issues_path: str) -> Iterator[SonarQubeIssue]:
+    """Iterate over the SonarQube issues of a JSON file.
+    
+    With ijson installed the issues are parsed one at a time, so memory stays
+    flat on large dumps and a caller that stops early never parses the rest.
+    
+    Args:
+        issues_path: Path to issues JSON file
+    
+    Yields:
+        SonarQubeIssue objects
+    """
+    with open(issues_path, "rb") as f:
+        if ijson is None:
+            yield from IssueSearchResponse.model_validate_json(f.read()).issues
+            return
+        
+        for raw_issue in ijson.items(f, "issues.item", use_float=True):
+            yield SonarQubeIssue.model_validate(raw_issue)
+
+
+def load_issues(issues_path: str, limit: int | None = None) -> list:
     """Load SonarQube issues from JSON file.
     
     Args:
         issues_path: Path to issues JSON file
+        limit: Maximum number of issues to load (default: all)
         
     Returns:
         List of SonarQubeIssue objects
     """
-    with open(issues_path) as f:
-        data = json.load(f)
-    
-    response = IssueSearchResponse(**data)
-    return response.issues
+    return list(islice(iter_issues(issues_path), limit))
 
 
 def fetch_issues_from_api(
@@ -43,63 +82,124 @@ def fetch_issues_from_api(
     Returns:
         List of SonarQubeIssue objects
     """
-    import requests
-    
     token = token or os.getenv("SONAR_TOKEN")
     if not token:
         print("Warning: SONAR_TOKEN not set, API may be rate-limited", file=sys.stderr)
     
     url = f"{sonar_url.rstrip('/')}/api/issues/search"
-    filtered_issues = []
-    page = 1
-    page_size = 100  # Fetch more per page to account for filtering
+    session = get_session()
     
-    # Keep fetching until we have enough non-external issues
-    while len(filtered_issues) < limit:
+    def fetch_page(page: int) -> IssueSearchResponse:
         params = {
             "componentKeys": project_key,
             "types": "CODE_SMELL,BUG,VULNERABILITY",
             "resolved": "false",
-            "ps": page_size,
+            "ps": _PAGE_SIZE,
             "p": page,
         }
+        response = session.get(
+            url,
+            params=params,
+            auth=(token, "") if token else None,
+            timeout=30,
+        )
+        response.raise_for_status()
+        # pydantic-core parses and validates the body in one pass, with no
+        # intermediate dict
+        return IssueSearchResponse.model_validate_json(response.content)
+    
+    filtered_issues = []
+    fetched_count = 0
+    
+    try:
+        # The first page tells how many pages exist; the rest are fetched concurrently
+        pages = [fetch_page(1)]
+        total_pages = math.ceil(pages[0].total / _PAGE_SIZE)
+        next_page = 2
         
-        try:
-            response = requests.get(
-                url,
-                params=params,
-                auth=(token, "") if token else None,
-                timeout=30,
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            response_obj = IssueSearchResponse(**data)
-            
-            # Filter out external rules (external_roslyn, external_*, etc.)
-            page_filtered = [
-                issue for issue in response_obj.issues
-                if not issue.rule.startswith("external_")
-            ]
-            
-            filtered_issues.extend(page_filtered)
-            
-            # Check if we've reached the end
-            total_issues = data.get("total", 0)
-            if page * page_size >= total_issues or not response_obj.issues:
-                break
-            
-            page += 1
-            
-        except Exception as e:
-            print(f"Error fetching issues from API: {e}", file=sys.stderr)
-            sys.exit(1)
+        with ThreadPoolExecutor(max_workers=_MAX_PAGE_FETCHES) as executor:
+            while True:
+                for response_obj in pages:
+                    fetched_count += len(response_obj.issues)
+                    
+                    # Filter out external rules (external_roslyn, external_*, etc.)
+                    filtered_issues.extend(
+                        issue for issue in response_obj.issues
+                        if not issue.rule.startswith("external_")
+                    )
+                
+                # Keep fetching until we have enough non-external issues
+                if len(filtered_issues) >= limit or next_page > total_pages or not response_obj.issues:
+                    break
+                
+                # Fetch as many pages as the missing issues need, at least one,
+                # scaled by the share of issues that survived filtering so far
+                # so that external-rule attrition does not cost extra rounds
+                kept_ratio = max(len(filtered_issues) / fetched_count, 1 / _MAX_PAGE_FETCHES)
+                missing_pages = math.ceil((limit - len(filtered_issues)) / (_PAGE_SIZE * kept_ratio))
+                last_page = min(total_pages, next_page + missing_pages - 1)
+                pages = list(executor.map(fetch_page, range(next_page, last_page + 1)))
+                next_page = last_page + 1
+    
+    except Exception as e:
+        print(f"Error fetching issues from API: {e}", file=sys.stderr)
+        sys.exit(1)
     
     issues = filtered_issues[:limit]  # Enforce limit
     print(f"Fetched {len(issues)} issues from {sonar_url} (excluded external rules)")
     return issues
 
 
+async def run_workflow(
+    graph,
+    initial_state: "AgentState",
+    max_concurrency: int,
+    results_file: TextIO | None = None,
+) -> tuple[int, int]:
+    """Run the workflow, reporting each file's fixes as soon as its worker finishes.
+    
+    Results are taken from the graph's streamed node updates rather than the
+    final state. A worker writes its fixed files before reporting them, so
+    each fix streamed as successful is already on disk. Each result is
+    appended to the results file as an NDJSON line and synced to disk, so
+    the results survive an interrupted run.
+    
+    Args:
+        graph: Compiled workflow graph
+        initial_state: Initial agent state
+        max_concurrency: Maximum number of concurrent LLM requests
+        results_file: Optional text file the results are appended to
+    
+    Returns:
+        Tuple of (successful fixes, failed fixes) counts
+    """
+    successful = failed = 0
+    async for update in graph.astream(
+        initial_state,
+        config={"max_concurrency": max_concurrency},
+        stream_mode="updates",
+    ):
+        for node_update in update.values():
+            if not node_update:
+                continue
+            
+            fixes = node_update.get("successful_fixes", [])
+            failures = node_update.get("failed_fixes", [])
+            for fix in fixes:
+                print(f"  ✓ {fix.issue_key}: {fix.file_path}")
+            for fix in failures:
+                print(f"  ✗ {fix.issue_key}: {fix.error_message}")
+            successful += len(fixes)
+            failed += len(failures)
+            
+            if results_file is not None and (fixes or failures):
+                results_file.writelines(f"{fix.model_dump_json()}\n" for fix in [*fixes, *failures])
+                results_file.flush()
+                os.fsync(results_file.fileno())
+    
+    return successful, failed
+
+
 def main() -> None:
     """Main entry point for the application."""
     parser = argparse.ArgumentParser(
@@ -174,6 +274,52 @@ def main() -> None:
         help="Maximum file change ratio (default: 0.1 = 10%%)",
     )
     
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent LLM requests (default: 8)",
+    )
+    
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        metavar="RPM",
+        help="Maximum LLM requests per minute (default: the provider's entry-tier limit)",
+    )
+    
+    parser.add_argument(
+        "--group-by-file",
+        action="store_true",
+        help="Fix all issues of a file with a single LLM request",
+    )
+    
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Analyze issues through the provider's Batch API (openai/anthropic; cheaper, but may take hours; implies --cot)",
+    )
+    
+    parser.add_argument(
+        "--batch-timeout",
+        type=float,
+        default=3600.0,
+        metavar="SECONDS",
+        help="Seconds to wait for the Batch API before analyzing each issue on its own (default: 3600)",
+    )
+    
+    parser.add_argument(
+        "--cot",
+        action="store_true",
+        help="Analyze each issue in a separate LLM request before fixing it (default: analyze and fix in one request)",
+    )
+    
+    parser.add_argument(
+        "--results",
+        metavar="PATH",
+        help="Append each fix result to this file as NDJSON, as soon as its file is done",
+    )
+    
     args = parser.parse_args()
     
     # Validate that either --issues or --fetch-issues is provided
@@ -198,12 +344,9 @@ def main() -> None:
                 limit=args.limit,
             )
         else:
-            issues = load_issues(args.issues)
-            print(f"Loaded {len(issues)} issues from {args.issues}")
-            # Apply limit to loaded issues too
-            if len(issues) > args.limit:
-                print(f"Limiting to first {args.limit} issues")
-                issues = issues[:args.limit]
+            # Apply limit to loaded issues too, parsing no further than needed
+            issues = load_issues(args.issues, limit=args.limit)
+            print(f"Loaded {len(issues)} issues from {args.issues} (limit: {args.limit})")
     except Exception as e:
         print(f"Error loading issues: {e}", file=sys.stderr)
         sys.exit(1)
@@ -212,17 +355,19 @@ def main() -> None:
         print("No issues to fix!")
         return
     
-    # Batch issues by file and sort bottom-up
+    # The agent pulls in LangGraph and the LLM clients, which take seconds to
+    # import, so --help, bad arguments and empty runs never load it
+    from debt_zero_agent.agent import build_graph
     from debt_zero_agent.agent.nodes import batch_issues_by_file
     
+    # Batch issues by file and sort bottom-up
     print(f"Batching {len(issues)} issues by file...")
     batched_issues = batch_issues_by_file(issues)
     
     # Show batching summary
-    from collections import defaultdict
     by_file = defaultdict(int)
     for issue in batched_issues:
-        by_file[issue.get_file_path()] += 1
+        by_file[issue.file_path] += 1
     
     print(f"Issues grouped into {len(by_file)} files:")
     for file_path, count in sorted(by_file.items()):
@@ -235,18 +380,30 @@ def main() -> None:
         "issues": batched_issues,
         "dry_run": args.dry_run,
         "llm_provider": args.llm,
+        "sonar_url": args.sonar_url,
         "current_issue_index": 0,
         "current_issue": None,
         "messages": [],
         "successful_fixes": [],
         "failed_fixes": [],
+        "pending_writes": {},
         "retry_count": 0,
         "max_retries": args.max_retries,
         "max_lines_changed": args.max_lines_changed,
         "max_change_ratio": args.max_change_ratio,
         "_validation_passed": False,
         "file_cache": {},
+        "rule_cache": {},
+        "search_cache": {},
+        "analyses": {},
         "model_name": args.model,
+        "max_concurrency": args.max_concurrency,
+        "rate_limit": args.rate_limit,
+        "batch_api": args.batch_api,
+        "batch_timeout": args.batch_timeout,
+        "group_by_file": args.group_by_file,
+        # Batch API jobs run the separate analysis step
+        "cot": args.cot or args.batch_api,
     }
     
     # Build and run the workflow
@@ -254,27 +411,27 @@ def main() -> None:
     print(f"Mode: {'DRY RUN' if args.dry_run else 'LIVE'}\n")
     
     graph = build_graph()
+    results_file = open(args.results, "a", encoding="utf-8") if args.results else None
     
     try:
-        final_state = graph.invoke(initial_state)
+        successful, failed = asyncio.run(run_workflow(
+            graph,
+            initial_state,
+            args.max_concurrency,
+            results_file,
+        ))
         
         # Print results
         print("\n" + "="*60)
         print("RESULTS")
         print("="*60)
         
-        print(f"\nSuccessful fixes: {len(final_state['successful_fixes'])}")
-        for fix in final_state["successful_fixes"]:
-            print(f"  ✓ {fix.issue_key}: {fix.file_path}")
+        print(f"\nSuccessful fixes: {successful}")
+        print(f"Failed fixes: {failed}")
+        if args.results:
+            print(f"Results written to {args.results}")
         
-        print(f"\nFailed fixes: {len(final_state['failed_fixes'])}")
-        for fix in final_state["failed_fixes"]:
-            print(f"  ✗ {fix.issue_key}: {fix.error_message}")
-        
-        success_rate = (
-            len(final_state["successful_fixes"]) / len(issues) * 100
-            if issues else 0
-        )
+        success_rate = successful / len(issues) * 100 if issues else 0
         print(f"\nSuccess rate: {success_rate:.1f}%")
         
     except KeyboardInterrupt:
@@ -283,6 +440,9 @@ def main() -> None:
     except Exception as e:
         print(f"\nError running workflow: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if results_file is not None:
+            results_file.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""Shared HTTP session for SonarQube API calls."""
+
+from functools import lru_cache
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from debt_zero_agent import jsonlib
+
+# Keep-alive connections kept per host, enough for concurrent page fetches
+_POOL_SIZE = 20
+
+# Transient failures are retried with exponential backoff (0.3s, 0.6s, 1.2s),
+# honoring the server's Retry-After header on 429 and 503 responses
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 502, 503, 504],
+    raise_on_status=False,
+)
+
+
+@lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Get the process-wide HTTP session.
+    
+    Reusing one session keeps connections alive across requests, so only the
+    first request to a server pays for the TCP and TLS handshakes. Rate-limited
+    and gateway errors are retried by the adapter. The session carries no
+    credentials; callers pass `auth` per request.
+    
+    Returns:
+        Shared requests session with a pooled adapter
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=_POOL_SIZE,
+        pool_maxsize=_POOL_SIZE,
+        max_retries=_RETRY,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def decode_json(response: requests.Response) -> Any:
+    """Decode a JSON response body, using orjson when it is installed.
+    
+    Args:
+        response: Response with a JSON body
+    
+    Returns:
+        Decoded JSON value
+    """
+    return jsonlib.loads(response.content)
@@ -0,0 +1,47 @@
+"""JSON encoding and decoding, using orjson when it is installed.
+
+orjson parses bytes directly and is several times faster than the stdlib on
+the deeply nested, string-keyed documents SonarQube and the LLM providers
+return. Its JSONDecodeError subclasses the stdlib's, so callers can keep
+catching `json.JSONDecodeError` either way.
+"""
+
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    import json
+    
+    orjson = None
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a JSON document.
+    
+    Args:
+        data: Encoded JSON document
+    
+    Returns:
+        Decoded JSON value
+    
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON
+    """
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON.
+    
+    Args:
+        obj: JSON-serializable value
+    
+    Returns:
+        Encoded JSON document
+    """
+    if orjson is None:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+    return orjson.dumps(obj)
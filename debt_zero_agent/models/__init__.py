@@ -1,6 +1,12 @@
 """Models for SonarQube issues and fix results."""
 
-from debt_zero_agent.models.fix import FailedFix, FixResult, FixStatus
+from debt_zero_agent.models.fix import (
+    FailedFix,
+    FixResult,
+    FixStatus,
+    ProposeEdit,
+    content_sha256,
+)
 from debt_zero_agent.models.issue import (
     IssueSearchResponse,
     SonarQubeIssue,
@@ -14,4 +20,6 @@ __all__ = [
     "FixStatus",
     "FixResult",
     "FailedFix",
+    "ProposeEdit",
+    "content_sha256",
 ]
@@ -1,7 +1,14 @@
 """Models for fix results and agent state."""
 
+import hashlib
+from collections.abc import Sequence
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+
+def content_sha256(content: str) -> str:
+    """Hash file content, as recorded in FixResult.file_sha256."""
+    return hashlib.sha256(content.encode()).hexdigest()
 
 
 class FixStatus(str, Enum):
@@ -16,22 +23,95 @@ class FixStatus(str, Enum):
 class FixResult(BaseModel):
     """Result of successfully fixing an issue."""
 
+    # Results are immutable records; freezing also makes them hashable
+    model_config = ConfigDict(frozen=True)
+
     issue_key: str = Field(..., description="SonarQube issue key")
     file_path: str = Field(..., description="Path to the fixed file")
-    original_content: str = Field(..., description="Original file content")
-    fixed_content: str = Field(..., description="Modified file content")
+    file_sha256: str = Field(..., description="SHA-256 of the original file content")
     diff: str = Field(..., description="Unified diff of changes")
     status: FixStatus = Field(FixStatus.SUCCESS, description="Fix status")
     llm_provider: str = Field(..., description="LLM used (openai/anthropic)")
     iterations: int = Field(1, description="Number of fix attempts")
 
+    def materialize(self, repo_root: str, results: Sequence["FixResult"] = ()) -> tuple[str, str]:
+        """Recover the original and fixed file content from disk and the diffs.
+        
+        Only the diffs are kept, not the versions of the file. Each fix of a
+        file is diffed against the previous one, so the file's fixes are
+        chained: the file on disk is taken as the run's original (dry runs)
+        and the fixes up to this one are replayed, or else as the version
+        after the last fix, and the fixes back to this one are undone.
+        
+        Args:
+            repo_root: Absolute path to the repository root
+            results: The run's successful fixes in the order they were made,
+                needed when the file was fixed more than once
+        
+        Returns:
+            Tuple of (original content, fixed content)
+        
+        Raises:
+            ValueError: If the file changed since the fix beyond the run's diffs
+        """
+        # Imported here so loading the models does not pull in LangChain
+        from debt_zero_agent.tools import read_file
+        
+        # The fixes touching the file, once per diff (grouped fixes share one)
+        header = f"--- a/{self.file_path}\n"
+        chain = []
+        for result in results or [self]:
+            if result.file_path != self.file_path and header not in result.diff:
+                continue
+            if not chain or chain[-1].diff != result.diff:
+                chain.append(result)
+        
+        position = next((i for i, result in enumerate(chain) if result.diff == self.diff), None)
+        if position is None:
+            raise ValueError(f"{self.issue_key} is not among the given results")
+        
+        current = read_file.invoke({"repo_path": repo_root, "file_path": self.file_path})
+        try:
+            return self._replay(current, chain[:position + 1], reverse=False)
+        except ValueError:
+            return self._replay(current, chain[position:], reverse=True)
+
+    def _replay(self, content: str, chain: list["FixResult"], reverse: bool) -> tuple[str, str]:
+        """Apply (or undo, last first) the diffs of a chain of fixes of this file.
+        
+        Returns:
+            Tuple of (original content, fixed content) of the chain's last
+            fix (first when undoing)
+        """
+        from debt_zero_agent.tools import apply_diff
+        
+        for result in reversed(chain) if reverse else chain:
+            patched = apply_diff(content, result.diff, self.file_path, reverse=reverse)
+            original, fixed = (patched, content) if reverse else (content, patched)
+            
+            # Fixes of other files record their own file's hash
+            if result.file_path == self.file_path and content_sha256(original) != result.file_sha256:
+                raise ValueError(f"{self.file_path} changed since the fix of {result.issue_key}")
+            content = patched
+        return original, fixed
+
 
 class FailedFix(BaseModel):
     """Result of a failed fix attempt."""
 
+    model_config = ConfigDict(frozen=True)
+
     issue_key: str = Field(..., description="SonarQube issue key")
     file_path: str = Field(..., description="Path to the file")
     status: FixStatus = Field(..., description="Failure reason")
     error_message: str = Field(..., description="Error details")
     llm_provider: str = Field(..., description="LLM used (openai/anthropic)")
     iterations: int = Field(0, description="Number of attempts made")
+
+
+class ProposeEdit(BaseModel):
+    """Propose one search-and-replace edit. Call once per edit."""
+    
+    file: str | None = Field(None, description="Path of the file to modify (defaults to the issue's file)")
+    old_code: str = Field(..., description="Exact lines to replace, copied character-for-character from the file")
+    new_code: str = Field(..., description="Replacement lines")
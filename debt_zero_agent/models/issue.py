@@ -1,11 +1,15 @@
 """Pydantic models for SonarQube API responses."""
 
-from pydantic import BaseModel, Field
+from functools import cached_property
+
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class TextRange(BaseModel):
     """Location information for an issue in the source code."""
 
+    model_config = ConfigDict(frozen=True)
+
     startLine: int = Field(..., description="Starting line number (1-indexed)")
     endLine: int = Field(..., description="Ending line number (1-indexed)")
     startOffset: int | None = Field(None, description="Starting character offset")
@@ -15,6 +19,9 @@ class TextRange(BaseModel):
 class SonarQubeIssue(BaseModel):
     """Represents a single issue from SonarQube."""
 
+    # Issues are never modified; freezing also makes them hashable
+    model_config = ConfigDict(frozen=True)
+
     key: str = Field(..., description="Unique issue identifier")
     rule: str = Field(..., description="Rule ID (e.g., 'python:S1234')")
     severity: str = Field(
@@ -27,16 +34,25 @@ class SonarQubeIssue(BaseModel):
     type: str = Field(
         ..., description="Issue type: BUG, VULNERABILITY, CODE_SMELL"
     )
-    tags: list[str] = Field(default_factory=list, description="Issue tags")
+    tags: tuple[str, ...] = Field((), description="Issue tags")
+
+    @property
+    def file_path(self) -> str:
+        """File path extracted from the component string.
+        
+        Not cached, so copies with another component get their own path.
+        
+        SonarQube component format: 'project_key:path/to/file.py'
+        """
+        _, separator, path = self.component.partition(":")
+        return path if separator else self.component
 
     def get_file_path(self) -> str:
         """Extract file path from component string.
         
         SonarQube component format: 'project_key:path/to/file.py'
         """
-        if ":" in self.component:
-            return self.component.split(":", 1)[1]
-        return self.component
+        return self.file_path
 
 
 class IssueSearchResponse(BaseModel):
@@ -49,6 +65,21 @@ class IssueSearchResponse(BaseModel):
     p: int = Field(1, description="Current page number")
     ps: int = Field(100, description="Page size")
 
+    @cached_property
+    def by_type(self) -> dict[str, list[SonarQubeIssue]]:
+        """Issues grouped by type, indexed once on first use.
+        
+        The index is not updated if the issues list is modified afterwards.
+        """
+        index: dict[str, list[SonarQubeIssue]] = {}
+        for issue in self.issues:
+            index.setdefault(issue.type, []).append(issue)
+        return index
+
     def filter_by_type(self, *types: str) -> list[SonarQubeIssue]:
-        """Filter issues by type (e.g., BUG, VULNERABILITY, CODE_SMELL)."""
-        return [issue for issue in self.issues if issue.type in types]
+        """Filter issues by type (e.g., BUG, VULNERABILITY, CODE_SMELL).
+        
+        Issues keep the order the API returned them in.
+        """
+        wanted = set(types)
+        return [issue for issue in self.issues if issue.type in wanted]
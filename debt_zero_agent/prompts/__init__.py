@@ -1,7 +1,10 @@
 """Prompt templates for agent."""
 
 from debt_zero_agent.prompts.templates import (
+    ANALYZE_AND_FIX_PROMPT,
     ANALYZE_ISSUE_PROMPT,
+    GROUPED_FIX_PROMPT,
+    ISSUE_DETAILS,
     SYSTEM_PROMPT,
     TARGETED_FIX_PROMPT,
     VALIDATION_FEEDBACK_PROMPT,
@@ -9,7 +12,10 @@ from debt_zero_agent.prompts.templates import (
 
 __all__ = [
     "SYSTEM_PROMPT",
+    "ISSUE_DETAILS",
     "ANALYZE_ISSUE_PROMPT",
+    "ANALYZE_AND_FIX_PROMPT",
     "TARGETED_FIX_PROMPT",
+    "GROUPED_FIX_PROMPT",
     "VALIDATION_FEEDBACK_PROMPT",
 ]
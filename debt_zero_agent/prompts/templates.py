@@ -1,6 +1,6 @@
 """Prompt templates for agent interactions."""
 
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
 # System prompt for the fix agent
 SYSTEM_PROMPT = """You are an expert code quality engineer specializing in fixing SonarQube issues.
@@ -20,12 +20,40 @@ You have access to tools for:
 Always provide clear explanations for your fixes."""
 
 
-# Prompt for analyzing an issue
-ANALYZE_ISSUE_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("human", """Analyze this SonarQube issue:
-
-**Issue Key**: {issue_key}
+class _ChatPrompt:
+    """Chat prompt made of the fixed system prompt and a human message template.
+    
+    The system message is built once and the human message is formatted with a
+    single `str.format` call, instead of re-parsing a LangChain template for
+    every issue. `format_messages` keeps the `ChatPromptTemplate` interface.
+    """
+    
+    def __init__(self, human_template: str):
+        """Initialize the prompt.
+        
+        Args:
+            human_template: `str.format` template of the human message
+        """
+        self.system_message = SystemMessage(content=SYSTEM_PROMPT)
+        self.human_template = human_template
+    
+    def format_messages(self, **kwargs) -> list[BaseMessage]:
+        """Format the prompt messages.
+        
+        Args:
+            **kwargs: Values of the human message template fields
+        
+        Returns:
+            System message followed by the formatted human message
+        """
+        return [
+            self.system_message,
+            HumanMessage(content=self.human_template.format(**kwargs)),
+        ]
+
+
+# Details of one issue, shared by the analysis prompts
+ISSUE_DETAILS = """**Issue Key**: {issue_key}
 **Rule**: {rule}
 **Severity**: {severity}
 **Type**: {type}
@@ -39,7 +67,13 @@ ANALYZE_ISSUE_PROMPT = ChatPromptTemplate.from_messages([
 - Parent type: {parent_type}
 
 **Cross-references** (usages in other files):
-{cross_references}
+{cross_references}"""
+
+
+# Prompt for analyzing an issue
+ANALYZE_ISSUE_PROMPT = _ChatPrompt("""Analyze this SonarQube issue:
+
+""" + ISSUE_DETAILS + """
 
 Please analyze this issue step-by-step:
 1. **Understanding**: What is the root cause of the issue?
@@ -47,16 +81,11 @@ Please analyze this issue step-by-step:
 3. **Strategy**: How should it be fixed safely? Consider side effects on cross-references.
 4. **Proposal**: Describe the fix in detail.
 
-Then propose a concrete fix logic."""),
-])
-
-
+Then propose a concrete fix logic.""")
 
 
 # Prompt for validation feedback
-VALIDATION_FEEDBACK_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("human", """The proposed fix has validation errors:
+VALIDATION_FEEDBACK_PROMPT = _ChatPrompt("""The proposed fix has validation errors:
 
 {validation_errors}
 
@@ -70,25 +99,12 @@ VALIDATION_FEEDBACK_PROMPT = ChatPromptTemplate.from_messages([
 {fixed_code}
 ```
 
-Please revise the fix to address these validation errors."""),
-])
-
-
-# Prompt for targeted fix (search-and-replace format)
-TARGETED_FIX_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("human", """Based on the previous analysis, generate a targeted fix for this issue.
-
-**Issue**: {message}
-**File**: {file_path}
-**Line**: {line}
+Please revise the fix to address these validation errors.""")
 
-**File content**:
-```
-{file_content}
-```
 
-Return your fix as a JSON object with the following structure:
+# Output format shared by the targeted fix prompts (search-and-replace edits)
+_EDIT_FORMAT_INSTRUCTIONS = """If the ProposeEdit tool is available, call it once per edit (in parallel for multiple edits).
+Otherwise, return your fix as a JSON object with the following structure:
 {{
   "edits": [
     {{
@@ -106,5 +122,56 @@ CRITICAL RULES:
 4. **NO PLACEHOLDERS**: Do NOT use `// ...` or `...` to skip code in `old_code`. You must provide the full block to be replaced.
 5. **MULTI-FILE**: If necessary, include multiple objects in the "edits" array.
 6. **JSON ONLY**: Return strictly valid JSON. No markdown fencing if possible, but code blocks are accepted.
-"""),
-])
+"""
+
+
+# Prompt for targeted fix (search-and-replace format)
+TARGETED_FIX_PROMPT = _ChatPrompt("""Based on the previous analysis, generate a targeted fix for this issue.
+
+**Issue**: {message}
+**File**: {file_path}
+**Line**: {line}
+
+**File content** (lines {start_line}-{end_line} of {total_lines}):
+```
+{file_content}
+```
+
+""" + _EDIT_FORMAT_INSTRUCTIONS)
+
+
+# Prompt for fixing all issues of one file in a single targeted fix
+GROUPED_FIX_PROMPT = _ChatPrompt("""Based on the previous analyses, generate one targeted fix that resolves ALL of these issues.
+
+**Issues**:
+{issues}
+
+**File**: {file_path}
+
+**File content** (lines {start_line}-{end_line} of {total_lines}):
+```
+{file_content}
+```
+
+Fix every issue listed above. Use one edit per issue unless two issues touch the same lines.
+
+""" + _EDIT_FORMAT_INSTRUCTIONS)
+
+
+# Prompt for analyzing and fixing issues in a single request
+ANALYZE_AND_FIX_PROMPT = _ChatPrompt("""Analyze and fix these SonarQube issues in a single step.
+
+{issues}
+
+**File**: {file_path}
+
+**File content** (lines {start_line}-{end_line} of {total_lines}):
+```
+{file_content}
+```
+
+For each issue, first reason briefly about its root cause, why it is a problem, and how to fix it safely given its cross-references.
+When answering with JSON, put this reasoning in an "analysis" string field before "edits".
+Then fix every issue listed above. Use one edit per issue unless two issues touch the same lines.
+
+""" + _EDIT_FORMAT_INSTRUCTIONS)
@@ -1,11 +1,20 @@
 """SonarQube API client for fetching rule details."""
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-import requests
 from pydantic import BaseModel
 
+from debt_zero_agent.http import decode_json, get_session
+
+# Maximum number of rules fetched concurrently by get_rules_bulk
+_BULK_WORKERS = 16
+
+# Fetched rules, keyed by (server URL, rule key); shared by all clients
+# since rule descriptions do not change during a run
+_RULE_CACHE: dict[tuple[str, str], "RuleDescription"] = {}
+
 
 class RuleDescription(BaseModel):
     """SonarQube rule details."""
@@ -30,28 +39,41 @@ class SonarQubeClient:
         """
         self.base_url = base_url.rstrip("/")
         self.token = token or os.getenv("SONAR_TOKEN")
-        self.session = requests.Session()
-        
-        if self.token:
-            self.session.auth = (self.token, "")
+        self.session = get_session()
+        self.auth = (self.token, "") if self.token else None
 
     def get_rule(self, rule_key: str) -> Optional[RuleDescription]:
         """Fetch rule details from SonarQube.
         
+        Rules repeat across issues, so each rule is requested once per server
+        and process. Failed lookups and rules without a description are not
+        cached, as they are likely transient.
+        
         Args:
             rule_key: Rule key (e.g., 'python:S1481')
             
         Returns:
             RuleDescription or None if not found
         """
+        cache_key = (self.base_url, rule_key)
+        rule = _RULE_CACHE.get(cache_key)
+        if rule is None:
+            rule = self._fetch_rule(rule_key)
+            if rule is not None and rule.htmlDesc:
+                _RULE_CACHE[cache_key] = rule
+        return rule
+
+    def _fetch_rule(self, rule_key: str) -> Optional[RuleDescription]:
+        """Request rule details from the SonarQube API."""
         try:
             response = self.session.get(
                 f"{self.base_url}/api/rules/show",
                 params={"key": rule_key},
+                auth=self.auth,
                 timeout=10,
             )
             response.raise_for_status()
-            data = response.json()
+            data = decode_json(response)
             
             rule_data = data.get("rule", {})
             return RuleDescription(
@@ -65,6 +87,19 @@ class SonarQubeClient:
             print(f"Warning: Could not fetch rule {rule_key}: {e}")
             return None
 
+    def get_rules_bulk(self, rule_keys: list[str]) -> dict[str, Optional[RuleDescription]]:
+        """Fetch the details of several rules concurrently.
+        
+        Args:
+            rule_keys: Rule keys (duplicates are fetched once)
+        
+        Returns:
+            RuleDescription (or None if not found) keyed by rule key
+        """
+        unique_keys = list(dict.fromkeys(rule_keys))
+        with ThreadPoolExecutor(max_workers=_BULK_WORKERS) as executor:
+            return dict(zip(unique_keys, executor.map(self.get_rule, unique_keys)))
+
     def search_rules(self, language: str = "py", query: str = "") -> list[RuleDescription]:
         """Search for rules.
         
@@ -83,10 +118,11 @@ class SonarQubeClient:
                     "q": query,
                     "ps": 100,
                 },
+                auth=self.auth,
                 timeout=10,
             )
             response.raise_for_status()
-            data = response.json()
+            data = decode_json(response)
             
             rules = []
             for rule_data in data.get("rules", []):
@@ -1,9 +1,9 @@
 """Tools for file operations and code search."""
 
 from debt_zero_agent.tools.code_search import search_code
-from debt_zero_agent.tools.diff_tool import generate_diff, generate_diff_stats
+from debt_zero_agent.tools.diff_tool import apply_diff, compute_diff, generate_diff, generate_diff_stats
 from debt_zero_agent.tools.file_reader import read_file, read_file_lines
-from debt_zero_agent.tools.file_writer import EditError, apply_edit, write_file
+from debt_zero_agent.tools.file_writer import EditError, apply_edit, apply_edits_batch, write_file
 
 __all__ = [
     "read_file",
@@ -11,7 +11,10 @@ __all__ = [
     "search_code",
     "write_file",
     "apply_edit",
+    "apply_edits_batch",
     "EditError",
     "generate_diff",
     "generate_diff_stats",
+    "compute_diff",
+    "apply_diff",
 ]
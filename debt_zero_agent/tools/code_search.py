@@ -1,12 +1,35 @@
 """Code search tool using ripgrep for fast searching."""
 
 import json
+import mmap
+import re
 import subprocess
+import threading
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass
+from fnmatch import fnmatch
+from functools import lru_cache
 from pathlib import Path
 
 from langchain_core.tools import tool
 
+try:
+    # Scans the fallback search with a compiled automaton instead of backtracking
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+from debt_zero_agent import jsonlib
+
+# Results returned per search; ripgrep is stopped once this many matches are in
+_MAX_RESULTS = 50
+
+# Seconds a search may run before it is killed
+_SEARCH_TIMEOUT = 10
+
+# Leading bytes checked for NUL to detect binary files
+_BINARY_SNIFF_BYTES = 1024
+
 
 @dataclass
 class SearchResult:
@@ -23,7 +46,7 @@ class SearchResult:
 def search_code(repo_path: str, query: str, file_patterns: list[str] | None = None) -> list[dict]:
     """Search for code patterns in the repository using ripgrep.
     
-    Uses ripgrep (rg) for fast searching, falls back to grep if not available.
+    Uses ripgrep (rg) for fast searching, falls back to Python's re if not available.
     
     Args:
         repo_path: Absolute path to the repository root
@@ -47,38 +70,60 @@ def search_code(repo_path: str, query: str, file_patterns: list[str] | None = No
         cmd.append(query)
         cmd.append(str(repo))
         
-        result = subprocess.run(
+        proc = subprocess.Popen(
             cmd,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
             text=True,
-            timeout=10,
         )
-        
-        if result.returncode in [0, 1]:  # 0 = found, 1 = not found
-            return _parse_ripgrep_output(result.stdout)
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        # Ripgrep not available or timed out, fall back to grep
+    except FileNotFoundError:
+        # Ripgrep not available, fall back to an in-process search
         pass
+    else:
+        # Parse the output as it streams in, so it is never buffered whole
+        timer = threading.Timer(_SEARCH_TIMEOUT, proc.kill)
+        timer.start()
+        results = []
+        try:
+            results = _parse_ripgrep_output(proc.stdout)
+        finally:
+            timer.cancel()
+            # Stop ripgrep early once enough matches are in; otherwise it
+            # has written all its output and exits on its own
+            stopped_early = len(results) >= _MAX_RESULTS
+            if stopped_early:
+                proc.terminate()
+            proc.stdout.close()
+            returncode = proc.wait()
+        
+        # 0 = found, 1 = not found; otherwise it failed or timed out, unless
+        # it was stopped here
+        if stopped_early or returncode in [0, 1]:
+            return results
     
-    # Fallback to grep
+    # Fallback to Python's re
     return _grep_fallback(repo, query, file_patterns)
 
 
-def _parse_ripgrep_output(output: str) -> list[dict]:
-    """Parse ripgrep JSON output."""
+def _parse_ripgrep_output(lines: Iterable[str]) -> list[dict]:
+    """Parse ripgrep JSON output line by line.
+    
+    Stops reading after the first 50 matches and their trailing context.
+    """
     results = []
-    current_match = {}
     context_before = []
-    context_after = []
     
-    for line in output.strip().split("\n"):
-        if not line:
+    for line in lines:
+        if not line.strip():
             continue
         
         try:
-            data = json.loads(line)
+            data = jsonlib.loads(line)
             msg_type = data.get("type")
             
+            if len(results) >= _MAX_RESULTS and msg_type != "context":
+                break
+            
             if msg_type == "match":
                 match_data = data["data"]
                 results.append({
@@ -96,6 +141,8 @@ def _parse_ripgrep_output(output: str) -> list[dict]:
                 # Add to previous match's context_after if we have matches
                 if results and len(results[-1]["context_after"]) < 2:
                     results[-1]["context_after"].append(context_line)
+                elif len(results) >= _MAX_RESULTS:
+                    break
                 else:
                     # Otherwise, it's context before the next match
                     if len(context_before) < 2:
@@ -103,50 +150,138 @@ def _parse_ripgrep_output(output: str) -> list[dict]:
         except (json.JSONDecodeError, KeyError):
             continue
     
-    return results[:50]
+    return results
 
 
 def _grep_fallback(repo: Path, query: str, file_patterns: list[str] | None) -> list[dict]:
-    """Fallback to grep if ripgrep is not available."""
-    results = []
+    """Search in-process if ripgrep is not available.
     
-    try:
-        cmd = ["grep", "-rn", "-E", query, str(repo)]
-        
-        # Add file patterns
-        if file_patterns:
-            for pattern in file_patterns:
-                cmd.extend(["--include", pattern])
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
+    Files are memory-mapped and scanned in place, with Hyperscan when it is
+    installed or Python's re otherwise, so only the matched lines are ever
+    copied into Python strings. Like ripgrep, hidden files and directories
+    and binary files are skipped.
+    """
+    find_matches = _compile_query(query)
+    if find_matches is None:
+        return []
+    
+    results = []
+    for path in repo.rglob("*"):
+        relative_path = path.relative_to(repo)
+        if any(part.startswith(".") for part in relative_path.parts):
+            continue
+        if file_patterns and not any(fnmatch(path.name, p) for p in file_patterns):
+            continue
         
-        for line in result.stdout.strip().split("\n")[:50]:
-            if not line:
+        try:
+            if not path.is_file():
                 continue
-            
-            parts = line.split(":", 2)
-            if len(parts) >= 3:
-                file_path = parts[0]
-                try:
-                    line_number = int(parts[1])
-                    line_content = parts[2]
-                    
-                    results.append({
-                        "file_path": str(Path(file_path).relative_to(repo)),
-                        "line_number": line_number,
-                        "line_content": line_content,
-                        "context_before": [],
-                        "context_after": [],
-                    })
-                except (ValueError, OSError):
+            with open(path, "rb") as f:
+                if b"\x00" in f.read(_BINARY_SNIFF_BYTES):
                     continue
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        pass
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for line_number, line_content in _matched_lines(mm, find_matches(mm)):
+                        results.append({
+                            "file_path": str(relative_path),
+                            "line_number": line_number,
+                            "line_content": line_content,
+                            "context_before": [],
+                            "context_after": [],
+                        })
+                        if len(results) >= _MAX_RESULTS:
+                            return results
+        except (OSError, ValueError):
+            # Unreadable or empty files cannot be mapped
+            continue
     
     return results
 
+
+def _compile_query(query: str) -> Callable[[mmap.mmap], Iterable[int]] | None:
+    """Compile a search query for the fallback search.
+    
+    Hyperscan is used when it is installed and supports the pattern;
+    otherwise the query is compiled with Python's re. Either way, matches
+    do not overlap (see `_hyperscan_offsets`). Compiled Hyperscan
+    databases are cached across searches, each search scanning with its
+    own scratch space so concurrent searches can share a database.
+    
+    Returns:
+        Function yielding the sorted start offsets of the matches in a file,
+        or None if the query is not a valid pattern
+    """
+    if hyperscan is not None:
+        database = _hyperscan_database(query)
+        if database is not None:
+            scratch = hyperscan.Scratch(database)
+            return lambda mm: _hyperscan_offsets(database, scratch, mm)
+    
+    # Python's re keeps its own cache of compiled patterns
+    try:
+        pattern = re.compile(query.encode(), re.MULTILINE)
+    except re.error:
+        return None
+    return lambda mm: (match.start() for match in pattern.finditer(mm))
+
+
+@lru_cache(maxsize=256)
+def _hyperscan_database(query: str):
+    """Compile a query into a Hyperscan database, or None if unsupported."""
+    database = hyperscan.Database()
+    try:
+        database.compile(
+            expressions=[query.encode()],
+            flags=[hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SOM_LEFTMOST],
+        )
+    except hyperscan.error:
+        # Unsupported syntax such as backreferences, or an empty match
+        return None
+    return database
+
+
+def _hyperscan_offsets(database, scratch, mm: mmap.mmap) -> list[int]:
+    """Scan a mapped file with a Hyperscan database.
+    
+    Hyperscan reports every match, overlapping ones included, while re
+    resumes its search after each match. To report the same lines as re,
+    matches starting inside an earlier one are dropped, taking the longest
+    match from each start as re's greedy one. Patterns with lazy
+    quantifiers can still match differently, which only changes the lines
+    reported when a match spans lines.
+    """
+    ends: dict[int, int] = {}
+    
+    def on_match(pattern_id, start, end, flags, context):
+        ends[start] = max(end, ends.get(start, end))
+    
+    database.scan(mm, match_event_handler=on_match, scratch=scratch)
+    
+    # Matches are reported in order of their end offset
+    offsets = []
+    last_end = 0
+    for start in sorted(ends):
+        if start >= last_end:
+            offsets.append(start)
+            last_end = ends[start]
+    return offsets
+
+
+def _matched_lines(mm: mmap.mmap, offsets: Iterable[int]) -> Iterator[tuple[int, str]]:
+    """Yield the 1-based number and text of each line containing a match."""
+    line_number = 1
+    position = 0
+    last_line = 0
+    
+    for offset in offsets:
+        # Count the newlines since the previous match only
+        line_number += mm[position:offset].count(b"\n")
+        position = offset
+        if line_number == last_line:
+            continue
+        last_line = line_number
+        
+        line_start = mm.rfind(b"\n", 0, position) + 1
+        line_end = mm.find(b"\n", position)
+        if line_end == -1:
+            line_end = len(mm)
+        yield line_number, mm[line_start:line_end].decode(errors="replace").rstrip("\r")
@@ -1,15 +1,28 @@
-"""Diff generation tool using native Unix diff command."""
+"""Diff generation with difflib, computed in-process."""
 
-import subprocess
-import tempfile
-from pathlib import Path
+import difflib
+import re
+from collections.abc import Iterator
+from functools import lru_cache
 
 from langchain_core.tools import tool
 
+try:
+    # C implementation of the matching loop; same results, much faster on long files
+    from cdifflib import CSequenceMatcher as _SequenceMatcher
+except ImportError:
+    from difflib import SequenceMatcher as _SequenceMatcher
+
+# Hunk header of a unified diff: old and new start line and optional length
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# Marker following a diff line that has no newline in the file
+_NO_NEWLINE_MARKER = "\\ No newline at end of file\n"
+
 
 @tool
 def generate_diff(original: str, modified: str, file_path: str = "file") -> str:
-    """Generate unified diff using native Unix diff command.
+    """Generate unified diff of two versions of a file.
     
     Args:
         original: Original file content
@@ -19,100 +32,230 @@ def generate_diff(original: str, modified: str, file_path: str = "file") -> str:
     Returns:
         Unified diff as string
     """
-    # Write content to temporary files
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.tmp', delete=False) as f1:
-        f1.write(original)
-        temp1 = f1.name
-    
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.tmp', delete=False) as f2:
-        f2.write(modified)
-        temp2 = f2.name
+    _, diff_lines = compute_diff(original, modified, file_path)
+    return "".join(diff_lines)
+
+
+def generate_diff_stats(original: str, modified: str, diff: str | None = None) -> dict:
+    """Generate statistics about the diff.
     
-    try:
-        # Run diff command
-        result = subprocess.run(
-            ['diff', '-u', '--label', f'a/{file_path}', '--label', f'b/{file_path}', temp1, temp2],
-            capture_output=True,
-            text=True,
-        )
+    Args:
+        original: Original content
+        modified: Modified content
+        diff: Unified diff of the two versions, if already generated; its
+            lines are counted instead of diffing the contents again
         
-        # diff returns 0 if no changes, 1 if changes found, 2 on error
-        if result.returncode in [0, 1]:
-            return result.stdout
-        else:
-            # Fallback to Python difflib if diff command fails
-            return _difflib_fallback(original, modified, file_path)
-    finally:
-        # Clean up temp files
-        Path(temp1).unlink(missing_ok=True)
-        Path(temp2).unlink(missing_ok=True)
-
-
-def _difflib_fallback(original: str, modified: str, file_path: str) -> str:
-    """Fallback to Python difflib if native diff fails."""
-    import difflib
+    Returns:
+        Dictionary with diff statistics
+    """
+    if diff is not None:
+        return _diff_stats(diff, original, modified)
+    
+    stats, _ = compute_diff(original, modified)
+    return stats
+
+
+def _diff_stats(diff: str, original: str, modified: str) -> dict:
+    """Count the added and removed lines of a unified diff in one pass."""
+    additions = 0
+    deletions = 0
+    
+    for line in diff.split('\n'):
+        if line.startswith('+') and not line.startswith('+++'):
+            additions += 1
+        elif line.startswith('-') and not line.startswith('---'):
+            deletions += 1
+    
+    return {
+        "additions": additions,
+        "deletions": deletions,
+        "total_changes": additions + deletions,
+        "original_lines": len(original.splitlines()),
+        "modified_lines": len(modified.splitlines()),
+    }
+
+
+@lru_cache(maxsize=32)
+def _line_matcher(original: str, modified: str) -> tuple[list[str], list[str], difflib.SequenceMatcher]:
+    """Split both versions into lines and match them, once per content pair.
     
+    Retries re-validate the same pairs, so the matcher is memoized.
+    """
     original_lines = original.splitlines(keepends=True)
     modified_lines = modified.splitlines(keepends=True)
     
-    diff = difflib.unified_diff(
-        original_lines,
-        modified_lines,
-        fromfile=f"a/{file_path}",
-        tofile=f"b/{file_path}",
-        lineterm="",
-    )
+    # autojunk=False: the popularity heuristic misaligns large files with many repeated lines
+    matcher = _SequenceMatcher(None, original_lines, modified_lines, autojunk=False)
+    matcher.get_opcodes()  # Computed once here and cached on the matcher
     
-    return "".join(diff)
+    return original_lines, modified_lines, matcher
 
 
-def generate_diff_stats(original: str, modified: str) -> dict:
-    """Generate statistics about the diff.
+def _format_range(start: int, stop: int) -> str:
+    """Format a line range for a unified diff hunk header."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _terminated(line: str) -> str:
+    """Terminate a diff line, marking a missing newline at end of file."""
+    if line.endswith("\n"):
+        return line
+    return line + "\n\\ No newline at end of file\n"
+
+
+def _unified_lines(
+    original_lines: list[str],
+    modified_lines: list[str],
+    matcher: difflib.SequenceMatcher,
+    file_path: str,
+    context: int = 3,
+) -> Iterator[str]:
+    """Stream unified diff lines from an already computed matcher."""
+    started = False
+    for group in matcher.get_grouped_opcodes(context):
+        if not started:
+            started = True
+            yield f"--- a/{file_path}\n"
+            yield f"+++ b/{file_path}\n"
+        
+        first, last = group[0], group[-1]
+        yield f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@\n"
+        
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in original_lines[i1:i2]:
+                    yield _terminated(" " + line)
+                continue
+            if tag in ("replace", "delete"):
+                for line in original_lines[i1:i2]:
+                    yield _terminated("-" + line)
+            if tag in ("replace", "insert"):
+                for line in modified_lines[j1:j2]:
+                    yield _terminated("+" + line)
+
+
+def compute_diff(original: str, modified: str, file_path: str = "file") -> tuple[dict, Iterator[str]]:
+    """Compute diff statistics and the unified diff from a single line match.
+    
+    The statistics are computed eagerly; the unified diff is rendered lazily,
+    so callers that reject a change based on the stats never pay for it.
+    Line matches are memoized per content pair, and identical contents are
+    answered without matching at all.
     
     Args:
         original: Original content
         modified: Modified content
-        
+        file_path: File path for diff header
+    
     Returns:
-        Dictionary with diff statistics
+        Tuple of (statistics dictionary, iterator over unified diff lines)
     """
-    # Use native diff with --brief for quick stats
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.tmp', delete=False) as f1:
-        f1.write(original)
-        temp1 = f1.name
+    if original == modified:
+        line_count = len(original.splitlines())
+        stats = {
+            "additions": 0,
+            "deletions": 0,
+            "total_changes": 0,
+            "original_lines": line_count,
+            "modified_lines": line_count,
+        }
+        return stats, iter(())
+    
+    original_lines, modified_lines, matcher = _line_matcher(original, modified)
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.tmp', delete=False) as f2:
-        f2.write(modified)
-        temp2 = f2.name
+    additions = 0
+    deletions = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            deletions += i2 - i1
+        if tag in ("replace", "insert"):
+            additions += j2 - j1
     
+    stats = {
+        "additions": additions,
+        "deletions": deletions,
+        "total_changes": additions + deletions,
+        "original_lines": len(original_lines),
+        "modified_lines": len(modified_lines),
+    }
+    
+    return stats, _unified_lines(original_lines, modified_lines, matcher, file_path)
+
+
+def apply_diff(content: str, diff: str, file_path: str = "file", reverse: bool = False) -> str:
+    """Apply the unified diff of one file to its content.
+    
+    Only the hunks under the `--- a/<file_path>` header are applied, so a diff
+    holding the changes of several files can be passed as is.
+    
+    Args:
+        content: Content the diff was computed from (the modified content
+            when reversing)
+        diff: Unified diff, as rendered by `compute_diff`
+        file_path: File whose hunks are applied
+        reverse: Undo the diff, turning the modified content back into the original
+    
+    Returns:
+        Patched content; the content itself if the diff does not touch the file
+    
+    Raises:
+        ValueError: If a hunk does not match the content
+    """
+    diff_lines = diff.splitlines(keepends=True)
+    header = [f"--- a/{file_path}\n", f"+++ b/{file_path}\n"]
     try:
-        result = subprocess.run(
-            ['diff', '-u', temp1, temp2],
-            capture_output=True,
-            text=True,
+        index = next(
+            i + 2 for i in range(len(diff_lines) - 1)
+            if diff_lines[i:i + 2] == header
         )
+    except StopIteration:
+        return content
+    
+    lines = content.splitlines(keepends=True)
+    patched = []
+    cursor = 0
+    
+    while index < len(diff_lines):
+        match = _HUNK_HEADER_RE.match(diff_lines[index])
+        if not match:
+            break
+        index += 1
         
-        # Parse diff output for stats
-        additions = 0
-        deletions = 0
-        
-        for line in result.stdout.split('\n'):
-            if line.startswith('+') and not line.startswith('+++'):
-                additions += 1
-            elif line.startswith('-') and not line.startswith('---'):
-                deletions += 1
+        old_length = int(match.group(2) or 1)
+        new_length = int(match.group(4) or 1)
+        old_chunk, new_chunk = [], []
+        while len(old_chunk) < old_length or len(new_chunk) < new_length:
+            if index >= len(diff_lines):
+                raise ValueError(f"Diff of {file_path} is truncated")
+            line = diff_lines[index]
+            index += 1
+            if index < len(diff_lines) and diff_lines[index] == _NO_NEWLINE_MARKER:
+                line = line[:-1]
+                index += 1
+            
+            if line[0] in " -":
+                old_chunk.append(line[1:])
+            if line[0] in " +":
+                new_chunk.append(line[1:])
         
-        original_lines = len(original.splitlines())
-        modified_lines = len(modified.splitlines())
+        start, length = int(match.group(1)), old_length
+        if reverse:
+            old_chunk, new_chunk = new_chunk, old_chunk
+            start, length = int(match.group(3)), new_length
+        # Empty ranges name the line before them
+        position = start - 1 if length else start
         
-        return {
-            "additions": additions,
-            "deletions": deletions,
-            "total_changes": additions + deletions,
-            "original_lines": original_lines,
-            "modified_lines": modified_lines,
-        }
-    finally:
-        Path(temp1).unlink(missing_ok=True)
-        Path(temp2).unlink(missing_ok=True)
-
+        if lines[position:position + len(old_chunk)] != old_chunk:
+            raise ValueError(f"Diff hunk at line {start} does not match {file_path}")
+        patched.extend(lines[cursor:position])
+        patched.extend(new_chunk)
+        cursor = position + len(old_chunk)
+    
+    patched.extend(lines[cursor:])
+    return "".join(patched)
@@ -1,5 +1,6 @@
 """File reading tool for LangChain agent."""
 
+from itertools import islice
 from pathlib import Path
 
 from langchain_core.tools import tool
@@ -20,21 +21,18 @@ def read_file(repo_path: str, file_path: str) -> str:
         FileNotFoundError: If file doesn't exist
         PermissionError: If file cannot be read
     """
-    full_path = Path(repo_path) / file_path
-    
-    if not full_path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
-    
-    if not full_path.is_file():
-        raise ValueError(f"Path is not a file: {file_path}")
+    raw = _resolve_file(repo_path, file_path).read_bytes()
     
     try:
-        with open(full_path, "r", encoding="utf-8") as f:
-            return f.read()
+        content = raw.decode("utf-8")
     except UnicodeDecodeError:
         # Try with different encoding for non-UTF8 files
-        with open(full_path, "r", encoding="latin-1") as f:
-            return f.read()
+        content = raw.decode("latin-1")
+    
+    # Translate newlines as text-mode reads do
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content
 
 
 @tool
@@ -50,11 +48,32 @@ def read_file_lines(repo_path: str, file_path: str, start_line: int, end_line: i
     Returns:
         Content of specified lines
     """
-    content = read_file.invoke({"repo_path": repo_path, "file_path": file_path})
-    lines = content.splitlines()
+    full_path = _resolve_file(repo_path, file_path)
     
     # Convert to 0-indexed
     start_idx = max(0, start_line - 1)
-    end_idx = min(len(lines), end_line)
+    end_idx = max(0, end_line)
+    
+    try:
+        return _read_lines(full_path, start_idx, end_idx, "utf-8")
+    except UnicodeDecodeError:
+        return _read_lines(full_path, start_idx, end_idx, "latin-1")
+
+
+def _resolve_file(repo_path: str, file_path: str) -> Path:
+    """Resolve a repository file, checking that it exists and is a file."""
+    full_path = Path(repo_path) / file_path
+    
+    if not full_path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
     
-    return "\n".join(lines[start_idx:end_idx])
+    if not full_path.is_file():
+        raise ValueError(f"Path is not a file: {file_path}")
+    
+    return full_path
+
+
+def _read_lines(full_path: Path, start_idx: int, end_idx: int, encoding: str) -> str:
+    """Read lines [start_idx, end_idx) of a file, stopping at the last one."""
+    with open(full_path, "r", encoding=encoding) as f:
+        return "\n".join(line.rstrip("\n") for line in islice(f, start_idx, end_idx))
@@ -1,58 +1,133 @@
 """File writing tool for applying fixes."""
 
+import os
+import stat
+import tempfile
 from pathlib import Path
 
 from langchain_core.tools import tool
 
 
+# Write buffer size, so large files are written in a few syscalls
+_WRITE_BUFFER_SIZE = 1 << 20
+
+
 class EditError(Exception):
     """Raised when an edit cannot be applied."""
     pass
 
 
-def apply_edit(original_content: str, old_code: str, new_code: str) -> str:
-    """Apply a search-and-replace edit to content.
+def _find_unique(original_content: str, old_code: str) -> int:
+    """Find the offset of the single occurrence of old_code.
     
-    Args:
-        original_content: Original file content
-        old_code: Exact string to find and replace
-        new_code: Replacement string
-        
-    Returns:
-        Modified content with the replacement applied
-        
     Raises:
         EditError: If old_code is not found or appears multiple times
     """
-    # Count occurrences
-    count = original_content.count(old_code)
+    if not old_code:
+        raise EditError("old_code is empty. It must contain the exact code to replace.")
+    
+    # str.find returns at once when old_code is longer than the content
+    start = original_content.find(old_code)
     
-    if count == 0:
+    if start < 0:
         raise EditError(
             f"Could not find the old_code in the file. "
             f"The code to replace must match exactly, including whitespace."
         )
     
-    if count > 1:
+    # A second match anywhere after the first one, overlapping or not
+    if original_content.find(old_code, start + 1) >= 0:
+        # Only counted on failure; overlapping matches count once in str.count
+        count = max(original_content.count(old_code), 2)
         raise EditError(
             f"Found {count} occurrences of old_code. "
             f"The code to replace must be unique. "
             f"Include more context lines to make it unique."
         )
     
+    return start
+
+
+def apply_edit(original_content: str, old_code: str, new_code: str) -> str:
+    """Apply a search-and-replace edit to content.
+    
+    Args:
+        original_content: Original file content
+        old_code: Exact string to find and replace
+        new_code: Replacement string
+    
+    Returns:
+        Modified content with the replacement applied
+    
+    Raises:
+        EditError: If old_code is not found or appears multiple times
+    """
+    start = _find_unique(original_content, old_code)
+    
     # Apply the replacement
-    return original_content.replace(old_code, new_code, 1)
+    return original_content[:start] + new_code + original_content[start + len(old_code):]
+
+
+def apply_edits_batch(original_content: str, edits: list[tuple[str, str]]) -> str:
+    """Apply several search-and-replace edits to content in a single pass.
+    
+    Every old_code is located in the original content, then the result is
+    assembled once from slices instead of rebuilding the whole file per edit.
+    
+    Args:
+        original_content: Original file content
+        edits: (old_code, new_code) pairs, each matched against the original
+    
+    Returns:
+        Modified content with all replacements applied
+    
+    Raises:
+        EditError: If an old_code is not found, appears multiple times,
+            or overlaps another edit
+    """
+    spans = []
+    for old_code, new_code in edits:
+        start = _find_unique(original_content, old_code)
+        spans.append((start, start + len(old_code), new_code))
+    
+    spans.sort(key=lambda span: span[0])
+    
+    parts = []
+    position = 0
+    for start, end, new_code in spans:
+        if start < position:
+            raise EditError(
+                "Edits overlap in the file. "
+                "Each old_code must cover a separate region of the original content."
+            )
+        parts.append(original_content[position:start])
+        parts.append(new_code)
+        position = end
+    parts.append(original_content[position:])
+    
+    return "".join(parts)
 
 
 @tool
-def write_file(repo_path: str, file_path: str, content: str, dry_run: bool = False) -> dict:
+def write_file(
+    repo_path: str,
+    file_path: str,
+    content: str,
+    dry_run: bool = False,
+    fsync: bool = False,
+) -> dict:
     """Write modified content to a file.
     
+    The content goes to a temporary file in the same directory, which then
+    replaces the target in one rename. Readers and crashes never see a
+    half-written file, and an existing file keeps its permissions.
+    
     Args:
         repo_path: Absolute path to the repository root
         file_path: Relative path to the file
         content: New file content
         dry_run: If True, don't actually write the file
+        fsync: If True, flush the content to disk before the rename
         
     Returns:
         Dictionary with status and message
@@ -70,8 +145,7 @@ def write_file(repo_path: str, file_path: str, content: str, dry_run: bool = Fal
     full_path.parent.mkdir(parents=True, exist_ok=True)
     
     try:
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        _atomic_write(full_path, content, fsync)
         
         return {
             "status": "success",
@@ -84,3 +158,35 @@ def write_file(repo_path: str, file_path: str, content: str, dry_run: bool = Fal
             "message": f"Failed to write file: {str(e)}",
             "file_path": file_path,
         }
+
+
+def _atomic_write(full_path: Path, content: str, fsync: bool) -> None:
+    """Write content to a temporary sibling file and rename it over full_path."""
+    # Write through symlinks: renaming over the link itself would replace it
+    # with a regular file
+    full_path = full_path.resolve()
+    fd, tmp_name = tempfile.mkstemp(
+        dir=full_path.parent,
+        prefix=f".{full_path.name}.",
+        suffix=".tmp",
+    )
+    try:
+        with open(fd, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
+            f.write(content)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # mkstemp creates the file as 0600; keep the target's mode instead
+        try:
+            mode = stat.S_IMODE(full_path.stat().st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_name, mode)
+        
+        os.replace(tmp_name, full_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
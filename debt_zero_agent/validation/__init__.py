@@ -5,9 +5,15 @@ from debt_zero_agent.validation.ast_validator import (
     compare_ast_structure,
     validate_python_syntax,
 )
-from debt_zero_agent.validation.locator import IssueContext, locate_issue
+from debt_zero_agent.validation.locator import (
+    IssueContext,
+    locate_issue,
+    locate_node,
+    parse_code,
+)
 from debt_zero_agent.validation.tree_sitter import (
     detect_language_from_extension,
+    validate_many,
     validate_syntax,
 )
 
@@ -16,7 +22,10 @@ __all__ = [
     "validate_python_syntax",
     "compare_ast_structure",
     "validate_syntax",
+    "validate_many",
     "detect_language_from_extension",
     "IssueContext",
     "locate_issue",
+    "locate_node",
+    "parse_code",
 ]
@@ -2,20 +2,41 @@
 
 import ast
 from dataclasses import dataclass
+from functools import lru_cache
 
+# Fields holding nested statements; definitions cannot appear anywhere else
+_BLOCK_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
 
-@dataclass
+
+@dataclass(frozen=True)
 class ValidationResult:
-    """Result of validation check."""
+    """Result of validation check.
+    
+    Validators cache their results, so one instance may be returned to
+    several callers; treat it as read-only.
+    """
 
     valid: bool
     errors: list[str]
     warnings: list[str]
 
 
+def _parse_module(source: str) -> ast.Module:
+    """Parse source into a bare AST, without inheriting this module's flags.
+    
+    Raises:
+        SyntaxError: If the source does not parse
+    """
+    return compile(source, "<string>", "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+
+
+@lru_cache(maxsize=256)
 def validate_python_syntax(code: str) -> ValidationResult:
     """Parse code with ast module, return syntax errors if any.
     
+    Results are cached by source, so a candidate validated again on a
+    retry is not parsed twice.
+    
     Args:
         code: Python source code to validate
         
@@ -23,7 +44,7 @@ def validate_python_syntax(code: str) -> ValidationResult:
         ValidationResult with syntax check status
     """
     try:
-        ast.parse(code)
+        _parse_module(code)
         return ValidationResult(valid=True, errors=[], warnings=[])
     except SyntaxError as e:
         error_msg = f"Syntax error at line {e.lineno}: {e.msg}"
@@ -32,6 +53,39 @@ def validate_python_syntax(code: str) -> ValidationResult:
         return ValidationResult(valid=False, errors=[str(e)], warnings=[])
 
 
+@lru_cache(maxsize=128)
+def _count_definitions(source: str) -> tuple[int, int]:
+    """Count the function and class definitions of a module in one walk.
+    
+    Only statement blocks are descended into, skipping the expressions that
+    make up most of a tree. Cached by source, so the unchanged original is
+    parsed once across retries. Only the counts are kept, not the tree.
+    
+    Args:
+        source: Python source code
+    
+    Returns:
+        Tuple of (function count, class count)
+    
+    Raises:
+        SyntaxError: If the source does not parse (never cached)
+    """
+    funcs = classes = 0
+    stack = [_parse_module(source)]
+    while stack:
+        node = stack.pop()
+        node_type = type(node)
+        if node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef:
+            funcs += 1
+        elif node_type is ast.ClassDef:
+            classes += 1
+        for field in _BLOCK_FIELDS:
+            block = getattr(node, field, None)
+            if block:
+                stack.extend(block)
+    return funcs, classes
+
+
 def compare_ast_structure(original: str, modified: str) -> ValidationResult:
     """Ensure modification doesn't break unrelated code structures.
     
@@ -48,8 +102,8 @@ def compare_ast_structure(original: str, modified: str) -> ValidationResult:
     warnings = []
     
     try:
-        original_tree = ast.parse(original)
-        modified_tree = ast.parse(modified)
+        original_funcs, original_classes = _count_definitions(original)
+        modified_funcs, modified_classes = _count_definitions(modified)
     except SyntaxError as e:
         return ValidationResult(
             valid=False,
@@ -57,13 +111,6 @@ def compare_ast_structure(original: str, modified: str) -> ValidationResult:
             warnings=[],
         )
     
-    # Count top-level definitions
-    original_funcs = sum(1 for node in ast.walk(original_tree) if isinstance(node, ast.FunctionDef))
-    modified_funcs = sum(1 for node in ast.walk(modified_tree) if isinstance(node, ast.FunctionDef))
-    
-    original_classes = sum(1 for node in ast.walk(original_tree) if isinstance(node, ast.ClassDef))
-    modified_classes = sum(1 for node in ast.walk(modified_tree) if isinstance(node, ast.ClassDef))
-    
     # Warn if major structural changes detected
     if original_funcs != modified_funcs:
         warnings.append(
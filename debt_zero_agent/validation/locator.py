@@ -1,7 +1,10 @@
 """AST-based issue localization using tree-sitter."""
 
+import threading
+from collections.abc import Sequence
 from dataclasses import dataclass
 
+from tree_sitter import Node, Parser, Tree
 from tree_sitter_language_pack import get_parser
 
 
@@ -13,18 +16,94 @@ class IssueContext:
     node_text: str  # The exact code at this node
     parent_type: str  # Parent node type for context
     parent_text: str  # Parent node code
-    siblings: list[str]  # Adjacent statements for broader context
+    siblings: Sequence[str]  # Adjacent statements for broader context
     start_line: int
     end_line: int
 
 
-def locate_issue(code: str, language: str, line: int, column: int = 0) -> IssueContext:
+# Sibling texts are cut to this many bytes, so a sibling that is a whole
+# function or class body is never decoded in full
+_MAX_SIBLING_BYTES = 2048
+
+
+class _SiblingTexts(Sequence[str]):
+    """Sibling node texts, each decoded on first access."""
+    
+    def __init__(self, nodes: list[Node]):
+        self._nodes = nodes
+        self._texts: list[str | None] = [None] * len(nodes)
+    
+    def __len__(self) -> int:
+        return len(self._nodes)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        text = self._texts[index]
+        if text is None:
+            raw = self._nodes[index].text[:_MAX_SIBLING_BYTES]
+            text = self._texts[index] = raw.decode("utf-8", errors="ignore")
+        return text
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+    
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+# Parsers by language, kept per thread: parsing releases the GIL, and a
+# parser must not be used by two threads at once
+_local = threading.local()
+
+
+def get_cached_parser(language: str) -> Parser:
+    """Get the calling thread's parser for a language, creating it once.
+    
+    Args:
+        language: Language identifier (e.g., 'python')
+    
+    Returns:
+        Parser for the language
+    
+    Raises:
+        LookupError: If the language is not supported (never cached)
+    """
+    parsers = _local.__dict__.setdefault("parsers", {})
+    parser = parsers.get(language)
+    if parser is None:
+        parser = parsers[language] = get_parser(language)
+    return parser
+
+
+def source_bytes(code: bytes | str) -> bytes:
+    """Get the UTF-8 bytes tree-sitter parses, without copying bytes input."""
+    return code if isinstance(code, bytes) else code.encode("utf-8")
+
+
+def parse_code(code: bytes | str, language: str) -> Tree:
+    """Parse source code into a tree-sitter syntax tree.
+    
+    Args:
+        code: Source code, as text or UTF-8 bytes
+        language: Language identifier (e.g., 'python')
+    
+    Returns:
+        Parsed syntax tree
+    """
+    parser = get_cached_parser(language)
+    return parser.parse(source_bytes(code))
+
+
+def locate_issue(code: bytes | str, language: str, line: int, column: int = 0) -> IssueContext:
     """Find the AST node at the given line/column position.
     
     Returns node + parent context for precise targeting.
     
     Args:
-        code: Source code
+        code: Source code, as text or UTF-8 bytes
         language: Language identifier (e.g., 'python')
         line: Line number (1-indexed)
         column: Column number (0-indexed)
@@ -32,33 +111,47 @@ def locate_issue(code: str, language: str, line: int, column: int = 0) -> IssueC
     Returns:
         IssueContext with node and parent information
     """
-    parser = get_parser(language)
-    tree = parser.parse(code.encode())
-    
-    def find_deepest_node(node, target_line, target_col):
-        """Recursively find the most specific node containing the position."""
-        for child in node.children:
-            if child.start_point[0] <= target_line <= child.end_point[0]:
-                # Check if this child contains the position
-                if (
-                    child.start_point[0] < target_line < child.end_point[0]
-                    or (child.start_point[0] == target_line and child.start_point[1] <= target_col)
-                    or (child.end_point[0] == target_line and child.end_point[1] >= target_col)
-                ):
-                    return find_deepest_node(child, target_line, target_col)
-        return node
+    return locate_node(parse_code(code, language), line, column)
+
+
+def locate_node(tree: Tree, line: int, column: int = 0) -> IssueContext:
+    """Find the AST node at the given line/column position of a parsed tree.
+    
+    Lets callers parse a file once and locate several issues in it.
+    
+    Args:
+        tree: Syntax tree from `parse_code`
+        line: Line number (1-indexed)
+        column: Column number (0-indexed)
+    
+    Returns:
+        IssueContext with node and parent information
+    """
+    def contains(child, target_line, target_col):
+        """Check if a node contains the position."""
+        start_line, start_col = child.start_point
+        end_line, end_col = child.end_point
+        return (
+            start_line < target_line < end_line
+            or (start_line == target_line and start_col <= target_col)
+            or (end_line == target_line and end_col >= target_col)
+        )
+    
+    def find_deepest_node(cursor, target_line, target_col):
+        """Descend into the first child containing the position until none does."""
+        while cursor.goto_first_child():
+            while not contains(cursor.node, target_line, target_col):
+                if not cursor.goto_next_sibling():
+                    cursor.goto_parent()
+                    return cursor.node
+        return cursor.node
     
     # Convert to 0-indexed for tree-sitter
-    node = find_deepest_node(tree.root_node, line - 1, column)
+    node = find_deepest_node(tree.walk(), line - 1, column)
     parent = node.parent if node.parent else node
     
-    # Get sibling nodes for context
-    siblings = []
-    if parent:
-        siblings = [
-            child.text.decode("utf-8", errors="ignore")
-            for child in parent.children[:5]  # Limit to first 5 siblings
-        ]
+    # Get sibling nodes for context, decoded only when read
+    siblings = _SiblingTexts(parent.children[:5])  # Limit to first 5 siblings
     
     return IssueContext(
         node_type=node.type,
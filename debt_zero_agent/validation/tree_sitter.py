@@ -1,22 +1,50 @@
 """Multi-language syntax validation using tree-sitter."""
 
-from tree_sitter_language_pack import get_parser
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 from debt_zero_agent.validation.ast_validator import ValidationResult
+from debt_zero_agent.validation.locator import get_cached_parser, source_bytes
 
+# Language identifiers by file extension
+_EXTENSION_MAP = {
+    ".py": "python",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".java": "java",
+    ".cpp": "cpp",
+    ".c": "c",
+    ".go": "go",
+    ".rs": "rust",
+    ".rb": "ruby",
+    ".php": "php",
+}
 
-def validate_syntax(code: str, language: str) -> ValidationResult:
+# Batches up to this size are validated inline: starting worker processes
+# costs more than parsing a handful of files
+_PARALLEL_THRESHOLD = 4
+
+# Sources sent to a worker per task, amortizing the pickling round trips
+_CHUNK_SIZE = 8
+
+
+@lru_cache(maxsize=256)
+def validate_syntax(code: bytes | str, language: str) -> ValidationResult:
     """Multi-language syntax validation using tree-sitter.
     
+    Results are cached by source and language, so a candidate validated
+    again on a retry is not parsed twice.
+    
     Args:
-        code: Source code to validate
+        code: Source code to validate, as text or UTF-8 bytes
         language: Language identifier (e.g., 'python', 'javascript', 'java')
         
     Returns:
         ValidationResult with syntax errors if found
     """
     try:
-        parser = get_parser(language)
+        parser = get_cached_parser(language)
     except Exception as e:
         return ValidationResult(
             valid=False,
@@ -24,18 +52,23 @@ def validate_syntax(code: str, language: str) -> ValidationResult:
             warnings=[],
         )
     
-    tree = parser.parse(code.encode())
+    tree = parser.parse(source_bytes(code))
     errors = []
     
-    def find_errors(node):
-        """Recursively find ERROR nodes in the syntax tree."""
-        if node.type == "ERROR":
-            line = node.start_point[0] + 1
-            errors.append(f"Syntax error at line {line}")
-        for child in node.children:
-            find_errors(child)
+    def find_errors(cursor):
+        """Find ERROR nodes in a pre-order walk of the syntax tree."""
+        while True:
+            node = cursor.node
+            if node.type == "ERROR":
+                line = node.start_point[0] + 1
+                errors.append(f"Syntax error at line {line}")
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
     
-    find_errors(tree.root_node)
+    find_errors(tree.walk())
     
     return ValidationResult(
         valid=len(errors) == 0,
@@ -44,6 +77,32 @@ def validate_syntax(code: str, language: str) -> ValidationResult:
     )
 
 
+def validate_many(sources: list[tuple[bytes | str, str]]) -> list[ValidationResult]:
+    """Validate the syntax of many sources, in worker processes for large batches.
+    
+    Parsing is CPU-bound, so batches larger than a few files are spread over
+    one process per core. Each worker creates its parsers once and reuses
+    them for every source it receives.
+    
+    Args:
+        sources: (code, language) pairs, as taken by `validate_syntax`
+    
+    Returns:
+        Validation results, in the order of the sources
+    """
+    if len(sources) <= _PARALLEL_THRESHOLD:
+        return [_validate_source(source) for source in sources]
+    
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(_validate_source, sources, chunksize=_CHUNK_SIZE))
+
+
+def _validate_source(source: tuple[bytes | str, str]) -> ValidationResult:
+    """Validate one (code, language) pair; module-level so workers can unpickle it."""
+    code, language = source
+    return validate_syntax(code, language)
+
+
 def detect_language_from_extension(file_path: str) -> str | None:
     """Detect language from file extension.
     
@@ -53,21 +112,10 @@ def detect_language_from_extension(file_path: str) -> str | None:
     Returns:
         Language identifier or None if unknown
     """
-    extension_map = {
-        ".py": "python",
-        ".js": "javascript",
-        ".ts": "typescript",
-        ".java": "java",
-        ".cpp": "cpp",
-        ".c": "c",
-        ".go": "go",
-        ".rs": "rust",
-        ".rb": "ruby",
-        ".php": "php",
-    }
-    
-    for ext, lang in extension_map.items():
-        if file_path.endswith(ext):
-            return lang
-    
-    return None
+    return _language_for_extension(os.path.splitext(file_path)[1].lower())
+
+
+@lru_cache(maxsize=1024)
+def _language_for_extension(extension: str) -> str | None:
+    """Look up the language of a file extension, memoized across files."""
+    return _EXTENSION_MAP.get(extension)
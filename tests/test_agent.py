@@ -1,5 +1,6 @@
 """Unit tests for agent core components."""
 
+import json
 import os
 from unittest.mock import Mock, patch
 
@@ -34,6 +35,36 @@ def test_get_llm_missing_key():
             get_llm("openai")
 
 
+def test_get_llm_cached():
+    """Test that repeated calls reuse the same client."""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+        assert get_llm("openai") is get_llm("openai")
+        assert get_llm("openai") is not get_llm("openai", model_name="gpt-4o-mini")
+
+
+def test_get_llm_rate_limited():
+    """Test that clients of one provider share a rate limiter."""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+        llm = get_llm("openai")
+        other = get_llm("openai", model_name="gpt-4o-mini")
+    
+    assert llm.rate_limiter is not None
+    assert llm.rate_limiter is other.rate_limiter
+    assert llm.max_retries > 2
+
+
+def test_get_llm_rate_limit_override():
+    """Test that a custom rate limit gets its own shared limiter."""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+        llm = get_llm("openai", rate_limit=600)
+        other = get_llm("openai", model_name="gpt-4o-mini", rate_limit=600)
+        default = get_llm("openai")
+    
+    assert llm.rate_limiter is other.rate_limiter
+    assert llm.rate_limiter is not default.rate_limiter
+    assert llm.rate_limiter.requests_per_second == 10
+
+
 def test_get_llm_invalid_provider():
     """Test error with invalid provider."""
     with pytest.raises(ValueError, match="Invalid provider"):
@@ -74,6 +105,9 @@ def test_build_graph():
     
     # Graph should have nodes
     assert hasattr(graph, "nodes")
+    
+    # Compiled once and shared
+    assert build_graph() is graph
 
 
 def test_graph_has_entry_point():
@@ -83,6 +117,172 @@ def test_graph_has_entry_point():
     assert callable(graph.invoke)
 
 
+def test_build_graph_with_checkpointer():
+    """Test opting in to a checkpointer for resumable runs."""
+    from langgraph.checkpoint.memory import MemorySaver
+    
+    checkpointer = MemorySaver()
+    graph = build_graph(checkpointer=checkpointer)
+    
+    assert graph.checkpointer is checkpointer
+    assert build_graph().checkpointer is None
+
+
+def test_dispatch_issues_groups_by_file():
+    """Test that issues are fanned out to one worker per file."""
+    from debt_zero_agent.agent.graph import dispatch_issues
+    
+    issues = [
+        SonarQubeIssue(
+            key=f"TEST-{i}",
+            rule="python:S1234",
+            severity="MAJOR",
+            component=f"project:{file_name}",
+            message="Test issue",
+            line=line,
+            type="CODE_SMELL",
+        )
+        for i, (file_name, line) in enumerate([("a.py", 20), ("a.py", 10), ("b.py", 5)])
+    ]
+    state: AgentState = {
+        "repo_path": "/tmp/repo",
+        "issues": issues,
+        "dry_run": True,
+        "llm_provider": "openai",
+        "successful_fixes": [],
+        "failed_fixes": [],
+        "max_retries": 3,
+    }
+    
+    sends = dispatch_issues(state)
+    
+    assert len(sends) == 2
+    assert all(send.node == "process_file" for send in sends)
+    assert [i.key for i in sends[0].arg["issues"]] == ["TEST-0", "TEST-1"]
+    assert [i.key for i in sends[1].arg["issues"]] == ["TEST-2"]
+    assert sends[0].arg["successful_fixes"] == []
+
+
+def test_dispatch_issues_no_issues():
+    """Test that an empty batch goes straight to finalize."""
+    from debt_zero_agent.agent.graph import dispatch_issues
+    
+    state: AgentState = {
+        "repo_path": "/tmp/repo",
+        "issues": [],
+        "dry_run": True,
+        "llm_provider": "openai",
+        "successful_fixes": [],
+        "failed_fixes": [],
+        "max_retries": 3,
+    }
+    
+    assert dispatch_issues(state) == "finalize"
+
+
+def test_process_file_worker_failure():
+    """Test that a crashed worker fails only its remaining issues."""
+    import asyncio
+    
+    from debt_zero_agent.agent.graph import process_file
+    
+    issues = [
+        SonarQubeIssue(
+            key=f"TEST-{i}",
+            rule="python:S1234",
+            severity="MAJOR",
+            component="project:a.py",
+            message="Test issue",
+            type="CODE_SMELL",
+        )
+        for i in range(3)
+    ]
+    state = {
+        "issues": issues,
+        "llm_provider": "openai",
+        "current_issue_index": 0,
+        "successful_fixes": [],
+        "failed_fixes": [],
+        "pending_writes": {},
+        "deferred_issues": [],
+        "dry_run": True,
+        "max_retries": 3,
+    }
+    
+    async def astream(*args, **kwargs):
+        yield {**state, "current_issue_index": 1, "pending_writes": {"a.py": "fixed"}}
+        raise RuntimeError("boom")
+    
+    with patch("debt_zero_agent.agent.graph.build_worker_graph") as mock_build:
+        mock_build.return_value.astream = astream
+        update = asyncio.run(process_file(state))
+    
+    assert [f.issue_key for f in update["failed_fixes"]] == ["TEST-1", "TEST-2"]
+    assert "boom" in update["failed_fixes"][0].error_message
+    assert update["pending_writes"] == {"a.py": "fixed"}
+
+
+def test_fix_spanning_files_deferred(tmp_path):
+    """Test that a fix editing another worker's file builds on that worker's edits."""
+    import asyncio
+    
+    from langchain_core.messages import AIMessageChunk
+    
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "b.py").write_text("b = 1\nc = 1\n")
+    issues = [
+        SonarQubeIssue(
+            key=f"TEST-{file_name}",
+            rule="python:S1234",
+            severity="MAJOR",
+            component=f"project:{file_name}",
+            message="Test issue",
+            line=1,
+            type="CODE_SMELL",
+        )
+        for file_name in ["a.py", "b.py"]
+    ]
+    
+    async def astream(messages):
+        text = "\n".join(str(m.content) for m in messages)
+        if "a = 1" in text:
+            # The fix of a.py also edits b.py, which b.py's worker is fixing
+            edits = [
+                {"file": "a.py", "old_code": "a = 1", "new_code": "a = 2"},
+                {"file": "b.py", "old_code": "c = 1", "new_code": "c = 2"},
+            ]
+        else:
+            edits = [{"file": "b.py", "old_code": "b = 1", "new_code": "b = 2"}]
+        for i, edit in enumerate(edits):
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": "ProposeEdit", "args": json.dumps(edit), "id": f"call-{i}", "index": i}],
+            )
+    
+    llm = Mock()
+    llm.bind_tools.return_value = Mock(astream=astream)
+    state: AgentState = {
+        "repo_path": str(tmp_path),
+        "issues": issues,
+        "dry_run": False,
+        "llm_provider": "openai",
+        "successful_fixes": [],
+        "failed_fixes": [],
+        "max_retries": 3,
+        "max_change_ratio": 2.0,
+    }
+    
+    with (
+        patch("debt_zero_agent.agent.nodes.get_llm", return_value=llm),
+        patch("debt_zero_agent.agent.nodes._get_rule_description", return_value=""),
+    ):
+        result = asyncio.run(build_graph().ainvoke(state))
+    
+    assert sorted(f.issue_key for f in result["successful_fixes"]) == ["TEST-a.py", "TEST-b.py"]
+    assert (tmp_path / "a.py").read_text() == "a = 2\n"
+    assert (tmp_path / "b.py").read_text() == "b = 2\nc = 2\n"
+
+
 # Integration Test (without actual LLM calls)
 
 
@@ -113,3 +313,684 @@ def test_workflow_initialization():
     
     assert len(initial_state["issues"]) == 1
     assert initial_state["current_issue"] is None
+
+
+# Node Helper Tests
+
+
+def test_batch_issues_by_file():
+    """Test grouping issues by file, bottom-up within each file."""
+    from debt_zero_agent.agent.nodes import batch_issues_by_file
+    
+    issues = [
+        SonarQubeIssue(
+            key=f"TEST-{i}",
+            rule="python:S1234",
+            severity="MAJOR",
+            component=f"project:{file_name}",
+            message="Test issue",
+            line=line,
+            type="CODE_SMELL",
+        )
+        for i, (file_name, line) in enumerate([("b.py", 3), ("a.py", None), ("a.py", 10), ("b.py", 7)])
+    ]
+    
+    batched = batch_issues_by_file(issues)
+    
+    assert [i.key for i in batched] == ["TEST-2", "TEST-1", "TEST-3", "TEST-0"]
+
+
+def test_rule_description_cached():
+    """Test that each rule is fetched from SonarQube only once."""
+    from debt_zero_agent.agent.nodes import _get_rule_description
+    from debt_zero_agent.sonarqube import RuleDescription
+    
+    rule = RuleDescription(
+        key="python:S1481",
+        name="Unused variables",
+        htmlDesc="<p>Remove unused variables</p>",
+        type="CODE_SMELL",
+        severity="MINOR",
+    )
+    _get_rule_description.cache_clear()
+    
+    with patch("debt_zero_agent.sonarqube.SonarQubeClient.get_rule", return_value=rule) as mock_get:
+        first = _get_rule_description("https://sonar.test", "python:S1481")
+        second = _get_rule_description("https://sonar.test", "python:S1481")
+    
+    assert first == second
+    assert "Remove unused variables" in first
+    assert "<p>" not in first
+    assert mock_get.call_count == 1
+
+
+def test_rule_description_failure_not_cached():
+    """Test that a failed rule lookup is retried on the next issue."""
+    from debt_zero_agent.agent.nodes import _get_rule_description
+    
+    _get_rule_description.cache_clear()
+    
+    with patch("debt_zero_agent.sonarqube.SonarQubeClient.get_rule", return_value=None) as mock_get:
+        for _ in range(2):
+            with pytest.raises(LookupError):
+                _get_rule_description("https://sonar.test", "python:S1481")
+    
+    assert mock_get.call_count == 2
+
+
+def test_select_next_issue_groups_by_file():
+    """Test that grouped mode fixes the following issues of a file together."""
+    from debt_zero_agent.agent.nodes import select_next_issue
+    
+    issues = [
+        SonarQubeIssue(
+            key=f"TEST-{i}",
+            rule="python:S1234",
+            severity="MAJOR",
+            component=f"project:{file_name}",
+            message="Test issue",
+            type="CODE_SMELL",
+        )
+        for i, file_name in enumerate(["a.py", "a.py", "b.py"])
+    ]
+    state = {"issues": issues, "current_issue_index": 0, "messages": []}
+    
+    grouped = select_next_issue({**state, "group_by_file": True})
+    assert [i.key for i in grouped["current_group"]] == ["TEST-0", "TEST-1"]
+    
+    ungrouped = select_next_issue({**state, "group_by_file": False})
+    assert [i.key for i in ungrouped["current_group"]] == ["TEST-0"]
+
+
+def test_grouped_fix_records_issues_without_edit_as_failed():
+    """Test that a grouped answer only fixes the issues it proposed edits for."""
+    import asyncio
+    
+    from langchain_core.messages import AIMessageChunk
+    
+    from debt_zero_agent.agent.nodes import apply_fix, validate_fix
+    
+    group = [
+        SonarQubeIssue(
+            key=f"TEST-{line}",
+            rule="python:S1481",
+            severity="MAJOR",
+            component="project:a.py",
+            message="Remove unused variable",
+            line=line,
+            type="CODE_SMELL",
+        )
+        for line in [3, 1]
+    ]
+    
+    async def astream(messages):
+        args = json.dumps({"old_code": "z = 1\n", "new_code": "z = 2\n"})
+        yield AIMessageChunk(
+            content="",
+            tool_call_chunks=[{"name": "ProposeEdit", "args": args, "id": "call-0", "index": 0}],
+        )
+    
+    llm = Mock()
+    llm.bind_tools.return_value = Mock(astream=astream)
+    state = {
+        "repo_path": "/tmp/repo",
+        "llm_provider": "openai",
+        "issues": group,
+        "current_issue": group[0],
+        "current_group": group,
+        "current_issue_index": 0,
+        "messages": [],
+        "retry_count": 0,
+        "max_retries": 3,
+        "max_change_ratio": 1.0,
+        "successful_fixes": [],
+        "failed_fixes": [],
+        "file_cache": {"a.py": "x = 1\ny = 1\nz = 1\n"},
+        "rule_cache": {"python:S1481": ""},
+    }
+    
+    with patch("debt_zero_agent.agent.nodes.get_llm", return_value=llm):
+        state = validate_fix(asyncio.run(apply_fix(state)))
+    
+    assert [f.issue_key for f in state["successful_fixes"]] == ["TEST-3"]
+    assert [f.issue_key for f in state["failed_fixes"]] == ["TEST-1"]
+    assert state["current_issue_index"] == 2
+
+
+def test_window():
+    """Test slicing a file around the issue lines."""
+    from debt_zero_agent.agent.nodes import _window
+    
+    content = "".join(f"line{i}\n" for i in range(1, 101))
+    
+    window = _window(content, [50, 55], radius=2)
+    assert window["file_content"] == "line48\nline49\nline50\nline51\nline52\nline53\nline54\nline55\nline56\nline57\n"
+    assert (window["start_line"], window["end_line"], window["total_lines"]) == (48, 57, 100)
+    
+    assert _window(content, [1], radius=2)["start_line"] == 1
+    assert _window(content, [5, None])["file_content"] == content
+
+
+def test_json_object_scanner():
+    """Test detecting the end of a streamed JSON object."""
+    from debt_zero_agent.agent.nodes import _JsonObjectScanner
+    
+    scanner = _JsonObjectScanner()
+    chunks = ['```json\n{"edits": [{"old_code": "if x {', '\\" }", ', '"new_code": "}"}]}', '\n```\nDone']
+    
+    assert scanner.feed(chunks[0]) is None
+    assert scanner.feed(chunks[1]) is None
+    assert scanner.feed(chunks[2]) == '{"edits": [{"old_code": "if x {\\" }", "new_code": "}"}]}'
+
+
+def test_astream_fix_content_blocks():
+    """Test streaming a JSON answer whose chunks carry lists of content blocks."""
+    import asyncio
+    
+    from langchain_core.messages import AIMessageChunk
+    
+    from debt_zero_agent.agent.nodes import _astream_fix
+    
+    async def astream(messages):
+        for text in ['{"old_code": "x",', ' "new_code": "y"}', " trailing"]:
+            yield AIMessageChunk(content=[{"type": "text", "text": text, "index": 0}])
+    
+    response = asyncio.run(_astream_fix(Mock(astream=astream), []))
+    
+    assert response.content == '{"old_code": "x", "new_code": "y"}'
+
+
+def test_apply_fix_with_tool_calls():
+    """Test applying edits proposed through parallel ProposeEdit tool calls."""
+    import asyncio
+    
+    from langchain_core.messages import AIMessageChunk, ToolMessage
+    
+    from debt_zero_agent.agent.nodes import apply_fix
+    
+    issue = SonarQubeIssue(
+        key="TEST-1",
+        rule="python:S1481",
+        severity="MAJOR",
+        component="project:a.py",
+        message="Remove unused variables",
+        line=1,
+        type="CODE_SMELL",
+    )
+    
+    prompts = []
+    
+    async def astream(messages):
+        prompts.append(messages[-1].content)
+        for i, (old, new) in enumerate([("x = 1\n", "x = 2\n"), ("y = 1\n", "y = 3\n")]):
+            args = '{"old_code": "%s", "new_code": "%s"}' % (old.replace("\n", "\\n"), new.replace("\n", "\\n"))
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": "ProposeEdit", "args": args, "id": f"call-{i}", "index": i}],
+            )
+    
+    llm = Mock()
+    llm.bind_tools.return_value = Mock(astream=astream)
+    state = {
+        "repo_path": "/tmp/repo",
+        "llm_provider": "openai",
+        "current_issue": issue,
+        "messages": [],
+        "retry_count": 0,
+        "max_retries": 3,
+        "file_cache": {"a.py": "x = 1\ny = 1\n"},
+        "rule_cache": {"python:S1481": ""},
+    }
+    
+    with patch("debt_zero_agent.agent.nodes.get_llm", return_value=llm):
+        state = asyncio.run(apply_fix(state))
+    
+    # Without cot, the issue is analyzed as part of the fix request
+    assert prompts[0].startswith("Analyze and fix")
+    assert "**Rule**: python:S1481" in prompts[0]
+    assert state["_temp_modified_files"] == {"a.py": "x = 2\ny = 3\n"}
+    assert [m.type for m in state["messages"]] == ["system", "human", "ai", "tool", "tool"]
+    assert [m.tool_call_id for m in state["messages"] if isinstance(m, ToolMessage)] == ["call-0", "call-1"]
+
+
+def test_apply_fix_keeps_system_prompt_prefix():
+    """Test that retries resend the same system-led prefix, cacheable for Anthropic."""
+    import asyncio
+    
+    from langchain_core.messages import AIMessageChunk
+    
+    from debt_zero_agent.agent.nodes import apply_fix
+    
+    issue = SonarQubeIssue(
+        key="TEST-1",
+        rule="python:S1481",
+        severity="MAJOR",
+        component="project:a.py",
+        message="Remove unused variables",
+        line=1,
+        type="CODE_SMELL",
+    )
+    requests = []
+    
+    async def astream(messages):
+        requests.append(list(messages))
+        yield AIMessageChunk(content='{"edits": [{"old_code": "missing", "new_code": "x"}]}')
+    
+    llm = Mock()
+    llm.bind_tools.return_value = Mock(astream=astream)
+    state = {
+        "repo_path": "/tmp/repo",
+        "llm_provider": "anthropic",
+        "current_issue": issue,
+        "messages": [],
+        "retry_count": 0,
+        "max_retries": 3,
+        "file_cache": {"a.py": "x = 1\n"},
+        "rule_cache": {"python:S1481": ""},
+    }
+    
+    with patch("debt_zero_agent.agent.nodes.get_llm", return_value=llm):
+        state = asyncio.run(apply_fix(state))
+        state = asyncio.run(apply_fix(state))
+    
+    first, second = requests
+    assert first[0] == second[0]
+    assert first[0].content[0]["cache_control"] == {"type": "ephemeral"}
+    assert [m.type for m in second] == ["system", "human", "human"]
+    assert state["messages"][0].type == "system"
+
+
+def test_analyze_issue_skipped_without_cot():
+    """Test that the separate analysis step only runs in cot mode."""
+    import asyncio
+    
+    from debt_zero_agent.agent.nodes import analyze_all, analyze_issue
+    
+    issue = SonarQubeIssue(
+        key="TEST-1",
+        rule="python:S1481",
+        severity="MAJOR",
+        component="project:a.py",
+        message="Remove unused variables",
+        line=1,
+        type="CODE_SMELL",
+    )
+    state = {
+        "issues": [issue],
+        "current_issue": issue,
+        "messages": [],
+        "llm_provider": "openai",
+    }
+    
+    with patch("debt_zero_agent.agent.nodes.get_llm") as mock_get_llm:
+        assert asyncio.run(analyze_all(state)) == {"analyses": {}}
+        assert asyncio.run(analyze_issue(state))["messages"] == []
+    
+    mock_get_llm.assert_not_called()
+
+
+def test_canonical_fixers():
+    """Test that deterministic fixers widen edits until they are unique."""
+    from debt_zero_agent.agent.canonical_fixers import CANONICAL_FIXERS
+    
+    content = "try:\n    a()\nexcept:\n    pass\ntry:\n    b()\nexcept:\n    pass\n"
+    issue = SonarQubeIssue(
+        key="TEST-1",
+        rule="python:S5754",
+        severity="MAJOR",
+        component="project:a.py",
+        message="Specify an exception class to catch or reraise the exception",
+        line=7,
+        type="CODE_SMELL",
+    )
+    
+    old_code, new_code = CANONICAL_FIXERS[issue.rule](issue, content)
+    
+    assert content.count(old_code) == 1
+    assert content.replace(old_code, new_code) == content.replace("b()\nexcept:", "b()\nexcept Exception:")
+    assert CANONICAL_FIXERS[issue.rule](issue.model_copy(update={"line": 6}), content) is None
+
+
+def test_apply_fix_canonical_skips_llm():
+    """Test that issues with a canonical fix are fixed without the LLM."""
+    import asyncio
+    
+    from debt_zero_agent.agent.nodes import apply_fix
+    
+    issue = SonarQubeIssue(
+        key="TEST-1",
+        rule="python:S3626",
+        severity="MINOR",
+        component="project:a.py",
+        message="Remove this redundant return.",
+        line=3,
+        type="CODE_SMELL",
+    )
+    state = {
+        "repo_path": "/tmp/repo",
+        "llm_provider": "openai",
+        "current_issue": issue,
+        "messages": [],
+        "retry_count": 0,
+        "max_retries": 3,
+        "file_cache": {"a.py": "def f():\n    g()\n    return\n"},
+    }
+    
+    with patch("debt_zero_agent.agent.nodes.get_llm") as mock_get_llm:
+        state = asyncio.run(apply_fix(state))
+    
+    mock_get_llm.assert_not_called()
+    assert state["_temp_fixed_content"] == "def f():\n    g()\n"
+    assert state["messages"] == []
+
+
+def test_get_edit_llm_cached():
+    """Test that the edit tool is bound once per model."""
+    from debt_zero_agent.agent.nodes import _get_edit_llm
+    
+    llm = Mock()
+    state = {"llm_provider": "openai"}
+    
+    with patch("debt_zero_agent.agent.nodes.get_llm", return_value=llm):
+        assert _get_edit_llm(state) is _get_edit_llm(state)
+    
+    llm.bind_tools.assert_called_once()
+
+
+def test_ainvoke_llm_timeout():
+    """Test that a stalled LLM request is cut off."""
+    import asyncio
+    
+    from debt_zero_agent.agent.nodes import _ainvoke_llm
+    
+    async def stall(messages):
+        await asyncio.sleep(1)
+    
+    llm = Mock(ainvoke=stall)
+    
+    with patch("debt_zero_agent.agent.nodes._LLM_TIMEOUT", 0.01):
+        with pytest.raises(TimeoutError, match="timed out"):
+            asyncio.run(_ainvoke_llm(llm, []))
+
+
+def test_submit_analysis_batch_unsupported_provider():
+    """Test that providers without a Batch API are rejected."""
+    import asyncio
+    
+    from debt_zero_agent.agent.batch import submit_analysis_batch
+    
+    with pytest.raises(ValueError, match="Batch API not supported"):
+        asyncio.run(submit_analysis_batch({}, "gemini"))
+
+
+def _batch_prompts():
+    from langchain_core.messages import HumanMessage, SystemMessage
+    
+    return {
+        key: [SystemMessage(content="You analyze issues."), HumanMessage(content=f"Analyze {key}")]
+        for key in ["AX1", "AX2", "AX3"]
+    }
+
+
+def test_submit_analysis_batch_openai(monkeypatch):
+    """Test the OpenAI batch JSONL and mapping results back by custom ID."""
+    import asyncio
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    
+    from debt_zero_agent.agent.batch import submit_analysis_batch
+    
+    def output_line(custom_id, status_code, content):
+        body = {"choices": [{"message": {"content": content}}]}
+        return json.dumps({"custom_id": custom_id, "response": {"status_code": status_code, "body": body}})
+    
+    output = "\n".join([
+        output_line("issue-2", 200, "analysis of AX3"),
+        output_line("issue-1", 500, None),
+        output_line("issue-0", 200, "analysis of AX1"),
+    ])
+    client = Mock()
+    client.files.create = AsyncMock(return_value=SimpleNamespace(id="file-in"))
+    client.files.content = AsyncMock(return_value=SimpleNamespace(content=output.encode()))
+    client.batches.create = AsyncMock(return_value=SimpleNamespace(id="batch-1", status="in_progress"))
+    client.batches.retrieve = AsyncMock(
+        return_value=SimpleNamespace(id="batch-1", status="completed", output_file_id="file-out"),
+    )
+    
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr("debt_zero_agent.agent.batch._POLL_INTERVAL", 0)
+    with patch("debt_zero_agent.agent.batch.AsyncOpenAI", return_value=client):
+        responses = asyncio.run(submit_analysis_batch(_batch_prompts(), "openai", "gpt-test"))
+    
+    file_name, jsonl = client.files.create.call_args.kwargs["file"]
+    requests = [json.loads(line) for line in jsonl.splitlines()]
+    assert [r["custom_id"] for r in requests] == ["issue-0", "issue-1", "issue-2"]
+    assert requests[1]["body"]["model"] == "gpt-test"
+    assert requests[1]["body"]["messages"] == [
+        {"role": "system", "content": "You analyze issues."},
+        {"role": "user", "content": "Analyze AX2"},
+    ]
+    
+    # The failed request is left out
+    assert {key: message.content for key, message in responses.items()} == {
+        "AX1": "analysis of AX1",
+        "AX3": "analysis of AX3",
+    }
+
+
+def test_submit_analysis_batch_anthropic(monkeypatch):
+    """Test the Anthropic batch requests and mapping results back by custom ID."""
+    import asyncio
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    
+    from debt_zero_agent.agent.batch import submit_analysis_batch
+    
+    def entry(custom_id, result_type, text=""):
+        message = SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+        return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type=result_type, message=message))
+    
+    async def results():
+        for item in [entry("issue-1", "succeeded", "analysis of AX2"), entry("issue-0", "errored")]:
+            yield item
+    
+    client = Mock()
+    client.messages.batches.create = AsyncMock(
+        return_value=SimpleNamespace(id="msgbatch-1", processing_status="in_progress"),
+    )
+    client.messages.batches.retrieve = AsyncMock(
+        return_value=SimpleNamespace(id="msgbatch-1", processing_status="ended"),
+    )
+    client.messages.batches.results = AsyncMock(return_value=results())
+    
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setattr("debt_zero_agent.agent.batch._POLL_INTERVAL", 0)
+    with patch("debt_zero_agent.agent.batch.AsyncAnthropic", return_value=client):
+        responses = asyncio.run(submit_analysis_batch(_batch_prompts(), "anthropic"))
+    
+    requests = client.messages.batches.create.call_args.kwargs["requests"]
+    assert [r["custom_id"] for r in requests] == ["issue-0", "issue-1", "issue-2"]
+    assert requests[0]["params"]["system"] == "You analyze issues."
+    assert requests[0]["params"]["messages"] == [{"role": "user", "content": "Analyze AX1"}]
+    assert {key: message.content for key, message in responses.items()} == {"AX2": "analysis of AX2"}
+
+
+def test_submit_analysis_batch_timeout(monkeypatch):
+    """Test that a batch still running at the deadline is cancelled."""
+    import asyncio
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    
+    from debt_zero_agent.agent.batch import submit_analysis_batch
+    from debt_zero_agent.agent.nodes import analyze_all
+    
+    running = SimpleNamespace(id="batch-1", status="in_progress")
+    client = Mock()
+    client.files.create = AsyncMock(return_value=SimpleNamespace(id="file-in"))
+    client.batches.create = AsyncMock(return_value=running)
+    client.batches.retrieve = AsyncMock(return_value=running)
+    client.batches.cancel = AsyncMock()
+    
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr("debt_zero_agent.agent.batch._POLL_INTERVAL", 0.01)
+    with patch("debt_zero_agent.agent.batch.AsyncOpenAI", return_value=client):
+        with pytest.raises(TimeoutError):
+            asyncio.run(submit_analysis_batch(_batch_prompts(), "openai", timeout=0.05))
+        
+        # analyze_all leaves the analysis to the workers, issue by issue
+        issue = SonarQubeIssue(
+            key="AX1",
+            rule="python:S1234",
+            severity="MAJOR",
+            component="project:a.py",
+            message="Test issue",
+            type="CODE_SMELL",
+        )
+        with patch(
+            "debt_zero_agent.agent.nodes._build_analysis_messages",
+            return_value=_batch_prompts()["AX1"],
+        ):
+            update = asyncio.run(analyze_all({
+                "issues": [issue],
+                "cot": True,
+                "llm_provider": "openai",
+                "batch_api": True,
+                "batch_timeout": 0.0,
+            }))
+    
+    client.batches.cancel.assert_awaited_with("batch-1")
+    assert client.batches.retrieve.await_count >= 1
+    assert update == {"analyses": {}}
+
+
+def test_prefetch_files(tmp_path):
+    """Test that every readable issue file is loaded into the cache."""
+    from debt_zero_agent.agent.nodes import prefetch_files
+    
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "b.py").write_text("b = 2\n")
+    issues = [
+        SonarQubeIssue(
+            key=f"TEST-{i}",
+            rule="python:S1234",
+            severity="MAJOR",
+            component=f"project:{file_name}",
+            message="Test issue",
+            type="CODE_SMELL",
+        )
+        for i, file_name in enumerate(["a.py", "b.py", "a.py", "missing.py"])
+    ]
+    
+    update = prefetch_files({"repo_path": str(tmp_path), "issues": issues})
+    
+    assert update["file_cache"] == {"a.py": "a = 1\n", "b.py": "b = 2\n"}
+
+
+def test_get_cached_content():
+    """Test that each file is read from disk only once."""
+    from debt_zero_agent.agent.nodes import _get_cached_content
+    
+    state = {"repo_path": "/tmp/repo"}
+    
+    with patch("debt_zero_agent.agent.nodes.read_file") as mock_read:
+        mock_read.invoke.return_value = "x = 1\n"
+        assert _get_cached_content(state, "a.py") == "x = 1\n"
+        assert _get_cached_content(state, "a.py") == "x = 1\n"
+    
+    assert mock_read.invoke.call_count == 1
+    assert state["file_cache"] == {"a.py": "x = 1\n"}
+
+
+def test_get_cached_ast():
+    """Test that a file is parsed once per version of its content."""
+    from debt_zero_agent.agent.nodes import _get_cached_ast
+    
+    state = {}
+    tree = _get_cached_ast(state, "a.py", "x = 1\n", "python")
+    
+    assert _get_cached_ast(state, "a.py", "x = 1\n", "python") is tree
+    assert _get_cached_ast(state, "a.py", "x = 2\n", "python") is not tree
+    assert list(state["ast_cache"]) == ["a.py"]
+
+
+def test_write_pending_files(tmp_path):
+    """Test that a worker's buffered fixes are written once it is done."""
+    from debt_zero_agent.agent.nodes import write_pending_files
+    from debt_zero_agent.models import FixResult
+    
+    fixes = [
+        FixResult(
+            issue_key=f"AX-{path}",
+            file_path=path,
+            file_sha256="0" * 64,
+            diff="",
+            llm_provider="openai",
+        )
+        for path in ["a.py", "pkg/b.py", "c.py"]
+    ]
+    state = {
+        "repo_path": str(tmp_path),
+        "dry_run": True,
+        "successful_fixes": fixes,
+        "failed_fixes": [],
+        "pending_writes": {"a.py": "x = 2\n", "pkg/b.py": "y = 3\n", "c.py": "z = 4\n"},
+    }
+    
+    with patch("debt_zero_agent.agent.nodes.write_file") as mock_write:
+        write_pending_files(state)
+    mock_write.invoke.assert_not_called()
+    
+    # A directory in the way fails the fixes of its file
+    (tmp_path / "c.py").mkdir()
+    state["dry_run"] = False
+    write_pending_files(state)
+    
+    assert (tmp_path / "a.py").read_text() == "x = 2\n"
+    assert (tmp_path / "pkg" / "b.py").read_text() == "y = 3\n"
+    assert [f.issue_key for f in state["successful_fixes"]] == ["AX-a.py", "AX-pkg/b.py"]
+    assert [f.issue_key for f in state["failed_fixes"]] == ["AX-c.py"]
+    assert list(state["pending_writes"]) == ["a.py", "pkg/b.py"]
+
+
+def test_prefetch_rules():
+    """Test that each distinct rule is fetched once, skipping failures."""
+    from debt_zero_agent.agent.nodes import prefetch_rules
+    
+    issues = [
+        SonarQubeIssue(
+            key=f"TEST-{i}",
+            rule=rule,
+            severity="MAJOR",
+            component="project:a.py",
+            message="Test issue",
+            type="CODE_SMELL",
+        )
+        for i, rule in enumerate(["python:S1481", "python:S1481", "python:S0000"])
+    ]
+    
+    def describe(sonar_url, rule_key):
+        if rule_key == "python:S0000":
+            raise LookupError(rule_key)
+        return f"details of {rule_key}"
+    
+    with patch("debt_zero_agent.agent.nodes._get_rule_description", side_effect=describe) as mock_describe:
+        update = prefetch_rules({"issues": issues, "sonar_url": "https://sonar.test"})
+    
+    assert update["rule_cache"] == {"python:S1481": "details of python:S1481"}
+    assert mock_describe.call_count == 2
+
+
+def test_search_references_cached():
+    """Test that repeated symbol searches reuse the run's search cache."""
+    from debt_zero_agent.agent.nodes import _search_references
+
+    state = {"repo_path": "/tmp/repo", "search_cache": {}}
+    results = [{"file_path": "other.py", "line_number": 1, "line_content": "calculate()"}]
+
+    with patch("debt_zero_agent.agent.nodes.search_code") as mock_search:
+        mock_search.invoke.return_value = results
+        assert _search_references(state, "calculate") == results
+        assert _search_references(state, "calculate") == results
+
+    assert mock_search.invoke.call_count == 1
+    assert state["search_cache"] == {"calculate": results}
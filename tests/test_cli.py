@@ -1,12 +1,15 @@
 """Unit tests for CLI."""
 
 import json
+import subprocess
+import sys
 import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
-from debt_zero_agent.cli import load_issues, main
+from debt_zero_agent.cli import load_issues, main, run_workflow
+from debt_zero_agent.models import FailedFix, FixResult, FixStatus
 
 
 def test_load_issues():
@@ -33,6 +36,33 @@ def test_load_issues():
         Path(temp_file).unlink()
 
 
+def test_load_issues_limit():
+    """Test that only the first issues up to the limit are loaded."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        json.dump({
+            "total": 5,
+            "issues": [
+                {
+                    "key": f"TEST-{i}",
+                    "rule": "python:S1234",
+                    "severity": "MAJOR",
+                    "component": "project:test.py",
+                    "message": "Test issue",
+                    "line": i + 1,
+                    "type": "CODE_SMELL",
+                }
+                for i in range(5)
+            ]
+        }, f)
+        temp_file = f.name
+    
+    try:
+        issues = load_issues(temp_file, limit=2)
+        assert [issue.key for issue in issues] == ["TEST-0", "TEST-1"]
+    finally:
+        Path(temp_file).unlink()
+
+
 def test_cli_help():
     """Test CLI help message."""
     with pytest.raises(SystemExit) as exc_info:
@@ -42,6 +72,17 @@ def test_cli_help():
     assert exc_info.value.code == 0
 
 
+def test_cli_import_skips_agent():
+    """Test that importing the CLI does not load the agent and LLM clients."""
+    code = (
+        "import sys, debt_zero_agent.cli; "
+        "print(any(m in sys.modules for m in ('langgraph', 'langchain_core')))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    
+    assert result.stdout.strip() == "False"
+
+
 def test_cli_missing_required_args():
     """Test CLI with missing required arguments."""
     with pytest.raises(SystemExit):
@@ -69,19 +110,51 @@ def test_cli_invalid_repo_path():
         Path(temp_file).unlink()
 
 
-def test_cli_no_issues():
+def test_cli_no_issues(tmp_path):
     """Test CLI with empty issues file."""
     with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
         json.dump({"total": 0, "issues": []}, f)
         temp_file = f.name
     
-    with tempfile.TemporaryDirectory() as tmpdir:
-        try:
-            with patch('sys.argv', [
-                'debt-zero-agent',
-                tmpdir,
-                '--issues', temp_file,
-            ]):
-                main()  # Should exit gracefully
-        finally:
-            Path(temp_file).unlink()
+    try:
+        with patch('sys.argv', [
+            'debt-zero-agent',
+            str(tmp_path),
+            '--issues', temp_file,
+        ]):
+            main()  # Should exit gracefully
+    finally:
+        Path(temp_file).unlink()
+
+
+def test_run_workflow_streams_results(tmp_path):
+    """Test that fix results are appended to the results file as they arrive."""
+    import asyncio
+    
+    fix = FixResult(
+        issue_key="AX1",
+        file_path="a.py",
+        file_sha256="0" * 64,
+        diff="",
+        llm_provider="openai",
+    )
+    failure = FailedFix(
+        issue_key="AX2",
+        file_path="b.py",
+        status=FixStatus.FAILED,
+        error_message="boom",
+        llm_provider="openai",
+    )
+    
+    async def astream(state, config, stream_mode):
+        yield {"process_file": {"successful_fixes": [fix], "failed_fixes": []}}
+        yield {"process_file": {"successful_fixes": [], "failed_fixes": [failure]}}
+        yield {"finalize": {"messages": []}}
+    
+    results_path = tmp_path / "fixes.ndjson"
+    with open(results_path, "a", encoding="utf-8") as results_file:
+        counts = asyncio.run(run_workflow(Mock(astream=astream), {}, 8, results_file))
+    
+    assert counts == (1, 1)
+    lines = [json.loads(line) for line in results_path.read_text().splitlines()]
+    assert [(r["issue_key"], r["status"]) for r in lines] == [("AX1", "success"), ("AX2", "failed")]
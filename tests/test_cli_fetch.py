@@ -1,5 +1,6 @@
 """Additional CLI tests for issue fetching."""
 
+import json
 import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch
@@ -8,11 +9,11 @@ import pytest
 from debt_zero_agent.cli import fetch_issues_from_api
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_fetch_issues_from_api_success(mock_get):
     """Test fetching issues from API successfully."""
     mock_response = Mock()
-    mock_response.json.return_value = {
+    mock_response.content = json.dumps({
         "total": 2,
         "issues": [
             {
@@ -32,7 +33,7 @@ def test_fetch_issues_from_api_success(mock_get):
                 "type": "CODE_SMELL",
             },
         ]
-    }
+    }).encode()
     mock_response.raise_for_status = Mock()
     mock_get.return_value = mock_response
     
@@ -43,11 +44,11 @@ def test_fetch_issues_from_api_success(mock_get):
     assert issues[1].key == "TEST-2"
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_fetch_issues_with_limit(mock_get):
     """Test that limit is enforced."""
     mock_response = Mock()
-    mock_response.json.return_value = {
+    mock_response.content = json.dumps({
         "total": 20,
         "issues": [
             {
@@ -60,7 +61,7 @@ def test_fetch_issues_with_limit(mock_get):
             }
             for i in range(20)
         ]
-    }
+    }).encode()
     mock_response.raise_for_status = Mock()
     mock_get.return_value = mock_response
     
@@ -69,10 +70,39 @@ def test_fetch_issues_with_limit(mock_get):
     assert len(issues) == 5
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_fetch_issues_api_error(mock_get):
     """Test handling API errors."""
     mock_get.side_effect = Exception("API Error")
     
     with pytest.raises(SystemExit):
         fetch_issues_from_api("test-project", token="test-token")
+
+
+@patch('requests.Session.get')
+def test_fetch_issues_paginated(mock_get):
+    """Test that only the pages needed for the limit are fetched."""
+    mock_response = Mock()
+    mock_response.content = json.dumps({
+        "total": 1000,
+        "issues": [
+            {
+                "key": f"TEST-{i}",
+                "rule": "python:S1481",
+                "severity": "MAJOR",
+                "component": "project:test.py",
+                "message": f"Test issue {i}",
+                "type": "CODE_SMELL",
+            }
+            for i in range(100)
+        ]
+    }).encode()
+    mock_response.raise_for_status = Mock()
+    mock_get.return_value = mock_response
+    
+    issues = fetch_issues_from_api("test-project", token="test-token", limit=250)
+    
+    assert len(issues) == 250
+    assert mock_get.call_count == 3
+    pages = sorted(call.kwargs["params"]["p"] for call in mock_get.call_args_list)
+    assert pages == [1, 2, 3]
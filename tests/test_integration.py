@@ -1,7 +1,6 @@
 """End-to-end integration tests."""
 
 import json
-import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch
 
@@ -11,12 +10,11 @@ from debt_zero_agent.models import IssueSearchResponse
 
 
 @pytest.fixture
-def test_repo():
+def test_repo(tmp_path):
     """Create a temporary test repository."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create sample file
-        sample_file = Path(tmpdir) / "sample.py"
-        sample_file.write_text("""
+    # Create sample file
+    sample_file = tmp_path / "sample.py"
+    sample_file.write_text("""
 def calculate_price(items):
     tax_rate = 0.1  # Unused variable
     total = 0
@@ -24,7 +22,7 @@ def calculate_price(items):
         total += item["price"]
     return total
 """)
-        yield tmpdir
+    return str(tmp_path)
 
 
 @pytest.fixture
@@ -1,13 +1,35 @@
 """Unit tests for SonarQube issue models."""
 
 import pytest
+from pydantic import ValidationError
+
 from debt_zero_agent.models import (
+    FailedFix,
+    FixStatus,
     IssueSearchResponse,
     SonarQubeIssue,
     TextRange,
 )
 
 
+@pytest.fixture(scope="module")
+def make_issue():
+    """Build issues from shared defaults, overriding only what a test needs."""
+    defaults = {
+        "key": "AX1",
+        "rule": "python:S1",
+        "severity": "MAJOR",
+        "component": "proj:file.py",
+        "message": "Issue",
+        "type": "BUG",
+    }
+    
+    def build(**overrides) -> SonarQubeIssue:
+        return SonarQubeIssue(**{**defaults, **overrides})
+    
+    return build
+
+
 def test_text_range_creation():
     """Test TextRange model creation."""
     text_range = TextRange(startLine=10, endLine=15, startOffset=0, endOffset=50)
@@ -15,6 +37,9 @@ def test_text_range_creation():
     assert text_range.endLine == 15
     assert text_range.startOffset == 0
     assert text_range.endOffset == 50
+    
+    with pytest.raises(ValidationError):
+        text_range.startLine = 11
 
 
 def test_sonarqube_issue_creation():
@@ -36,52 +61,31 @@ def test_sonarqube_issue_creation():
     assert issue.line == 42
 
 
-def test_get_file_path():
+@pytest.mark.parametrize("component,expected", [
+    ("my-project:src/utils/helper.py", "src/utils/helper.py"),
+    ("src/main.py", "src/main.py"),  # No project key present
+])
+def test_get_file_path(make_issue, component, expected):
     """Test file path extraction from component."""
-    issue = SonarQubeIssue(
-        key="AX1234",
-        rule="python:S1234",
-        severity="MAJOR",
-        component="my-project:src/utils/helper.py",
-        message="Test",
-        type="BUG",
-    )
-    assert issue.get_file_path() == "src/utils/helper.py"
+    issue = make_issue(component=component)
+    assert issue.get_file_path() == expected
+    assert issue.model_copy(update={"component": "proj:other.py"}).file_path == "other.py"
 
 
-def test_get_file_path_no_colon():
-    """Test file path extraction when no project key present."""
-    issue = SonarQubeIssue(
-        key="AX1234",
-        rule="python:S1234",
-        severity="MAJOR",
-        component="src/main.py",
-        message="Test",
-        type="BUG",
-    )
-    assert issue.get_file_path() == "src/main.py"
+def test_issue_hashable(make_issue):
+    """Test that issues, tags included, can be used in sets and as keys."""
+    issue = make_issue(tags=["unused", "cwe"])
+    assert issue.tags == ("unused", "cwe")
+    assert issue in {issue}
+    assert {issue: 1}[make_issue(tags=["unused", "cwe"])] == 1
 
 
-def test_issue_search_response():
+def test_issue_search_response(make_issue):
     """Test IssueSearchResponse model."""
     response = IssueSearchResponse(
         issues=[
-            SonarQubeIssue(
-                key="AX1",
-                rule="python:S1",
-                severity="MAJOR",
-                component="proj:file.py",
-                message="Bug",
-                type="BUG",
-            ),
-            SonarQubeIssue(
-                key="AX2",
-                rule="python:S2",
-                severity="MINOR",
-                component="proj:file.py",
-                message="Smell",
-                type="CODE_SMELL",
-            ),
+            make_issue(key="AX1", type="BUG"),
+            make_issue(key="AX2", rule="python:S2", severity="MINOR", type="CODE_SMELL"),
         ],
         total=2,
         p=1,
@@ -91,37 +95,22 @@ def test_issue_search_response():
     assert response.total == 2
 
 
-def test_filter_by_type():
-    """Test filtering issues by type."""
-    response = IssueSearchResponse(
+@pytest.fixture(scope="module")
+def three_issue_response(make_issue):
+    """One issue of each type, built once for the tests that only read it."""
+    return IssueSearchResponse(
         issues=[
-            SonarQubeIssue(
-                key="AX1",
-                rule="python:S1",
-                severity="MAJOR",
-                component="proj:file.py",
-                message="Bug",
-                type="BUG",
-            ),
-            SonarQubeIssue(
-                key="AX2",
-                rule="python:S2",
-                severity="MINOR",
-                component="proj:file.py",
-                message="Smell",
-                type="CODE_SMELL",
-            ),
-            SonarQubeIssue(
-                key="AX3",
-                rule="python:S3",
-                severity="CRITICAL",
-                component="proj:file.py",
-                message="Vuln",
-                type="VULNERABILITY",
-            ),
+            make_issue(key="AX1", type="BUG"),
+            make_issue(key="AX2", rule="python:S2", severity="MINOR", type="CODE_SMELL"),
+            make_issue(key="AX3", rule="python:S3", severity="CRITICAL", type="VULNERABILITY"),
         ],
         total=3,
     )
+
+
+def test_filter_by_type(three_issue_response):
+    """Test filtering issues by type."""
+    response = three_issue_response
     
     bugs = response.filter_by_type("BUG")
     assert len(bugs) == 1
@@ -129,29 +118,115 @@ def test_filter_by_type():
     
     bugs_and_vulns = response.filter_by_type("BUG", "VULNERABILITY")
     assert len(bugs_and_vulns) == 2
+    
+    assert response.filter_by_type("VULNERABILITY", "BUG", "BUG") == [
+        response.issues[0],
+        response.issues[2],
+    ]
+    assert response.filter_by_type("UNKNOWN") == []
+    assert response.by_type["CODE_SMELL"] == [response.issues[1]]
+
+
+# Issue payload as returned by the SonarQube API; tests only read it
+_ISSUE_JSON = {
+    "key": "AX1234",
+    "rule": "python:S1234",
+    "severity": "MAJOR",
+    "component": "my-project:src/main.py",
+    "message": "Remove this unused variable",
+    "line": 42,
+    "textRange": {
+        "startLine": 42,
+        "endLine": 42,
+        "startOffset": 4,
+        "endOffset": 20,
+    },
+    "type": "CODE_SMELL",
+    "tags": ["unused", "convention"],
+}
 
 
-def test_issue_from_json():
+@pytest.mark.parametrize("overrides,line,tag_count", [
+    ({}, 42, 2),
+    ({"tags": []}, 42, 0),
+    ({"line": 100}, 100, 2),
+])
+def test_issue_from_json(overrides, line, tag_count):
     """Test parsing issue from JSON dict."""
-    json_data = {
-        "key": "AX1234",
-        "rule": "python:S1234",
-        "severity": "MAJOR",
-        "component": "my-project:src/main.py",
-        "message": "Remove this unused variable",
-        "line": 42,
-        "textRange": {
-            "startLine": 42,
-            "endLine": 42,
-            "startOffset": 4,
-            "endOffset": 20,
-        },
-        "type": "CODE_SMELL",
-        "tags": ["unused", "convention"],
-    }
-    
-    issue = SonarQubeIssue(**json_data)
+    issue = SonarQubeIssue(**{**_ISSUE_JSON, **overrides})
     assert issue.key == "AX1234"
+    assert issue.line == line
     assert issue.textRange is not None
     assert issue.textRange.startLine == 42
-    assert len(issue.tags) == 2
+    assert len(issue.tags) == tag_count
+
+
+def test_failed_fix_frozen():
+    """Test that fix results are immutable and hashable."""
+    failed = FailedFix(
+        issue_key="AX1",
+        file_path="file.py",
+        status=FixStatus.FAILED,
+        error_message="boom",
+        llm_provider="openai",
+    )
+    
+    with pytest.raises(ValidationError):
+        failed.iterations = 2
+    assert failed in {failed}
+
+
+def test_fix_result_materialize(tmp_path):
+    """Test recovering both file versions from the file on disk and the diff."""
+    from debt_zero_agent.models import FixResult, content_sha256
+    from debt_zero_agent.tools import generate_diff
+    
+    original = "x = 1\ny = 2\n"
+    fixed = "x = 1\ny = 3\n"
+    fix = FixResult(
+        issue_key="AX1",
+        file_path="file.py",
+        file_sha256=content_sha256(original),
+        diff=generate_diff.invoke({"original": original, "modified": fixed, "file_path": "file.py"}),
+        llm_provider="openai",
+    )
+    
+    # Dry run: the file still holds the original
+    (tmp_path / "file.py").write_text(original)
+    assert fix.materialize(str(tmp_path)) == (original, fixed)
+    
+    (tmp_path / "file.py").write_text(fixed)
+    assert fix.materialize(str(tmp_path)) == (original, fixed)
+    
+    (tmp_path / "file.py").write_text("x = 1\ny = 3\nz = 4\n")
+    with pytest.raises(ValueError):
+        fix.materialize(str(tmp_path))
+
+
+def test_fix_result_materialize_sequential_fixes(tmp_path):
+    """Test recovering each version of a file fixed twice in one run."""
+    from debt_zero_agent.models import FixResult, content_sha256
+    from debt_zero_agent.tools import generate_diff
+    
+    versions = ["x = 1\ny = 2\n", "x = 0\ny = 2\n", "x = 0\ny = 3\n"]
+    first, second = (
+        FixResult(
+            issue_key=f"AX{i}",
+            file_path="file.py",
+            file_sha256=content_sha256(original),
+            diff=generate_diff.invoke({"original": original, "modified": fixed, "file_path": "file.py"}),
+            llm_provider="openai",
+        )
+        for i, (original, fixed) in enumerate(zip(versions, versions[1:]))
+    )
+    results = [first, second]
+    
+    # Dry run: the file still holds the run's original
+    (tmp_path / "file.py").write_text(versions[0])
+    assert first.materialize(str(tmp_path), results) == (versions[0], versions[1])
+    assert second.materialize(str(tmp_path), results) == (versions[1], versions[2])
+    
+    # Live run: the file holds the last fix's version
+    (tmp_path / "file.py").write_text(versions[2])
+    assert first.materialize(str(tmp_path), results) == (versions[0], versions[1])
+    assert second.materialize(str(tmp_path), results) == (versions[1], versions[2])
@@ -1,12 +1,34 @@
 """Tests for SonarQube client."""
 
-from unittest.mock import Mock, patch
+import json
+from unittest.mock import patch
 
 import pytest
+from debt_zero_agent.http import get_session
 from debt_zero_agent.sonarqube import RuleDescription, SonarQubeClient
 
 
-@pytest.fixture
+class _StubResponse:
+    """Stand-in for a successful requests.Response with a JSON body."""
+
+    __slots__ = ("content",)
+
+    def __init__(self, body: dict):
+        self.content = json.dumps(body).encode()
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clear_rule_cache():
+    """Start every test with an empty rule cache."""
+    from debt_zero_agent.sonarqube.client import _RULE_CACHE
+    
+    _RULE_CACHE.clear()
+
+
+@pytest.fixture(scope="module")
 def mock_response():
     """Mock SonarQube API response."""
     return {
@@ -20,9 +42,21 @@ def mock_response():
     }
 
 
-def test_sonarqube_client_init():
+@pytest.fixture(scope="module")
+def client():
+    """Default client shared by the tests; it only holds the URL and auth."""
+    return SonarQubeClient()
+
+
+@pytest.fixture
+def sonar_get():
+    """Stub GET requests on the shared HTTP session."""
+    with patch.object(get_session(), "get") as mock_get:
+        yield mock_get
+
+
+def test_sonarqube_client_init(client):
     """Test SonarQube client initialization."""
-    client = SonarQubeClient()
     assert client.base_url == "https://sonarcloud.io"
 
 
@@ -32,13 +66,10 @@ def test_sonarqube_client_custom_url():
     assert client.base_url == "https://custom.sonarqube.com"
 
 
-@patch('requests.Session.get')
-def test_get_rule_success(mock_get, mock_response):
+def test_get_rule_success(client, sonar_get, mock_response):
     """Test fetching rule successfully."""
-    mock_get.return_value.json.return_value = mock_response
-    mock_get.return_value.raise_for_status = Mock()
+    sonar_get.return_value = _StubResponse(mock_response)
     
-    client = SonarQubeClient()
     rule = client.get_rule("python:S1481")
     
     assert rule is not None
@@ -47,21 +78,29 @@ def test_get_rule_success(mock_get, mock_response):
     assert "Remove unused variables" in rule.htmlDesc
 
 
-@patch('requests.Session.get')
-def test_get_rule_failure(mock_get):
+def test_get_rule_cached(sonar_get, mock_response):
+    """Test that a rule is requested once, whichever client asks."""
+    sonar_get.return_value = _StubResponse(mock_response)
+    
+    first = SonarQubeClient().get_rule("python:S1481")
+    second = SonarQubeClient().get_rule("python:S1481")
+    
+    assert second is first
+    assert sonar_get.call_count == 1
+
+
+def test_get_rule_failure(client, sonar_get):
     """Test handling API failure."""
-    mock_get.side_effect = Exception("API Error")
+    sonar_get.side_effect = Exception("API Error")
     
-    client = SonarQubeClient()
     rule = client.get_rule("python:S1481")
     
     assert rule is None
 
 
-@patch('requests.Session.get')
-def test_search_rules(mock_get):
+def test_search_rules(client, sonar_get):
     """Test searching for rules."""
-    mock_get.return_value.json.return_value = {
+    sonar_get.return_value = _StubResponse({
         "rules": [
             {
                 "key": "python:S1481",
@@ -71,16 +110,33 @@ def test_search_rules(mock_get):
                 "severity": "MINOR",
             }
         ]
-    }
-    mock_get.return_value.raise_for_status = Mock()
+    })
     
-    client = SonarQubeClient()
     rules = client.search_rules(language="py")
     
     assert len(rules) == 1
     assert rules[0].key == "python:S1481"
 
 
+def test_get_rules_bulk(client, sonar_get, mock_response):
+    """Test fetching several rules at once, each distinct key once."""
+    sonar_get.return_value = _StubResponse(mock_response)
+    
+    rules = client.get_rules_bulk(["python:S1481", "python:S1481", "python:S1192"])
+    
+    assert list(rules) == ["python:S1481", "python:S1192"]
+    assert rules["python:S1481"].name == "Unused local variables should be removed"
+    assert sonar_get.call_count == 2
+
+
+def test_session_retries_transient_errors():
+    """Test that the shared session retries rate-limited requests."""
+    retries = get_session().get_adapter("https://sonarcloud.io").max_retries
+    
+    assert retries.total == 3
+    assert 429 in retries.status_forcelist
+
+
 def test_rule_description_model():
     """Test RuleDescription model."""
     rule = RuleDescription(
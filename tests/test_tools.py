@@ -1,10 +1,17 @@
 """Unit tests for tools."""
 
-import tempfile
+import re
 from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
 import pytest
 from debt_zero_agent.tools import (
+    EditError,
+    apply_diff,
+    apply_edit,
+    apply_edits_batch,
+    compute_diff,
     generate_diff,
     generate_diff_stats,
     read_file,
@@ -14,118 +21,381 @@ from debt_zero_agent.tools import (
 )
 
 
+# Files shared by the read-only tests, which must not modify them
+_SAMPLE_FILES = {
+    "hello.py": b"print('hello')\n",
+    "endings.py": b"a = 1\r\nb = 2\rc = '\xe9'\n",
+    "lines.py": b"line1\nline2\nline3\nline4\n",
+    "crlf_lines.py": b"line1\r\nline2\r\nline3",
+    "file1.py": b"def foo():\n    pass\n",
+    "file2.py": b"def bar():\n    foo()\n",
+    "assignments.py": b"x = 10\ny = 20\nz = 30\n",
+}
+
+
+@pytest.fixture(scope="module")
+def sample_repo(tmp_path_factory):
+    """Create the sample repository once for all read-only tests."""
+    root = tmp_path_factory.mktemp("repo")
+    for name, content in _SAMPLE_FILES.items():
+        (root / name).write_bytes(content)
+    return str(root)
+
+
 # File Reader Tests
 
 
-def test_read_file():
+def test_read_file(sample_repo):
     """Test reading a file."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create test file
-        test_file = Path(tmpdir) / "test.py"
-        test_file.write_text("print('hello')\n")
-        
-        content = read_file.invoke({"repo_path": tmpdir, "file_path": "test.py"})
-        assert content == "print('hello')\n"
+    content = read_file.invoke({"repo_path": sample_repo, "file_path": "hello.py"})
+    assert content == "print('hello')\n"
 
 
-def test_read_file_not_found():
+def test_read_file_translates_newlines(sample_repo):
+    """Test that CRLF and CR line endings read back as LF, as in text mode."""
+    content = read_file.invoke({"repo_path": sample_repo, "file_path": "endings.py"})
+    assert content == "a = 1\nb = 2\nc = '\xe9'\n"
+
+
+def test_read_file_not_found(sample_repo):
     """Test reading non-existent file."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        with pytest.raises(FileNotFoundError):
-            read_file.invoke({"repo_path": tmpdir, "file_path": "missing.py"})
+    with pytest.raises(FileNotFoundError):
+        read_file.invoke({"repo_path": sample_repo, "file_path": "missing.py"})
 
 
-def test_read_file_lines():
+def test_read_file_lines(sample_repo):
     """Test reading specific lines from a file."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        test_file = Path(tmpdir) / "test.py"
-        test_file.write_text("line1\nline2\nline3\nline4\n")
-        
-        content = read_file_lines.invoke({
-            "repo_path": tmpdir,
-            "file_path": "test.py",
-            "start_line": 2,
-            "end_line": 3,
-        })
-        assert content == "line2\nline3"
+    content = read_file_lines.invoke({
+        "repo_path": sample_repo,
+        "file_path": "lines.py",
+        "start_line": 2,
+        "end_line": 3,
+    })
+    assert content == "line2\nline3"
+
+
+def test_read_file_lines_past_end(sample_repo):
+    """Test reading a line range that runs past the end of a CRLF file."""
+    content = read_file_lines.invoke({
+        "repo_path": sample_repo,
+        "file_path": "crlf_lines.py",
+        "start_line": 2,
+        "end_line": 10,
+    })
+    assert content == "line2\nline3"
 
 
 # Code Search Tests
 
 
-def test_search_code():
+def test_search_code(sample_repo):
     """Test searching for code patterns."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create test files
-        (Path(tmpdir) / "file1.py").write_text("def foo():\n    pass\n")
-        (Path(tmpdir) / "file2.py").write_text("def bar():\n    foo()\n")
-        
+    results = search_code.invoke({
+        "repo_path": sample_repo,
+        "query": "foo",
+        "file_patterns": ["*.py"],
+    })
+    
+    # The definition in one file and the call in the other, in any file order
+    assert sorted((r["file_path"], r["line_number"]) for r in results) == [
+        ("file1.py", 1),
+        ("file2.py", 2),
+    ]
+
+
+@pytest.mark.parametrize("query,expected_count", [
+    (r"[xyz] = \d+", 3),
+    (r"^def \w+\(", 2),
+    (r"no_such_symbol", 0),
+])
+def test_search_code_regex(sample_repo, query, expected_count):
+    """Test regex search."""
+    results = search_code.invoke({
+        "repo_path": sample_repo,
+        "query": query,
+        "file_patterns": ["*.py"],
+    })
+    
+    assert len(results) == expected_count
+
+
+@pytest.mark.parametrize("match_count,returncode", [(2, 0), (60, -15)])
+def test_search_code_ripgrep_stopped_only_after_max_results(tmp_path, match_count, returncode):
+    """Test that ripgrep is only terminated, and its exit ignored, once enough matches are in."""
+    import io
+    import json
+    
+    output = "".join(
+        json.dumps({"type": "match", "data": {
+            "path": {"text": "a.py"},
+            "line_number": n,
+            "lines": {"text": f"foo{n}\n"},
+        }}) + "\n"
+        for n in range(1, match_count + 1)
+    )
+    proc = Mock(stdout=io.StringIO(output))
+    proc.wait.return_value = returncode
+    
+    with (
+        patch("subprocess.Popen", return_value=proc),
+        patch("debt_zero_agent.tools.code_search._grep_fallback") as mock_fallback,
+    ):
+        results = search_code.invoke({"repo_path": str(tmp_path), "query": "foo"})
+    
+    assert len(results) == min(match_count, 50)
+    assert proc.terminate.called == (match_count > 50)
+    mock_fallback.assert_not_called()
+
+
+def test_search_code_fallback_skips_hidden_and_binary_files(tmp_path):
+    """Test the in-process search used when ripgrep is not installed."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text("a = 1\nfoo = foo + 1\nb = 2\n")
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "mod.py").write_text("foo\n")
+    (tmp_path / "data.py").write_bytes(b"\x00foo\n")
+    (tmp_path / "empty.py").write_text("")
+    
+    with patch("subprocess.Popen", side_effect=FileNotFoundError):
         results = search_code.invoke({
-            "repo_path": tmpdir,
+            "repo_path": str(tmp_path),
             "query": "foo",
             "file_patterns": ["*.py"],
         })
-        
-        assert len(results) >= 2  # Should find in both files
+    
+    assert results == [{
+        "file_path": str(Path("pkg") / "mod.py"),
+        "line_number": 2,
+        "line_content": "foo = foo + 1",
+        "context_before": [],
+        "context_after": [],
+    }]
+
+
+class _FakeHyperscanDatabase:
+    """Hyperscan database stand-in reporting the leftmost start of every match end."""
+
+    def compile(self, expressions, flags):
+        if b"\\1" in expressions[0]:
+            raise _FakeHyperscanError("backreferences are not supported")
+        self.pattern = re.compile(expressions[0], re.MULTILINE)
+        self.scratches = []
+
+    def scan(self, data, match_event_handler, scratch=None):
+        self.scratches.append(scratch)
+        for end in range(1, len(data) + 1):
+            start = next(
+                (s for s in range(end) if self.pattern.fullmatch(data, s, end)),
+                None,
+            )
+            if start is not None:
+                match_event_handler(0, start, end, 0, None)
+
+
+class _FakeHyperscanError(Exception):
+    """Compile error of the Hyperscan stand-in."""
+
+
+@pytest.fixture
+def fake_hyperscan(monkeypatch):
+    """Run the search fallback on a Hyperscan stand-in."""
+    from debt_zero_agent.tools import code_search
+    
+    module = SimpleNamespace(
+        Database=Mock(side_effect=_FakeHyperscanDatabase),
+        Scratch=Mock(side_effect=lambda database: object()),
+        error=_FakeHyperscanError,
+        HS_FLAG_MULTILINE=1,
+        HS_FLAG_SOM_LEFTMOST=2,
+    )
+    monkeypatch.setattr(code_search, "hyperscan", module)
+    code_search._hyperscan_database.cache_clear()
+    yield module
+    code_search._hyperscan_database.cache_clear()
+
+
+@pytest.mark.parametrize("query,expected_lines", [
+    (r"\w+\n\w+", [1, 3]),
+    (r"foo", [2, 4]),
+    (r"(o)\1", [2, 4]),
+])
+def test_search_code_fallback_hyperscan(tmp_path, fake_hyperscan, query, expected_lines):
+    """Test that the Hyperscan scan reports the lines re does, without overlaps."""
+    from debt_zero_agent.tools.code_search import _grep_fallback
+    
+    (tmp_path / "mod.py").write_text("a\nfoo\nc\nfoo foo\n")
+    
+    results = _grep_fallback(tmp_path, query, ["*.py"])
+    assert [r["line_number"] for r in results] == expected_lines
+    
+    # The same lines as Python's re
+    with patch("debt_zero_agent.tools.code_search.hyperscan", None):
+        assert _grep_fallback(tmp_path, query, ["*.py"]) == results
 
 
-def test_search_code_regex():
-    """Test regex search."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        (Path(tmpdir) / "test.py").write_text("x = 10\ny = 20\nz = 30\n")
-        
-        results = search_code.invoke({
-            "repo_path": tmpdir,
-            "query": r"[xyz] = \d+",
-            "file_patterns": ["*.py"],
-        })
-        
-        assert len(results) == 3
+def test_search_code_fallback_hyperscan_database_cached(tmp_path, fake_hyperscan):
+    """Test that searches share a compiled database, each with its own scratch."""
+    from debt_zero_agent.tools.code_search import _grep_fallback
+    
+    (tmp_path / "mod.py").write_text("foo\n")
+    
+    for _ in range(2):
+        assert len(_grep_fallback(tmp_path, "foo", ["*.py"])) == 1
+    # Unsupported patterns are not retried either
+    for _ in range(2):
+        assert len(_grep_fallback(tmp_path, r"(f)o\1", ["*.py"])) == 0
+    
+    assert fake_hyperscan.Database.call_count == 2
+    
+    first, second = (call.args[0] for call in fake_hyperscan.Scratch.call_args_list)
+    assert first is second
+    assert len(first.scratches) == 2
+    assert first.scratches[0] is not first.scratches[1]
+
+
+def test_parse_ripgrep_output_stops_after_max_results():
+    """Test that ripgrep output is read only until enough matches are in."""
+    import json
+    
+    from debt_zero_agent.tools.code_search import _parse_ripgrep_output
+    
+    def match(n):
+        return json.dumps({"type": "match", "data": {
+            "path": {"text": "a.py"},
+            "line_number": n,
+            "lines": {"text": f"foo{n}\n"},
+        }}) + "\n"
+    
+    def context(n):
+        return json.dumps({"type": "context", "data": {
+            "path": {"text": "a.py"},
+            "line_number": n,
+            "lines": {"text": f"ctx{n}\n"},
+        }}) + "\n"
+    
+    lines = iter(
+        [match(n) for n in range(1, 51)]
+        + [context(51), match(52), match(53)]
+    )
+    
+    results = _parse_ripgrep_output(lines)
+    
+    assert len(results) == 50
+    assert results[-1]["context_after"] == ["ctx51"]
+    # The remaining output is left unread
+    assert next(lines) == match(53)
 
 
 # File Writer Tests
 
 
-def test_write_file():
+def test_write_file(tmp_path):
     """Test writing a file."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        result = write_file.invoke({
-            "repo_path": tmpdir,
-            "file_path": "new.py",
-            "content": "print('test')\n",
-            "dry_run": False,
-        })
-        
-        assert result["status"] == "success"
-        assert Path(tmpdir, "new.py").read_text() == "print('test')\n"
+    result = write_file.invoke({
+        "repo_path": str(tmp_path),
+        "file_path": "new.py",
+        "content": "print('test')\n",
+        "dry_run": False,
+    })
+    
+    assert result["status"] == "success"
+    assert (tmp_path / "new.py").read_text() == "print('test')\n"
 
 
-def test_write_file_dry_run():
+def test_write_file_dry_run(tmp_path):
     """Test dry-run mode."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        result = write_file.invoke({
-            "repo_path": tmpdir,
-            "file_path": "new.py",
-            "content": "print('test')\n",
-            "dry_run": True,
-        })
-        
-        assert result["status"] == "dry_run"
-        assert not Path(tmpdir, "new.py").exists()
+    result = write_file.invoke({
+        "repo_path": str(tmp_path),
+        "file_path": "new.py",
+        "content": "print('test')\n",
+        "dry_run": True,
+    })
+    
+    assert result["status"] == "dry_run"
+    assert not (tmp_path / "new.py").exists()
 
 
-def test_write_file_creates_directories():
+def test_write_file_creates_directories(tmp_path):
     """Test that parent directories are created."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        result = write_file.invoke({
-            "repo_path": tmpdir,
-            "file_path": "subdir/nested/file.py",
-            "content": "test",
-            "dry_run": False,
-        })
-        
-        assert result["status"] == "success"
-        assert Path(tmpdir, "subdir/nested/file.py").exists()
+    result = write_file.invoke({
+        "repo_path": str(tmp_path),
+        "file_path": "subdir/nested/file.py",
+        "content": "test",
+        "dry_run": False,
+    })
+    
+    assert result["status"] == "success"
+    assert (tmp_path / "subdir/nested/file.py").exists()
+
+
+def test_write_file_replaces_atomically(tmp_path):
+    """Test overwriting keeps the file mode and symlinks and leaves no temporary file."""
+    target = tmp_path / "run.sh"
+    target.write_text("old\n")
+    target.chmod(0o755)
+    
+    result = write_file.invoke({
+        "repo_path": str(tmp_path),
+        "file_path": "run.sh",
+        "content": "new\n",
+        "fsync": True,
+    })
+    
+    assert result["status"] == "success"
+    assert target.read_text() == "new\n"
+    assert target.stat().st_mode & 0o777 == 0o755
+    assert [p.name for p in tmp_path.iterdir()] == ["run.sh"]
+    
+    # Writing through a symlink updates its target and keeps the link
+    link = tmp_path / "link.sh"
+    link.symlink_to("run.sh")
+    result = write_file.invoke({
+        "repo_path": str(tmp_path),
+        "file_path": "link.sh",
+        "content": "newer\n",
+    })
+    
+    assert result["status"] == "success"
+    assert link.is_symlink()
+    assert target.read_text() == "newer\n"
+    assert target.stat().st_mode & 0o777 == 0o755
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["link.sh", "run.sh"]
+
+
+def test_apply_edit():
+    """Test applying a unique search-and-replace edit."""
+    content = "a = 1\nb = 2\nc = 3\n"
+    
+    assert apply_edit(content, "b = 2\n", "b = 20\n") == "a = 1\nb = 20\nc = 3\n"
+
+
+def test_apply_edit_empty_old_code():
+    """Test that an empty old_code is rejected instead of matched everywhere."""
+    with pytest.raises(EditError, match="empty"):
+        apply_edit("x = 1\n", "", "y = 2\n")
+
+
+def test_apply_edit_not_unique():
+    """Test that ambiguous edits are rejected."""
+    with pytest.raises(EditError, match="2 occurrences"):
+        apply_edit("x = 1\nx = 1\n", "x = 1", "x = 2")
+
+
+def test_apply_edits_batch():
+    """Test applying several edits in one pass regardless of their order."""
+    content = "a = 1\nb = 2\nc = 3\n"
+    
+    result = apply_edits_batch(content, [("c = 3", "c = 30"), ("a = 1", "a = 10")])
+    
+    assert result == "a = 10\nb = 2\nc = 30\n"
+
+
+def test_apply_edits_batch_overlap():
+    """Test that overlapping edits are rejected."""
+    content = "a = 1\nb = 2\nc = 3\n"
+    
+    with pytest.raises(EditError, match="overlap"):
+        apply_edits_batch(content, [("a = 1\nb = 2", "x"), ("b = 2\nc = 3", "y")])
 
 
 # Diff Tool Tests
@@ -142,9 +412,15 @@ def test_generate_diff():
         "file_path": "test.py",
     })
     
-    assert "@@" in diff  # Unified diff format
-    assert "-line2" in diff
-    assert "+modified" in diff
+    assert diff == (
+        "--- a/test.py\n"
+        "+++ b/test.py\n"
+        "@@ -1,3 +1,3 @@\n"
+        " line1\n"
+        "-line2\n"
+        "+modified\n"
+        " line3\n"
+    )
 
 
 def test_generate_diff_stats():
@@ -161,6 +437,41 @@ def test_generate_diff_stats():
     assert stats["modified_lines"] == 4
 
 
+def test_generate_diff_stats_from_diff():
+    """Test that stats are counted from an already generated diff."""
+    original = "line1\nline2\nline3\n"
+    modified = "line1\nmodified\nline3\nline4\n"
+    
+    diff = generate_diff.invoke({
+        "original": original,
+        "modified": modified,
+        "file_path": "test.py",
+    })
+    
+    with patch("debt_zero_agent.tools.diff_tool._line_matcher") as line_matcher:
+        stats = generate_diff_stats(original, modified, diff=diff)
+    
+    line_matcher.assert_not_called()
+    assert stats == generate_diff_stats(original, modified)
+
+
+def test_apply_diff_round_trip():
+    """Test applying and undoing one file's hunks of a multi-file diff."""
+    original = "".join(f"line{i}\n" for i in range(20))
+    modified = original.replace("line3\n", "").replace("line15\n", "new\nline15\n") + "end"
+    
+    diff = (
+        generate_diff.invoke({"original": "a\n", "modified": "b\n", "file_path": "other.py"})
+        + generate_diff.invoke({"original": original, "modified": modified, "file_path": "test.py"})
+    )
+    
+    assert apply_diff(original, diff, "test.py") == modified
+    assert apply_diff(modified, diff, "test.py", reverse=True) == original
+    assert apply_diff(original, diff, "missing.py") == original
+    with pytest.raises(ValueError):
+        apply_diff(modified, diff, "test.py")
+
+
 def test_generate_diff_no_changes():
     """Test diff with no changes."""
     content = "line1\nline2\n"
@@ -172,3 +483,27 @@ def test_generate_diff_no_changes():
     })
     
     assert diff == ""  # No diff when content is identical
+
+
+def test_compute_diff():
+    """Test that stats and unified diff come from one computation."""
+    original = "line1\nline2\nline3\n"
+    modified = "line1\nmodified\nline3\nline4"
+    
+    stats, diff_lines = compute_diff(original, modified, "test.py")
+    diff = "".join(diff_lines)
+    
+    assert stats == generate_diff_stats(original, modified)
+    assert diff.startswith("--- a/test.py\n+++ b/test.py\n@@ -1,3 +1,4 @@\n")
+    assert "-line2\n" in diff
+    assert "+modified\n" in diff
+    assert diff.endswith("+line4\n\\ No newline at end of file\n")
+
+
+def test_compute_diff_no_changes():
+    """Test that identical content yields an empty diff."""
+    stats, diff_lines = compute_diff("line1\n", "line1\n")
+    
+    assert stats["total_changes"] == 0
+    assert stats["original_lines"] == stats["modified_lines"] == 1
+    assert list(diff_lines) == []
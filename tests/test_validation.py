@@ -7,6 +7,9 @@ from debt_zero_agent.validation import (
     compare_ast_structure,
     detect_language_from_extension,
     locate_issue,
+    locate_node,
+    parse_code,
+    validate_many,
     validate_python_syntax,
     validate_syntax,
 )
@@ -15,59 +18,44 @@ from debt_zero_agent.validation import (
 # AST Validator Tests
 
 
-def test_validate_python_syntax_valid():
-    """Test validation of valid Python code."""
-    code = """
-def hello():
-    print("Hello, world!")
-"""
-    result = validate_python_syntax(code)
-    assert result.valid is True
-    assert len(result.errors) == 0
+# Valid and invalid sources shared by both syntax validators
+_SYNTAX_CASES = [
+    ('\ndef greet(name):\n    print(f"Hello, {name}!")\n', True),
+    ('\ndef greet(name\n    print(f"Hello, {name}!")\n', False),
+]
 
 
-def test_validate_python_syntax_invalid():
-    """Test validation of invalid Python code."""
-    code = """
-def hello(
-    print("Missing closing paren")
+# Original of the structure comparisons, shared so it is parsed once
+_FOO_SOURCE = """
+def foo():
+    x = 1
+    return x
 """
+
+
+@pytest.mark.parametrize("code,valid", _SYNTAX_CASES)
+def test_validate_python_syntax(code, valid):
+    """Test validation of valid and invalid Python code."""
     result = validate_python_syntax(code)
-    assert result.valid is False
-    assert len(result.errors) > 0
+    assert result.valid is valid
+    assert bool(result.errors) is not valid
 
 
 def test_compare_ast_structure_same():
     """Test AST comparison with identical structure."""
-    original = """
-def foo():
-    x = 1
-    return x
-"""
-    modified = """
-def foo():
-    x = 2  # Changed value
-    return x
-"""
-    result = compare_ast_structure(original, modified)
+    modified = _FOO_SOURCE.replace("x = 1", "x = 2  # Changed value")
+    result = compare_ast_structure(_FOO_SOURCE, modified)
     assert result.valid is True
     assert len(result.warnings) == 0
 
 
 def test_compare_ast_structure_added_function():
     """Test AST comparison when function is added."""
-    original = """
-def foo():
-    return 1
-"""
-    modified = """
-def foo():
-    return 1
-
+    modified = _FOO_SOURCE + """
 def bar():
     return 2
 """
-    result = compare_ast_structure(original, modified)
+    result = compare_ast_structure(_FOO_SOURCE, modified)
     assert result.valid is True
     assert len(result.warnings) > 0
     assert "Function count changed" in result.warnings[0]
@@ -76,83 +64,132 @@ def bar():
 # Tree-sitter Tests
 
 
-def test_validate_syntax_python_valid():
-    """Test tree-sitter validation with valid Python."""
-    code = """
-def greet(name):
-    print(f"Hello, {name}!")
-"""
+@pytest.mark.parametrize("code,valid", _SYNTAX_CASES)
+def test_validate_syntax_python(code, valid):
+    """Test tree-sitter validation with valid and invalid Python."""
     result = validate_syntax(code, "python")
-    assert result.valid is True
-    assert len(result.errors) == 0
+    assert result.valid is valid
+    assert bool(result.errors) is not valid
 
 
-def test_validate_syntax_python_invalid():
-    """Test tree-sitter validation with invalid Python."""
-    code = """
-def greet(name
-    print(f"Hello, {name}!")
-"""
-    result = validate_syntax(code, "python")
-    assert result.valid is False
-    assert len(result.errors) > 0
+def test_validate_syntax_cached():
+    """Test that validating the same source again reuses the result."""
+    code = _FOO_SOURCE
+    
+    assert validate_syntax(code, "python") is validate_syntax(code, "python")
+    assert validate_python_syntax(code) is validate_python_syntax(code)
 
 
-def test_detect_language_from_extension():
+def test_validate_many():
+    """Test batch validation keeps the order of the sources."""
+    sources = [(f"x{i} = {i}", "python") for i in range(6)]
+    sources[3] = (b"def broken(\n", "python")
+    
+    results = validate_many(sources)
+    
+    assert [result.valid for result in results] == [True, True, True, False, True, True]
+    assert validate_many(sources[:2]) == results[:2]
+
+
+@pytest.mark.parametrize("file_path,expected", [
+    ("main.py", "python"),
+    ("app.js", "javascript"),
+    ("Main.java", "java"),
+    ("SETUP.PY", "python"),
+    ("src/lib.c/util.rs", "rust"),
+    ("unknown.xyz", None),
+])
+def test_detect_language_from_extension(file_path, expected):
     """Test language detection from file extensions."""
-    assert detect_language_from_extension("main.py") == "python"
-    assert detect_language_from_extension("app.js") == "javascript"
-    assert detect_language_from_extension("Main.java") == "java"
-    assert detect_language_from_extension("unknown.xyz") is None
+    assert detect_language_from_extension(file_path) == expected
 
 
 # Locator Tests
 
 
-def test_locate_issue_function_def():
-    """Test locating issue in function definition."""
-    code = """
+_LOCATOR_CODE = """
 def calculate(x, y):
-    result = x + y
-    return result
+    a = 1
+    b = 2
+    return a + b
 """
-    # Line 2 (0-indexed line 1) is the function definition
-    context = locate_issue(code, "python", line=2, column=0)
+
+
+@pytest.fixture(scope="module")
+def locator_tree():
+    """Parse the locator sample once for all locator tests."""
+    return parse_code(_LOCATOR_CODE, "python")
+
+
+@pytest.mark.parametrize("line,column,node_type,parent_type", [
+    (2, 0, "def", "function_definition"),  # Function definition
+    (3, 4, "identifier", "assignment"),  # Variable assignment
+    (5, 4, "return", "return_statement"),
+])
+def test_locate_node(locator_tree, line, column, node_type, parent_type):
+    """Test locating the node and its context at a position."""
+    context = locate_node(locator_tree, line=line, column=column)
+    
+    assert context.node_type == node_type
+    assert context.parent_type == parent_type
+    assert context.start_line == line
+    assert context.node_text in context.parent_text
+    assert len(context.siblings) > 0
+
+
+def test_locate_issue_siblings_are_capped():
+    """Test that long sibling texts are cut instead of decoded in full."""
+    body = "".join(f"    v{i} = {i}\n" for i in range(500))
+    code = f"def big():\n{body}"
+    
+    context = locate_issue(code, "python", line=1)
     
-    assert context is not None
-    assert context.start_line >= 1
-    assert context.end_line >= context.start_line
-    assert len(context.node_text) > 0
+    assert context.parent_type == "function_definition"
+    assert context.siblings[:2] == ["def", "big"]
+    assert context.siblings[-1].startswith("v0 = 0")
+    assert len(context.siblings[-1]) <= 2048
 
 
-def test_locate_issue_variable():
-    """Test locating issue at variable assignment."""
+def test_parse_bytes_source():
+    """Test that UTF-8 bytes are accepted wherever source text is."""
+    code = "name = 'zażółć'\nx = 1\n"
+    
+    assert locate_issue(code.encode(), "python", line=2) == locate_issue(code, "python", line=2)
+    assert validate_syntax(code.encode(), "python").valid
+
+
+def test_locate_node_reuses_tree():
+    """Test locating several issues in one parsed tree."""
     code = """
 x = 10
 y = 20
-z = x + y
 """
-    # Line 2 is the variable assignment
-    context = locate_issue(code, "python", line=2, column=0)
+    tree = parse_code(code, "python")
+    
+    first = locate_node(tree, line=2)
+    second = locate_node(tree, line=3)
     
-    assert context is not None
-    assert context.node_text is not None
-    assert context.parent_text is not None
+    assert first == locate_issue(code, "python", line=2)
+    assert "y" in second.node_text
 
 
-def test_locate_issue_with_siblings():
-    """Test that sibling context is captured."""
-    code = """
-def foo():
-    a = 1
-    b = 2
-    c = 3
-    return a + b + c
-"""
-    context = locate_issue(code, "python", line=3, column=4)
+def test_get_cached_parser_per_thread():
+    """Test parsers are reused within a thread but not shared across threads."""
+    import threading
     
-    assert context is not None
-    assert len(context.siblings) > 0
+    from debt_zero_agent.validation.locator import get_cached_parser
+    
+    parser = get_cached_parser("python")
+    assert get_cached_parser("python") is parser
+    
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_cached_parser("python")))
+    thread.start()
+    thread.join()
+    assert other[0] is not parser
+    
+    result = validate_syntax("x = 1", "not-a-language")
+    assert not result.valid
 
 
 def test_issue_context_dataclass():